@@ -0,0 +1,42 @@
+"""Add items.end_of_life_date (purchase date + category depreciation months)
+
+Revision ID: a2b3c4d5e6f7
+Revises: f1a2b3c4d5e6
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2b3c4d5e6f7'
+down_revision: Union[str, None] = 'f1a2b3c4d5e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE items ADD COLUMN IF NOT EXISTS end_of_life_date DATE")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_items_end_of_life_date ON items (end_of_life_date)")
+
+    # Backfill (same rule as backend.depreciation.end_of_life_sql)
+    op.execute("""
+        UPDATE items
+        SET end_of_life_date = CAST(items.purchase_date + make_interval(0, categories.depreciation_months) AS DATE)
+        FROM categories
+        WHERE categories.id = items.category_id
+          AND categories.depreciation_months > 0
+          AND items.purchase_date IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_items_end_of_life_date")
+    op.execute("ALTER TABLE items DROP COLUMN IF EXISTS end_of_life_date")
@@ -0,0 +1,32 @@
+"""Index branch membership lookups (user_branches.branch_id, users.branch_id)
+
+Revision ID: b3c4d5e6f7a8
+Revises: a2b3c4d5e6f7
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c4d5e6f7a8'
+down_revision: Union[str, None] = 'a2b3c4d5e6f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_user_branches_branch_id ON user_branches (branch_id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_users_branch_id ON users (branch_id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_user_branches_branch_id")
+    op.execute("DROP INDEX IF EXISTS ix_users_branch_id")
@@ -0,0 +1,68 @@
+"""Add trigram and full-text search indexes to items
+
+Revision ID: b7c8d9e0f1a2
+Revises: 52a1b3c4d5e6
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c8d9e0f1a2'
+down_revision: Union[str, None] = '52a1b3c4d5e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+
+    # unaccent() is only STABLE; an IMMUTABLE wrapper is required to use it in
+    # expression indexes and generated columns.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS $$
+            SELECT public.unaccent('public.unaccent', $1)
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """)
+
+    # Accent-insensitive Portuguese document (description weighted above the codes)
+    op.execute("""
+        ALTER TABLE items ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('portuguese', f_unaccent(coalesce(description, ''))), 'A') ||
+            setweight(to_tsvector('simple', coalesce(fixed_asset_number, '') || ' ' ||
+                                            coalesce(serial_number, '') || ' ' ||
+                                            coalesce(invoice_number, '')), 'B')
+        ) STORED
+    """)
+
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_search_vector ON items USING gin (search_vector)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_description_trgm ON items USING gin (f_unaccent(description) gin_trgm_ops)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_serial_number_trgm ON items USING gin (serial_number gin_trgm_ops)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_invoice_number_trgm ON items USING gin (invoice_number gin_trgm_ops)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_fixed_asset_number_trgm ON items USING gin (fixed_asset_number gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_items_fixed_asset_number_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_items_invoice_number_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_items_serial_number_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_items_description_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_items_search_vector")
+    op.execute("ALTER TABLE items DROP COLUMN IF EXISTS search_vector")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -0,0 +1,41 @@
+"""Add users.email_digest and email_digest_entries (hourly/daily email digests)
+
+Revision ID: c4d5e6f7a8b9
+Revises: b3c4d5e6f7a8
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d5e6f7a8b9'
+down_revision: Union[str, None] = 'b3c4d5e6f7a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS email_digest VARCHAR NOT NULL DEFAULT 'immediate'")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS email_digest_entries (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            title VARCHAR,
+            message TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_email_digest_entries_user_id ON email_digest_entries (user_id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS email_digest_entries")
+    op.execute("ALTER TABLE users DROP COLUMN IF EXISTS email_digest")
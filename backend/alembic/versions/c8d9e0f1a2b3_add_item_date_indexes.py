@@ -0,0 +1,35 @@
+"""Add btree indexes on items.purchase_date and items.created_at
+
+Revision ID: c8d9e0f1a2b3
+Revises: b7c8d9e0f1a2
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d9e0f1a2b3'
+down_revision: Union[str, None] = 'b7c8d9e0f1a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # CONCURRENTLY cannot run inside the migration transaction
+        with op.get_context().autocommit_block():
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_purchase_date ON items (purchase_date)")
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_created_at ON items (created_at)")
+    else:
+        op.create_index('ix_items_purchase_date', 'items', ['purchase_date'])
+        op.create_index('ix_items_created_at', 'items', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_items_created_at', table_name='items')
+    op.drop_index('ix_items_purchase_date', table_name='items')
@@ -0,0 +1,32 @@
+"""Index notifications by user (unread counter and notification center pages)
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e6f7a8b9c0'
+down_revision: Union[str, None] = 'c4d5e6f7a8b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_notifications_user_read_created ON notifications (user_id, read, created_at)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_notifications_user_id_id ON notifications (user_id, id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_notifications_user_read_created")
+    op.execute("DROP INDEX IF EXISTS ix_notifications_user_id_id")
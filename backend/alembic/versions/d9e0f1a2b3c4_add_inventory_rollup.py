@@ -0,0 +1,55 @@
+"""Add inventory_rollup (count/value per branch, category, cost center and status)
+
+Revision ID: d9e0f1a2b3c4
+Revises: c8d9e0f1a2b3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e0f1a2b3c4'
+down_revision: Union[str, None] = 'c8d9e0f1a2b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_rollup (
+            id SERIAL PRIMARY KEY,
+            branch_id INTEGER,
+            category_id INTEGER,
+            cost_center_id INTEGER,
+            status itemstatus,
+            item_count INTEGER NOT NULL DEFAULT 0,
+            total_value NUMERIC(16, 2) NOT NULL DEFAULT 0
+        )
+    """)
+    # NULL keys ("not set" on the item) must collide for ON CONFLICT upserts (Postgres 15+)
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_inventory_rollup_bucket
+        ON inventory_rollup (branch_id, category_id, cost_center_id, status) NULLS NOT DISTINCT
+    """)
+
+    # Backfill (same rounding as backend.rollup.reconcile_rollup)
+    op.execute("DELETE FROM inventory_rollup")
+    op.execute("""
+        INSERT INTO inventory_rollup (branch_id, category_id, cost_center_id, status, item_count, total_value)
+        SELECT branch_id, category_id, cost_center_id, status,
+               count(id), coalesce(sum(CAST(invoice_value AS NUMERIC(16, 2))), 0)
+        FROM items
+        GROUP BY branch_id, category_id, cost_center_id, status
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS inventory_rollup")
@@ -0,0 +1,45 @@
+"""Add inventory_snapshots (daily counts/values per branch, category and status)
+
+Revision ID: e0f1a2b3c4d5
+Revises: d9e0f1a2b3c4
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0f1a2b3c4d5'
+down_revision: Union[str, None] = 'd9e0f1a2b3c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_snapshots (
+            id SERIAL PRIMARY KEY,
+            snapshot_date DATE NOT NULL,
+            branch_id INTEGER,
+            category_id INTEGER,
+            status itemstatus,
+            item_count INTEGER NOT NULL DEFAULT 0,
+            total_value NUMERIC(16, 2) NOT NULL DEFAULT 0
+        )
+    """)
+    # Leading snapshot_date also serves the date-range scans of /dashboard/trends
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_inventory_snapshots_bucket
+        ON inventory_snapshots (snapshot_date, branch_id, category_id, status) NULLS NOT DISTINCT
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS inventory_snapshots")
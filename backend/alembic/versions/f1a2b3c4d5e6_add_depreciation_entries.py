@@ -0,0 +1,59 @@
+"""Add depreciation_periods / depreciation_entries (monthly straight-line close)
+
+Revision ID: f1a2b3c4d5e6
+Revises: e0f1a2b3c4d5
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a2b3c4d5e6'
+down_revision: Union[str, None] = 'e0f1a2b3c4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS depreciation_periods (
+            period DATE PRIMARY KEY,
+            closed_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            item_count INTEGER NOT NULL DEFAULT 0,
+            total_depreciation NUMERIC(16, 2) NOT NULL DEFAULT 0,
+            total_book_value NUMERIC(16, 2) NOT NULL DEFAULT 0
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS depreciation_entries (
+            id SERIAL PRIMARY KEY,
+            period DATE NOT NULL,
+            item_id INTEGER NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+            depreciation NUMERIC(16, 2) NOT NULL DEFAULT 0,
+            accumulated NUMERIC(16, 2) NOT NULL DEFAULT 0,
+            book_value NUMERIC(16, 2) NOT NULL DEFAULT 0
+        )
+    """)
+    # (period, item_id): close of a month and the "latest period" joins;
+    # (item_id, period): history of one item
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_depreciation_entries_period_item
+        ON depreciation_entries (period, item_id)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_depreciation_entries_item_period
+        ON depreciation_entries (item_id, period)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS depreciation_entries")
+    op.execute("DROP TABLE IF EXISTS depreciation_periods")
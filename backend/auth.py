@@ -1,14 +1,19 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, List
+from collections import OrderedDict
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.database import get_db
-from backend.models import User
+from backend.models import User, UserRole
+from backend import loaders
+from backend.redis_client import get_redis_cache
 from sqlalchemy.future import select
+from pydantic import BaseModel
 import os
+import time
 
 # Configurações de segurança
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -18,6 +23,12 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Principal cache: short in-process LRU in front of Redis.
+# The local TTL bounds how long another worker may serve a principal after it was invalidated.
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+PRINCIPAL_LOCAL_TTL = int(os.getenv("PRINCIPAL_LOCAL_TTL", "15"))
+PRINCIPAL_LOCAL_SIZE = 1024
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
@@ -38,7 +49,120 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+class Principal(BaseModel):
+    """Authenticated user as seen by the routers. Detached from the session and cacheable."""
+    id: int
+    email: str
+    name: Optional[str] = None
+    role: Optional[UserRole] = None
+    branch_id: Optional[int] = None
+    branch_ids: List[int] = []
+    group_id: Optional[int] = None
+    all_branches: bool = False
+    can_import: bool = False
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            role=user.role,
+            branch_id=user.branch_id,
+            branch_ids=[b.id for b in user.branches],
+            group_id=user.group_id,
+            all_branches=bool(user.all_branches),
+            can_import=bool(user.can_import),
+        )
+
+    @property
+    def allowed_branch_ids(self) -> List[int]:
+        """Assigned branches plus the legacy branch_id. Returns a new list on every call."""
+        allowed = list(self.branch_ids)
+        if self.branch_id and self.branch_id not in allowed:
+            allowed.append(self.branch_id)
+        return allowed
+
+
+_principal_cache: "OrderedDict[str, tuple[float, Principal]]" = OrderedDict()
+
+
+def _principal_key(email: str) -> str:
+    return f"principal:{email}"
+
+
+def _local_get(email: str) -> Optional[Principal]:
+    entry = _principal_cache.get(email)
+    if entry is None:
+        return None
+    expires_at, principal = entry
+    if expires_at < time.monotonic():
+        _principal_cache.pop(email, None)
+        return None
+    _principal_cache.move_to_end(email)
+    return principal
+
+
+def _local_put(email: str, principal: Principal):
+    _principal_cache[email] = (time.monotonic() + PRINCIPAL_LOCAL_TTL, principal)
+    _principal_cache.move_to_end(email)
+    while len(_principal_cache) > PRINCIPAL_LOCAL_SIZE:
+        _principal_cache.popitem(last=False)
+
+
+async def load_principal(db: AsyncSession, email: str) -> Optional[Principal]:
+    """Principal for a token subject: in-process LRU, then Redis, then the database."""
+    principal = _local_get(email)
+    if principal is not None:
+        return principal
+
+    try:
+        redis = await get_redis_cache()
+        cached = await redis.get(_principal_key(email))
+        if cached:
+            principal = Principal.model_validate_json(cached)
+            _local_put(email, principal)
+            return principal
+    except Exception as e:
+        print(f"Principal Cache Read Error: {e}")
+
+    result = await db.execute(select(User).options(*loaders.USER).where(User.email == email))
+    user = result.scalars().first()
+    if user is None:
+        return None
+
+    principal = Principal.from_user(user)
+    _local_put(email, principal)
+    try:
+        redis = await get_redis_cache()
+        await redis.set(_principal_key(email), principal.model_dump_json(), ex=PRINCIPAL_CACHE_TTL)
+    except Exception as e:
+        print(f"Principal Cache Write Error: {e}")
+    return principal
+
+
+async def invalidate_principal(email: str):
+    """Drops the cached principal of a user (call after changing role, branches, group or deleting it)."""
+    _principal_cache.pop(email, None)
+    try:
+        redis = await get_redis_cache()
+        await redis.delete(_principal_key(email))
+    except Exception as e:
+        print(f"Principal Cache Invalidation Error: {e}")
+
+
+async def invalidate_all_principals():
+    _principal_cache.clear()
+    try:
+        redis = await get_redis_cache()
+        keys = [key async for key in redis.scan_iter(_principal_key("*"))]
+        if keys:
+            await redis.delete(*keys)
+    except Exception as e:
+        print(f"Principal Cache Invalidation Error: {e}")
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
@@ -52,14 +176,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     except JWTError:
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalars().first()
-
-    if user is None:
+    principal = await load_principal(db, email)
+    if principal is None:
         raise credentials_exception
-    return user
+    return principal
 
-async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme_optional), db: AsyncSession = Depends(get_db)):
+async def principal_from_token(db: AsyncSession, token: Optional[str]) -> Optional[Principal]:
+    """Principal of a bearer token, or None when it is missing, invalid or expired."""
     if not token:
         return None
     try:
@@ -70,6 +193,15 @@ async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme
     except JWTError:
         return None
 
-    result = await db.execute(select(User).where(User.email == email))
+    return await load_principal(db, email)
+
+async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme_optional), db: AsyncSession = Depends(get_db)) -> Optional[Principal]:
+    return await principal_from_token(db, token)
+
+async def get_current_user_record(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)) -> User:
+    """ORM row of the authenticated user, for the few routes that read or write the user itself."""
+    result = await db.execute(select(User).options(*loaders.USER).where(User.id == current_user.id))
     user = result.scalars().first()
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Não foi possível validar as credenciais")
     return user
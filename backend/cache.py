@@ -1,9 +1,13 @@
 import json
+import asyncio
 from functools import wraps
 from typing import Optional, Any
 from backend.redis_client import get_redis_cache
 from fastapi import Request, Response
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from backend import models
 
 DEFAULT_TTL = 3600  # 1 hour
 
@@ -80,3 +84,112 @@ async def invalidate_cache(key_pattern: str):
             await redis.delete(*keys)
     except Exception as e:
         print(f"Cache Invalidation Error: {e}")
+
+async def get_cached_json(key: str) -> Optional[Any]:
+    """Reads a JSON value stored by set_cached_json (None on miss or Redis error)."""
+    try:
+        redis = await get_redis_cache()
+        cached_data = await redis.get(key)
+        if cached_data:
+            return json.loads(cached_data)
+    except Exception as e:
+        print(f"Cache Read Error: {e}")
+    return None
+
+async def set_cached_json(key: str, value: Any, ttl: int = DEFAULT_TTL):
+    try:
+        redis = await get_redis_cache()
+        await redis.set(key, json.dumps(jsonable_encoder(value)), ex=ttl)
+    except Exception as e:
+        print(f"Cache Write Error: {e}")
+
+def branch_scope_key(allowed_branch_ids: Optional[list]) -> str:
+    """Stable cache key fragment for a branch scope (None = every branch)."""
+    if allowed_branch_ids is None:
+        return "all"
+    return ",".join(str(i) for i in sorted(set(allowed_branch_ids))) or "none"
+
+# --- Item change tracking ---
+# Dashboard aggregates ("dashboard:*") are dropped whenever a transaction creates,
+# deletes or changes the aggregated columns of an item, whatever code path did it.
+# Any committed item change also bumps ITEMS_VERSION_KEY, the data version report
+# jobs are keyed by.
+
+DASHBOARD_CACHE_PATTERN = "dashboard:*"
+ITEMS_VERSION_KEY = "items:version"
+_ITEM_AGGREGATE_COLUMNS = ("status", "branch_id", "category", "category_id", "cost_center_id",
+                           "invoice_value", "write_off_reason", "purchase_date")
+_pending_invalidations: set = set()
+
+def _touches_item_aggregates(session) -> bool:
+    if any(isinstance(obj, models.Item) for obj in list(session.new) + list(session.deleted)):
+        return True
+    for obj in session.dirty:
+        if isinstance(obj, models.Item):
+            state = inspect(obj)
+            if any(state.attrs[col].history.has_changes() for col in _ITEM_AGGREGATE_COLUMNS):
+                return True
+    return False
+
+def _touches_items(session) -> bool:
+    return any(
+        isinstance(obj, models.Item)
+        for obj in list(session.new) + list(session.deleted) + list(session.dirty)
+    )
+
+@event.listens_for(Session, "before_flush")
+def _track_item_changes(session, flush_context, instances):
+    if _touches_items(session):
+        session.info["items_changed"] = True
+    if _touches_item_aggregates(session):
+        session.info["dashboard_stale"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_item_statements(orm_execute_state):
+    # Bulk insert/update/delete statements on items bypass the unit of work
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is models.Item:
+        orm_execute_state.session.info["items_changed"] = True
+        orm_execute_state.session.info["dashboard_stale"] = True
+
+async def get_items_version() -> int:
+    """Current item data version (0 if Redis is unavailable or nothing changed yet)."""
+    try:
+        redis = await get_redis_cache()
+        return int(await redis.get(ITEMS_VERSION_KEY) or 0)
+    except Exception as e:
+        print(f"Cache Read Error: {e}")
+        return 0
+
+async def bump_items_version():
+    """Retires everything keyed by the item data version (report jobs); call after changing items outside the ORM."""
+    try:
+        redis = await get_redis_cache()
+        await redis.incr(ITEMS_VERSION_KEY)
+    except Exception as e:
+        print(f"Cache Write Error: {e}")
+
+async def _items_changed(dashboard_stale: bool):
+    await bump_items_version()
+    if dashboard_stale:
+        await invalidate_cache(DASHBOARD_CACHE_PATTERN)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    dashboard_stale = session.info.pop("dashboard_stale", False)
+    if not session.info.pop("items_changed", False):
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_items_changed(dashboard_stale))
+    _pending_invalidations.add(task)
+    task.add_done_callback(_pending_invalidations.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("dashboard_stale", None)
+    session.info.pop("items_changed", None)
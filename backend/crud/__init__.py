@@ -8,3 +8,4 @@ from .items import *
 from .system import *
 from .workflows import *
 from .requests import *
+from .dashboard import *
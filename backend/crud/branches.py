@@ -3,7 +3,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload, noload
 from sqlalchemy import or_, cast, String
 from backend import models, schemas
-from backend.auth import get_password_hash
+from backend.auth import get_password_hash, invalidate_all_principals
 from datetime import datetime
 from backend.audit import calculate_diff
 
@@ -52,6 +52,8 @@ async def delete_branch(db: AsyncSession, branch_id: int):
     if db_branch:
         await db.delete(db_branch)
         await db.commit()
+        # Cached principals may still list this branch
+        await invalidate_all_principals()
         return True
     return False
 
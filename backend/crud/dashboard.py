@@ -0,0 +1,414 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func, tuple_, and_, case, literal_column, literal, delete, insert, Date
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from backend import models, depreciation, loaders
+from backend.crud.items import item_date_filters, apply_item_filters
+
+# Statuses left out of the "active inventory" breakdowns
+INACTIVE_STATUSES = [models.ItemStatus.PENDING, models.ItemStatus.REJECTED, models.ItemStatus.WRITTEN_OFF]
+
+# GROUPING(category, branch_id, write_off_reason) bitmask of each grouping set
+_TOTALS = 0b111
+_BY_CATEGORY = 0b011
+_BY_BRANCH = 0b101
+_BY_REASON = 0b110
+
+
+async def get_dashboard_stats(
+    db: AsyncSession,
+    allowed_branch_ids: list[int] = None,
+    purchase_date_from: date = None,
+    purchase_date_to: date = None,
+    created_at_from: date = None,
+    created_at_to: date = None
+) -> dict:
+    """
+    Dashboard counters and breakdowns in a single scan of items:
+    FILTER picks the statuses of each metric and GROUPING SETS produces the
+    totals, per-category, per-branch and per-reason rows in one statement.
+    `allowed_branch_ids=None` means no branch restriction.
+    """
+    Item = models.Item
+    status = Item.status
+    pending = status == models.ItemStatus.PENDING
+    written_off = status == models.ItemStatus.WRITTEN_OFF
+    active = ~status.in_(INACTIVE_STATUSES)
+
+    query = select(
+        func.grouping(Item.category, Item.branch_id, Item.write_off_reason).label("grouping"),
+        Item.category,
+        Item.branch_id,
+        models.Branch.name.label("branch_name"),
+        Item.write_off_reason,
+        func.count(Item.id).filter(pending).label("pending_count"),
+        func.sum(Item.invoice_value).filter(pending).label("pending_value"),
+        func.count(Item.id).filter(status == models.ItemStatus.WRITE_OFF_PENDING).label("write_off_count"),
+        func.count(Item.id).filter(active).label("active_count"),
+        func.count(Item.id).filter(written_off).label("written_off_count"),
+        func.sum(Item.invoice_value).filter(written_off).label("written_off_value"),
+    ).select_from(Item).outerjoin(models.Branch, Item.branch_id == models.Branch.id)
+
+    conditions = item_date_filters(purchase_date_from, purchase_date_to, created_at_from, created_at_to)
+    if allowed_branch_ids is not None:
+        # Sem filiais permitidas o filtro vazio não retorna nada
+        conditions.append(Item.branch_id.in_(allowed_branch_ids))
+    if conditions:
+        query = query.where(and_(*conditions))
+
+    query = query.group_by(func.grouping_sets(
+        tuple_(),
+        tuple_(Item.category),
+        tuple_(Item.branch_id, models.Branch.name),
+        tuple_(Item.write_off_reason),
+    ))
+
+    stats = {
+        "pending_items_count": 0,
+        "pending_items_value": 0.0,
+        "write_off_count": 0,
+        "items_by_category": [],
+        "items_by_branch": [],
+        "write_offs_by_reason": []
+    }
+
+    result = await db.execute(query)
+    for row in result.all():
+        if row.grouping == _TOTALS:
+            stats["pending_items_count"] = row.pending_count
+            stats["pending_items_value"] = row.pending_value or 0.0
+            stats["write_off_count"] = row.write_off_count
+        elif row.grouping == _BY_CATEGORY and row.active_count:
+            stats["items_by_category"].append({"category": row.category, "count": row.active_count})
+        elif row.grouping == _BY_BRANCH and row.active_count and row.branch_name is not None:
+            stats["items_by_branch"].append({"branch_id": row.branch_id, "branch": row.branch_name, "count": row.active_count})
+        elif row.grouping == _BY_REASON and row.written_off_count:
+            stats["write_offs_by_reason"].append({
+                "reason": row.write_off_reason or "Não especificado",
+                "count": row.written_off_count,
+                "value": row.written_off_value or 0.0
+            })
+
+    return stats
+
+
+# --- Generic aggregation for the dashboard widgets ---
+
+# dimension -> (key column, label column or None, lookup model joined for the label)
+AGGREGATE_DIMENSIONS = {
+    "branch": (models.Item.branch_id, models.Branch.name, models.Branch),
+    "category": (models.Item.category_id, models.Category.name, models.Category),
+    "cost_center": (models.Item.cost_center_id, models.CostCenter.name, models.CostCenter),
+    "sector": (models.Item.sector_id, models.Sector.name, models.Sector),
+    "supplier": (models.Item.supplier_id, models.Supplier.name, models.Supplier),
+    "status": (models.Item.status, None, None),
+    # Literal arguments keep the SELECT and GROUP BY expressions identical (no bind parameters)
+    "purchase_month": (func.to_char(func.date_trunc(literal_column("'month'"), models.Item.purchase_date), literal_column("'YYYY-MM'")), None, None),
+}
+
+AGGREGATE_METRICS = {
+    "count": lambda: func.count(models.Item.id),
+    "sum_invoice_value": lambda: func.coalesce(func.sum(models.Item.invoice_value), 0.0),
+    "avg_invoice_value": lambda: func.avg(models.Item.invoice_value),
+    # Net book value at the end of the last closed depreciation month (see backend/depreciation.py)
+    "sum_book_value": lambda: func.coalesce(func.sum(depreciation.current_book_value()), 0.0),
+    "count_zero_book_value": lambda: func.count(case((depreciation.current_book_value() <= 0, models.Item.id))),
+}
+
+# Metrics that need the items joined to their latest depreciation entry
+_BOOK_VALUE_METRICS = {"sum_book_value", "count_zero_book_value"}
+
+# Same dimensions/metrics served from the inventory_rollup buckets (see backend/rollup.py)
+ROLLUP_DIMENSIONS = {
+    "branch": (models.InventoryRollup.branch_id, models.Branch.name, models.Branch),
+    "category": (models.InventoryRollup.category_id, models.Category.name, models.Category),
+    "cost_center": (models.InventoryRollup.cost_center_id, models.CostCenter.name, models.CostCenter),
+    "status": (models.InventoryRollup.status, None, None),
+}
+
+ROLLUP_METRICS = {
+    "count": lambda: func.coalesce(func.sum(models.InventoryRollup.item_count), 0),
+    "sum_invoice_value": lambda: func.coalesce(func.sum(models.InventoryRollup.total_value), 0),
+    "avg_invoice_value": lambda: func.sum(models.InventoryRollup.total_value) / func.nullif(func.sum(models.InventoryRollup.item_count), 0),
+}
+
+_ROLLUP_LIST_FILTERS = {
+    "statuses": models.InventoryRollup.status,
+    "branch_ids": models.InventoryRollup.branch_id,
+    "category_ids": models.InventoryRollup.category_id,
+    "cost_center_ids": models.InventoryRollup.cost_center_id,
+}
+
+# list filter -> column
+_AGGREGATE_LIST_FILTERS = {
+    "statuses": models.Item.status,
+    "branch_ids": models.Item.branch_id,
+    "category_ids": models.Item.category_id,
+    "cost_center_ids": models.Item.cost_center_id,
+    "sector_ids": models.Item.sector_id,
+    "supplier_ids": models.Item.supplier_id,
+}
+
+
+async def get_dashboard_aggregate(
+    db: AsyncSession,
+    group_by: list[str] = None,
+    metrics: list[str] = None,
+    allowed_branch_ids: list[int] = None,
+    statuses: list[str] = None,
+    branch_ids: list[int] = None,
+    category_ids: list[int] = None,
+    cost_center_ids: list[int] = None,
+    sector_ids: list[int] = None,
+    supplier_ids: list[int] = None,
+    search: str = None,
+    purchase_date_from: date = None,
+    purchase_date_to: date = None,
+    created_at_from: date = None,
+    created_at_to: date = None
+) -> list[dict]:
+    """
+    Aggregated buckets for the dashboard widgets, computed in SQL.
+    Each bucket holds one key per dimension (plus "<dimension>_label" for the
+    lookup dimensions) and one value per metric.
+    Served from inventory_rollup (O(buckets)) when the request only involves
+    branch/category/cost center/status and no branch scope; from items otherwise.
+    Raises ValueError for unknown dimensions or metrics.
+    """
+    group_by = list(dict.fromkeys(group_by or []))
+    metrics = list(dict.fromkeys(metrics or ["count"]))
+
+    unknown = [d for d in group_by if d not in AGGREGATE_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Dimensão inválida: {', '.join(unknown)}")
+    unknown = [m for m in metrics if m not in AGGREGATE_METRICS]
+    if unknown:
+        raise ValueError(f"Métrica inválida: {', '.join(unknown)}")
+
+    list_filters = dict(statuses=statuses, branch_ids=branch_ids, category_ids=category_ids,
+                        cost_center_ids=cost_center_ids, sector_ids=sector_ids, supplier_ids=supplier_ids)
+    active_filters = {name: values for name, values in list_filters.items() if values}
+
+    # The rollup holds every bucket the request can be answered from, unless it needs
+    # item-level columns (search, dates, sector, supplier) or the in-transit scope rule
+    use_rollup = (
+        allowed_branch_ids is None
+        and not (search or purchase_date_from or purchase_date_to or created_at_from or created_at_to)
+        and all(d in ROLLUP_DIMENSIONS for d in group_by)
+        and all(f in _ROLLUP_LIST_FILTERS for f in active_filters)
+        and all(m in ROLLUP_METRICS for m in metrics)
+    )
+    if use_rollup:
+        source, dimensions, metric_columns, filter_columns = (
+            models.InventoryRollup, ROLLUP_DIMENSIONS, ROLLUP_METRICS, _ROLLUP_LIST_FILTERS
+        )
+    else:
+        source, dimensions, metric_columns, filter_columns = (
+            models.Item, AGGREGATE_DIMENSIONS, AGGREGATE_METRICS, _AGGREGATE_LIST_FILTERS
+        )
+
+    columns = []
+    group_columns = []
+    query_joins = []
+    for dim in group_by:
+        key, label, lookup = dimensions[dim]
+        columns.append(key.label(dim))
+        group_columns.append(key)
+        if label is not None:
+            columns.append(label.label(f"{dim}_label"))
+            group_columns.append(label)
+            query_joins.append((lookup, key == lookup.id))
+    for metric in metrics:
+        columns.append(metric_columns[metric]().label(metric))
+
+    query = select(*columns).select_from(source)
+    if not use_rollup and _BOOK_VALUE_METRICS.intersection(metrics):
+        Entry = models.DepreciationEntry
+        query = query.outerjoin(
+            Entry, and_(Entry.item_id == models.Item.id, Entry.period == depreciation.latest_period_subquery())
+        )
+    for lookup, on in query_joins:
+        query = query.outerjoin(lookup, on)
+
+    for name, values in active_filters.items():
+        query = query.where(filter_columns[name].in_(values))
+
+    if use_rollup:
+        if group_columns:
+            # Buckets emptied by moves stay in the rollup with zero items until reconciled
+            query = query.having(func.sum(models.InventoryRollup.item_count) > 0)
+    else:
+        query = apply_item_filters(
+            query, search=search, allowed_branch_ids=allowed_branch_ids,
+            purchase_date_from=purchase_date_from, purchase_date_to=purchase_date_to,
+            created_at_from=created_at_from, created_at_to=created_at_to
+        )
+
+    if group_columns:
+        query = query.group_by(*group_columns).order_by(*group_columns)
+
+    result = await db.execute(query)
+    buckets = []
+    for row in result.mappings().all():
+        bucket = dict(row)
+        if "status" in bucket and bucket["status"] is not None:
+            bucket["status"] = bucket["status"].value
+        for metric in ("sum_invoice_value", "avg_invoice_value", "sum_book_value"):
+            # Numeric from the rollup / avg() come back as Decimal
+            if bucket.get(metric) is not None:
+                bucket[metric] = float(bucket[metric])
+        buckets.append(bucket)
+    return buckets
+
+
+# Orders of the dashboard item lists
+DASHBOARD_ITEM_ORDERS = {
+    "book_value": lambda: depreciation.current_book_value().desc(),
+    "recent": lambda: models.Item.id.desc(),
+}
+
+
+async def get_dashboard_items(
+    db: AsyncSession,
+    order: str = "book_value",
+    limit: int = 10,
+    allowed_branch_ids: list[int] = None,
+    statuses: list[str] = None,
+    branch_ids: list[int] = None,
+    category_ids: list[int] = None,
+    search: str = None,
+    purchase_date_from: date = None,
+    purchase_date_to: date = None
+) -> list:
+    """
+    The first `limit` items in `order` (highest book value, most recent) for the
+    dashboard lists, with the same filters as get_dashboard_aggregate.
+    Raises ValueError for unknown orders.
+    """
+    if order not in DASHBOARD_ITEM_ORDERS:
+        raise ValueError(f"Ordenação inválida: {order}")
+
+    query = select(models.Item).options(*loaders.loader_profile("item-list"))
+    if order == "book_value":
+        Entry = models.DepreciationEntry
+        query = query.outerjoin(
+            Entry, and_(Entry.item_id == models.Item.id, Entry.period == depreciation.latest_period_subquery())
+        )
+    list_filters = dict(statuses=statuses, branch_ids=branch_ids, category_ids=category_ids)
+    for name, values in list_filters.items():
+        if values:
+            query = query.where(_AGGREGATE_LIST_FILTERS[name].in_(values))
+    query = apply_item_filters(
+        query, search=search, allowed_branch_ids=allowed_branch_ids,
+        purchase_date_from=purchase_date_from, purchase_date_to=purchase_date_to
+    )
+    query = query.order_by(DASHBOARD_ITEM_ORDERS[order](), models.Item.id.desc()).limit(limit)
+
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+# --- Daily snapshots / trends ---
+
+async def take_inventory_snapshot(db: AsyncSession, snapshot_date: date = None) -> int:
+    """
+    Copies the rollup, folded to (branch, category, status), into inventory_snapshots
+    for `snapshot_date` (today by default). Re-running on the same day replaces that day.
+    Returns the number of buckets written.
+    """
+    snapshot_date = snapshot_date or date.today()
+    Rollup = models.InventoryRollup
+    Snapshot = models.InventorySnapshot
+
+    buckets = select(
+        literal(snapshot_date, Date()), Rollup.branch_id, Rollup.category_id, Rollup.status,
+        func.sum(Rollup.item_count), func.sum(Rollup.total_value)
+    ).group_by(
+        Rollup.branch_id, Rollup.category_id, Rollup.status
+    ).having(func.sum(Rollup.item_count) > 0)
+
+    await db.execute(delete(Snapshot).where(Snapshot.snapshot_date == snapshot_date))
+    result = await db.execute(insert(Snapshot).from_select(
+        ["snapshot_date", "branch_id", "category_id", "status", "item_count", "total_value"], buckets
+    ))
+    await db.commit()
+    return result.rowcount
+
+
+TREND_DIMENSIONS = {
+    "branch": (models.InventorySnapshot.branch_id, models.Branch.name, models.Branch),
+    "category": (models.InventorySnapshot.category_id, models.Category.name, models.Category),
+    "status": (models.InventorySnapshot.status, None, None),
+}
+
+
+async def get_inventory_trends(
+    db: AsyncSession,
+    months: int = 12,
+    group_by: list[str] = None,
+    allowed_branch_ids: list[int] = None,
+    statuses: list[str] = None,
+    branch_ids: list[int] = None,
+    category_ids: list[int] = None
+) -> list[dict]:
+    """
+    Month-over-month series from inventory_snapshots: for each of the last `months`
+    months, the buckets of the last snapshot taken in that month (the current month
+    uses the latest snapshot). Points are ordered by month.
+    Raises ValueError for unknown dimensions.
+    """
+    group_by = list(dict.fromkeys(group_by or []))
+    unknown = [d for d in group_by if d not in TREND_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Dimensão inválida: {', '.join(unknown)}")
+
+    Snapshot = models.InventorySnapshot
+    start = date.today().replace(day=1) - relativedelta(months=months - 1)
+    month_ends = select(func.max(Snapshot.snapshot_date)).where(
+        Snapshot.snapshot_date >= start
+    ).group_by(func.date_trunc(literal_column("'month'"), Snapshot.snapshot_date))
+
+    columns = [Snapshot.snapshot_date]
+    group_columns = [Snapshot.snapshot_date]
+    query_joins = []
+    for dim in group_by:
+        key, label, lookup = TREND_DIMENSIONS[dim]
+        columns.append(key.label(dim))
+        group_columns.append(key)
+        if label is not None:
+            columns.append(label.label(f"{dim}_label"))
+            group_columns.append(label)
+            query_joins.append((lookup, key == lookup.id))
+
+    query = select(
+        *columns,
+        func.sum(Snapshot.item_count).label("count"),
+        func.sum(Snapshot.total_value).label("total_value"),
+    ).select_from(Snapshot)
+    for lookup, on in query_joins:
+        query = query.outerjoin(lookup, on)
+
+    query = query.where(Snapshot.snapshot_date.in_(month_ends))
+    if allowed_branch_ids is not None:
+        query = query.where(Snapshot.branch_id.in_(allowed_branch_ids))
+    if statuses:
+        query = query.where(Snapshot.status.in_(statuses))
+    if branch_ids:
+        query = query.where(Snapshot.branch_id.in_(branch_ids))
+    if category_ids:
+        query = query.where(Snapshot.category_id.in_(category_ids))
+
+    query = query.group_by(*group_columns).order_by(*group_columns)
+
+    result = await db.execute(query)
+    points = []
+    for row in result.mappings().all():
+        point = dict(row)
+        snapshot_date = point.pop("snapshot_date")
+        point = {"month": snapshot_date.strftime("%Y-%m"), "snapshot_date": snapshot_date.isoformat(), **point}
+        if "status" in point and point["status"] is not None:
+            point["status"] = point["status"].value
+        point["total_value"] = float(point["total_value"] or 0)
+        points.append(point)
+    return points
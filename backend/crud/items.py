@@ -1,25 +1,22 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload, noload
-from sqlalchemy import or_, cast, String
+from sqlalchemy import or_, and_, cast, String, func
 from backend import models, schemas
 from backend.auth import get_password_hash
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
 from backend.audit import calculate_diff
+from backend import search as item_search
+from backend import loaders
+from backend import depreciation
+import base64
+import json
 
 async def get_items_by_ids(db: AsyncSession, item_ids: list[int]):
     """Fetch items by a list of IDs."""
     if not item_ids:
         return []
-    query = select(models.Item).options(
-        joinedload(models.Item.branch),
-        joinedload(models.Item.transfer_target_branch),
-        joinedload(models.Item.category_rel),
-        joinedload(models.Item.supplier),
-        joinedload(models.Item.responsible),
-        joinedload(models.Item.cost_center),
-        joinedload(models.Item.sector)
-    ).where(models.Item.id.in_(item_ids))
+    query = select(models.Item).options(*loaders.ITEM_LIST).where(models.Item.id.in_(item_ids))
     result = await db.execute(query)
     return result.scalars().all()
 
@@ -30,14 +27,7 @@ async def get_pending_action_items(db: AsyncSession, user_id: int, user_branches
     1. IN_TRANSIT where target branch is in user_branches.
     2. READY_FOR_WRITE_OFF where responsible is user OR branch in user_branches.
     """
-    query = select(models.Item).options(
-        joinedload(models.Item.branch),
-        joinedload(models.Item.transfer_target_branch),
-        joinedload(models.Item.category_rel),
-        joinedload(models.Item.responsible),
-        joinedload(models.Item.cost_center),
-        joinedload(models.Item.sector)
-    ).where(
+    query = select(models.Item).options(*loaders.ITEM_LIST).where(
         or_(
             (models.Item.status == models.ItemStatus.IN_TRANSIT) & (models.Item.transfer_target_branch_id.in_(user_branches)),
             (models.Item.status == models.ItemStatus.READY_FOR_WRITE_OFF) & (
@@ -49,6 +39,22 @@ async def get_pending_action_items(db: AsyncSession, user_id: int, user_branches
     return result.scalars().all()
 
 
+def encode_item_cursor(item_id: int) -> str:
+    """Builds the opaque cursor pointing right after the given item id."""
+    raw = json.dumps({"id": item_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_item_cursor(cursor: str) -> int:
+    """Reverses encode_item_cursor. Raises ValueError on malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data["id"])
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
 async def get_items(
     db: AsyncSession,
     skip: int = 0,
@@ -60,20 +66,292 @@ async def get_items(
     allowed_branch_ids: list[int] = None,
     description: str = None,
     fixed_asset_number: str = None,
-    purchase_date: str = None
+    purchase_date: str = None,
+    purchase_date_from: date = None,
+    purchase_date_to: date = None,
+    created_at_from: date = None,
+    created_at_to: date = None,
+    after_id: int = None
 ):
-    from sqlalchemy.orm import joinedload, noload
-    # Use joinedload for single-item relationships to avoid N+1 queries effectively
-    # and reduce "loader depth" complexity warning from recursive selectinloads.
-    query = select(models.Item).options(
-        joinedload(models.Item.branch).options(noload(models.Branch.items)),
-        joinedload(models.Item.transfer_target_branch),
-        joinedload(models.Item.category_rel).options(noload(models.Category.items)),
-        joinedload(models.Item.supplier).options(noload(models.Supplier.items)),
-        joinedload(models.Item.responsible).options(noload(models.User.items_responsible), noload(models.User.branches)),
-        joinedload(models.Item.cost_center).options(noload(models.CostCenter.items)),
-        joinedload(models.Item.sector).options(noload(models.Sector.items))
+    """
+    Lists items applying the inventory filters.
+    When `after_id` is given the page is read by keyset (id > after_id ORDER BY id),
+    so deep pages cost the same as the first one; otherwise skip/limit is used.
+    """
+    query = select(models.Item).options(*loaders.ITEM_LIST)
+    query = apply_item_filters(
+        query, status=status, category=category, branch_id=branch_id, search=search,
+        allowed_branch_ids=allowed_branch_ids, description=description,
+        fixed_asset_number=fixed_asset_number, purchase_date=purchase_date,
+        purchase_date_from=purchase_date_from, purchase_date_to=purchase_date_to,
+        created_at_from=created_at_from, created_at_to=created_at_to
+    )
+
+    query = _paginate_items(query, skip=skip, limit=limit, search=search, after_id=after_id)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+def _paginate_items(query, skip: int = 0, limit: int = 100, search: str = None, after_id: int = None):
+    if after_id is not None:
+        return query.where(models.Item.id > after_id).order_by(models.Item.id).limit(limit)
+    rank = item_search.item_search_rank(search) if search else None
+    if rank is not None:
+        # Best matches first; id keeps the order stable between pages
+        query = query.order_by(rank.desc(), models.Item.id)
+    return query.offset(skip).limit(limit)
+
+
+async def count_items(db: AsyncSession, **filters) -> int:
+    """Number of items matching the get_items filters."""
+    query = apply_item_filters(select(func.count(models.Item.id)), **filters)
+    result = await db.execute(query)
+    return result.scalar_one()
+
+
+async def stream_item_rows(
+    db: AsyncSession,
+    query,
+    skip: int = 0,
+    limit: int = None,
+    chunk_size: int = 1000,
+    order_by: list = None,
+    **filters
+):
+    """
+    Yields chunks of plain column tuples from `query` (a select of item columns),
+    read through a server-side cursor: no ORM objects, no relationship loading.
+    Accepts the same filters as get_items; limit=None returns every match.
+    Rows come ordered by id (by relevance when searching) unless `order_by` is given.
+    """
+    query = apply_item_filters(query, **filters)
+    if order_by:
+        query = query.order_by(*order_by).offset(skip).limit(limit)
+    else:
+        if not filters.get("search"):
+            query = query.order_by(models.Item.id)
+        query = _paginate_items(query, skip=skip, limit=limit, search=filters.get("search"))
+
+    result = await db.stream(query.execution_options(yield_per=chunk_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+def stream_items_for_sap(db: AsyncSession, **kwargs):
+    """Column tuples for the SAP export (see stream_item_rows)."""
+    query = select(
+        models.Item.description,
+        models.Item.invoice_number,
+        models.Item.fixed_asset_number,
+        models.Item.purchase_date,
+        models.Item.invoice_value,
+        models.Item.category,
+        models.Category.asset_class,
+        models.CostCenter.code.label("cost_center_code"),
+        models.Supplier.name.label("supplier_name"),
+    ).select_from(models.Item).outerjoin(
+        models.Category, models.Item.category_id == models.Category.id
+    ).outerjoin(
+        models.CostCenter, models.Item.cost_center_id == models.CostCenter.id
+    ).outerjoin(
+        models.Supplier, models.Item.supplier_id == models.Supplier.id
+    )
+    return stream_item_rows(db, query, **kwargs)
+
+
+def stream_items_for_report(db: AsyncSession, **kwargs):
+    """Column tuples for the inventory Excel report (see stream_item_rows), with the book value of the last closed month."""
+    Entry = models.DepreciationEntry
+    query = select(
+        models.Item.id,
+        models.Item.description,
+        models.Item.category,
+        models.Item.purchase_date,
+        models.Item.invoice_value,
+        models.Item.status,
+        models.Item.branch_id,
+        depreciation.current_book_value(Entry),
+    ).select_from(models.Item).outerjoin(
+        Entry, and_(Entry.item_id == models.Item.id, Entry.period == depreciation.latest_period_subquery())
+    )
+    return stream_item_rows(db, query, **kwargs)
+
+
+# group -> (section key, section label) columns of the PDF report
+PDF_REPORT_GROUPS = {
+    "branch": (models.Item.branch_id, models.Branch.name),
+    "cost_center": (models.Item.cost_center_id, func.concat_ws(" - ", models.CostCenter.code, models.CostCenter.name)),
+}
+
+
+def stream_items_for_pdf(db: AsyncSession, group_by: str = None, **kwargs):
+    """
+    Column tuples for the PDF inventory report (see stream_item_rows), ordered by
+    section when `group_by` ("branch" or "cost_center") is given so each section
+    arrives contiguous. Raises ValueError for unknown groups.
+    """
+    if group_by and group_by not in PDF_REPORT_GROUPS:
+        raise ValueError(f"Agrupamento inválido: {group_by}")
+
+    query = select(
+        models.Item.id,
+        models.Item.fixed_asset_number,
+        models.Item.description,
+        models.Item.category,
+        models.Item.purchase_date,
+        models.Item.invoice_value,
+        models.Item.status,
+        models.Branch.name.label("branch_name"),
+        models.CostCenter.code.label("cost_center_code"),
+        models.CostCenter.name.label("cost_center_name"),
+    ).select_from(models.Item).outerjoin(
+        models.Branch, models.Item.branch_id == models.Branch.id
+    ).outerjoin(
+        models.CostCenter, models.Item.cost_center_id == models.CostCenter.id
     )
+
+    order_by = None
+    if group_by:
+        key, label = PDF_REPORT_GROUPS[group_by]
+        order_by = [label.asc().nulls_last(), key, models.Item.id]
+    return stream_item_rows(db, query, order_by=order_by, **kwargs)
+
+
+async def get_items_page(db: AsyncSession, cursor: str = None, limit: int = 100, **filters):
+    """
+    Keyset page of items. Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    after_id = decode_item_cursor(cursor) if cursor else 0
+    # Fetch one extra row to know whether another page exists
+    items = await get_items(db, limit=limit + 1, after_id=after_id, **filters)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_item_cursor(items[-1].id)
+    return items, next_cursor
+
+
+ITEM_SUMMARY_COLUMNS = (
+    models.Item.id,
+    models.Item.description,
+    models.Item.category,
+    models.Item.category_id,
+    models.Item.status,
+    models.Item.branch_id,
+    models.Item.transfer_target_branch_id,
+    models.Item.supplier_id,
+    models.Item.cost_center_id,
+    models.Item.sector_id,
+    models.Item.responsible_id,
+    models.Item.fixed_asset_number,
+    models.Item.serial_number,
+    models.Item.invoice_number,
+    models.Item.invoice_value,
+    models.Item.purchase_date,
+    models.Item.approval_step,
+    models.Item.created_at,
+)
+
+
+async def _get_lookup(db: AsyncSession, columns: tuple, ids: set) -> dict:
+    """Fetches {id: row} for the given ids; columns[0] must be the primary key."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    result = await db.execute(select(*columns).where(columns[0].in_(ids)))
+    return {row["id"]: dict(row) for row in result.mappings()}
+
+
+async def get_items_summary(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str = None, **filters):
+    """
+    Compact variant of get_items for list screens.
+    Selects only scalar item columns (no ORM entities, no joins) and returns the
+    branches/categories/suppliers/cost centers/sectors referenced by the page once
+    each, keyed by id. Supports the same filters and the keyset cursor.
+    """
+    after_id = None
+    if cursor is not None:
+        after_id = decode_item_cursor(cursor) if cursor else 0
+
+    query = apply_item_filters(select(*ITEM_SUMMARY_COLUMNS), **filters)
+    page_size = limit + 1 if after_id is not None else limit
+    query = _paginate_items(query, skip=skip, limit=page_size, search=filters.get("search"), after_id=after_id)
+    rows = [dict(row) for row in (await db.execute(query)).mappings()]
+
+    next_cursor = None
+    if after_id is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_item_cursor(rows[-1]["id"])
+
+    branches = await _get_lookup(
+        db, (models.Branch.id, models.Branch.name),
+        {r["branch_id"] for r in rows} | {r["transfer_target_branch_id"] for r in rows}
+    )
+    categories = await _get_lookup(
+        db, (models.Category.id, models.Category.name, models.Category.depreciation_months, models.Category.asset_class),
+        {r["category_id"] for r in rows}
+    )
+    suppliers = await _get_lookup(db, (models.Supplier.id, models.Supplier.name, models.Supplier.cnpj), {r["supplier_id"] for r in rows})
+    cost_centers = await _get_lookup(db, (models.CostCenter.id, models.CostCenter.code, models.CostCenter.name), {r["cost_center_id"] for r in rows})
+    sectors = await _get_lookup(db, (models.Sector.id, models.Sector.name), {r["sector_id"] for r in rows})
+
+    for row in rows:
+        category = categories.get(row["category_id"])
+        row["accounting_value"] = schemas.calculate_accounting_value(
+            row["invoice_value"], row["purchase_date"], category["depreciation_months"] if category else None
+        )
+
+    return {
+        "items": rows,
+        "branches": branches,
+        "categories": categories,
+        "suppliers": suppliers,
+        "cost_centers": cost_centers,
+        "sectors": sectors,
+        "next_cursor": next_cursor,
+    }
+
+
+def item_date_filters(
+    purchase_date_from: date = None,
+    purchase_date_to: date = None,
+    created_at_from: date = None,
+    created_at_to: date = None
+) -> list:
+    """
+    Range predicates over purchase_date / created_at (both bounds inclusive, by day).
+    Written as plain comparisons so the btree indexes on those columns are used.
+    """
+    clauses = []
+    # purchase_date is a naive timestamp
+    if purchase_date_from:
+        clauses.append(models.Item.purchase_date >= datetime.combine(purchase_date_from, time.min))
+    if purchase_date_to:
+        clauses.append(models.Item.purchase_date < datetime.combine(purchase_date_to + timedelta(days=1), time.min))
+    # created_at is timezone aware; bounds are interpreted in the server timezone
+    if created_at_from:
+        clauses.append(models.Item.created_at >= datetime.combine(created_at_from, time.min).astimezone())
+    if created_at_to:
+        clauses.append(models.Item.created_at < datetime.combine(created_at_to + timedelta(days=1), time.min).astimezone())
+    return clauses
+
+
+def apply_item_filters(
+    query,
+    status: str = None,
+    category: str = None,
+    branch_id: int = None,
+    search: str = None,
+    allowed_branch_ids: list[int] = None,
+    description: str = None,
+    fixed_asset_number: str = None,
+    purchase_date: str = None,
+    purchase_date_from: date = None,
+    purchase_date_to: date = None,
+    created_at_from: date = None,
+    created_at_to: date = None
+):
+    """Applies the /items/ filter set to any select() over models.Item."""
     if status:
         query = query.where(models.Item.status == status)
     if category:
@@ -93,37 +371,31 @@ async def get_items(
                 )
             )
 
-    # Specific column filters
+    # Specific column filters (trigram / full-text indexes, see backend/search.py)
     if description:
-        query = query.where(models.Item.description.ilike(f"%{description}%"))
+        query = query.where(item_search.description_filter(description))
     if fixed_asset_number:
-        query = query.where(models.Item.fixed_asset_number.ilike(f"%{fixed_asset_number}%"))
+        query = query.where(item_search.fixed_asset_number_filter(fixed_asset_number))
     if purchase_date:
-        query = query.where(cast(models.Item.purchase_date, String).ilike(f"%{purchase_date}%"))
+        # Legacy single-day filter (the Inventory date input sends YYYY-MM-DD)
+        try:
+            day = date.fromisoformat(purchase_date)
+            purchase_date_from = max(purchase_date_from, day) if purchase_date_from else day
+            purchase_date_to = min(purchase_date_to, day) if purchase_date_to else day
+        except ValueError:
+            query = query.where(cast(models.Item.purchase_date, String).ilike(f"%{purchase_date}%"))
+
+    date_filters = item_date_filters(purchase_date_from, purchase_date_to, created_at_from, created_at_to)
+    if date_filters:
+        query = query.where(*date_filters)
 
     if search:
-        search_filter = f"%{search}%"
-        query = query.where(
-            (models.Item.description.ilike(search_filter)) |
-            (models.Item.serial_number.ilike(search_filter)) |
-            (models.Item.invoice_number.ilike(search_filter)) |
-            (models.Item.fixed_asset_number.ilike(search_filter))
-        )
-
-    result = await db.execute(query.offset(skip).limit(limit))
-    return result.scalars().all()
+        query = query.where(item_search.item_search_filter(search))
+    return query
 
 
-async def get_item(db: AsyncSession, item_id: int):
-    query = select(models.Item).where(models.Item.id == item_id).options(
-        joinedload(models.Item.branch),
-        joinedload(models.Item.transfer_target_branch),
-        joinedload(models.Item.category_rel),
-        joinedload(models.Item.supplier),
-        joinedload(models.Item.responsible),
-        joinedload(models.Item.cost_center),
-        joinedload(models.Item.sector)
-    )
+async def get_item(db: AsyncSession, item_id: int, profile: str = "item-list"):
+    query = select(models.Item).where(models.Item.id == item_id).options(*loaders.loader_profile(profile))
     result = await db.execute(query)
     return result.scalars().first()
 
@@ -161,15 +433,7 @@ async def create_item(db: AsyncSession, item: schemas.ItemCreate, action_log: st
     db.add(log)
     await db.commit()
     # Eager load relationships for Pydantic serialization
-    query = select(models.Item).where(models.Item.id == db_item.id).options(
-        joinedload(models.Item.branch).options(noload(models.Branch.items)),
-        joinedload(models.Item.transfer_target_branch),
-        joinedload(models.Item.category_rel).options(noload(models.Category.items)),
-        joinedload(models.Item.supplier).options(noload(models.Supplier.items)),
-        joinedload(models.Item.responsible).options(noload(models.User.items_responsible), noload(models.User.branches)),
-        joinedload(models.Item.cost_center).options(noload(models.CostCenter.items)),
-        joinedload(models.Item.sector).options(noload(models.Sector.items))
-    )
+    query = select(models.Item).where(models.Item.id == db_item.id).options(*loaders.ITEM_LIST)
     result = await db.execute(query)
     return result.scalars().first()
 
@@ -180,14 +444,7 @@ async def get_item_by_fixed_asset(db: AsyncSession, fixed_asset_number: str, exc
     if exclude_item_id:
         query = query.where(models.Item.id != exclude_item_id)
 
-    query = query.options(
-        joinedload(models.Item.branch),
-        joinedload(models.Item.category_rel),
-        joinedload(models.Item.supplier),
-        joinedload(models.Item.responsible),
-        joinedload(models.Item.cost_center),
-        joinedload(models.Item.sector)
-    )
+    query = query.options(*loaders.ITEM_LIST)
     result = await db.execute(query)
     return result.scalars().first()
 
@@ -262,15 +519,7 @@ async def update_item_status(db: AsyncSession, item_id: int, status: models.Item
         await db.commit()
 
         # Reload item with relationships to prevent MissingGreenlet
-        query = select(models.Item).where(models.Item.id == item_id).options(
-            joinedload(models.Item.branch).options(noload(models.Branch.items)),
-            joinedload(models.Item.transfer_target_branch),
-            joinedload(models.Item.category_rel).options(noload(models.Category.items)),
-            joinedload(models.Item.supplier).options(noload(models.Supplier.items)),
-            joinedload(models.Item.responsible).options(noload(models.User.items_responsible), noload(models.User.branches)),
-            joinedload(models.Item.cost_center).options(noload(models.CostCenter.items)),
-            joinedload(models.Item.sector).options(noload(models.Sector.items))
-        )
+        query = select(models.Item).where(models.Item.id == item_id).options(*loaders.ITEM_LIST)
         result = await db.execute(query)
         db_item = result.scalars().first()
 
@@ -292,15 +541,7 @@ async def request_write_off(db: AsyncSession, item_id: int, justification: str,
         await db.commit()
 
         # Reload with relationships
-        query = select(models.Item).where(models.Item.id == item_id).options(
-            joinedload(models.Item.branch).options(noload(models.Branch.items)),
-            joinedload(models.Item.transfer_target_branch),
-            joinedload(models.Item.category_rel).options(noload(models.Category.items)),
-            joinedload(models.Item.supplier).options(noload(models.Supplier.items)),
-            joinedload(models.Item.responsible).options(noload(models.User.items_responsible), noload(models.User.branches)),
-            joinedload(models.Item.cost_center).options(noload(models.CostCenter.items)),
-            joinedload(models.Item.sector).options(noload(models.Sector.items))
-        )
+        query = select(models.Item).where(models.Item.id == item_id).options(*loaders.ITEM_LIST)
         result = await db.execute(query)
         db_item = result.scalars().first()
 
@@ -342,15 +583,7 @@ async def update_item(db: AsyncSession, item_id: int, item: schemas.ItemUpdate):
         await db.commit()
 
         # Reload with relationships
-        query = select(models.Item).where(models.Item.id == item_id).options(
-            joinedload(models.Item.branch).options(noload(models.Branch.items)),
-            joinedload(models.Item.transfer_target_branch),
-            joinedload(models.Item.category_rel).options(noload(models.Category.items)),
-            joinedload(models.Item.supplier).options(noload(models.Supplier.items)),
-            joinedload(models.Item.responsible).options(noload(models.User.items_responsible), noload(models.User.branches)),
-            joinedload(models.Item.cost_center).options(noload(models.CostCenter.items)),
-            joinedload(models.Item.sector).options(noload(models.Sector.items))
-        )
+        query = select(models.Item).where(models.Item.id == item_id).options(*loaders.ITEM_LIST)
         result = await db.execute(query)
         db_item = result.scalars().first()
 
@@ -381,15 +614,7 @@ async def request_transfer(db: AsyncSession, item_id: int, target_branch_id: int
         await db.commit()
 
         # Reload with relationships
-        query = select(models.Item).where(models.Item.id == item_id).options(
-            joinedload(models.Item.branch).options(noload(models.Branch.items)),
-            joinedload(models.Item.transfer_target_branch),
-            joinedload(models.Item.category_rel).options(noload(models.Category.items)),
-            joinedload(models.Item.supplier).options(noload(models.Supplier.items)),
-            joinedload(models.Item.responsible).options(noload(models.User.items_responsible), noload(models.User.branches)),
-            joinedload(models.Item.cost_center).options(noload(models.CostCenter.items)),
-            joinedload(models.Item.sector).options(noload(models.Sector.items))
-        )
+        query = select(models.Item).where(models.Item.id == item_id).options(*loaders.ITEM_LIST)
         result = await db.execute(query)
         db_item = result.scalars().first()
 
@@ -6,6 +6,7 @@ from backend import models, schemas
 from backend.auth import get_password_hash
 from datetime import datetime
 from backend.audit import calculate_diff
+from backend import loaders
 
 async def get_system_settings(db: AsyncSession):
     result = await db.execute(select(models.SystemSetting))
@@ -30,10 +31,7 @@ async def update_system_setting(db: AsyncSession, key: str, value: str):
 
 
 async def get_all_logs(db: AsyncSession, limit: int = 1000):
-    query = select(models.Log).options(
-        joinedload(models.Log.user),
-        joinedload(models.Log.item)
-    ).order_by(models.Log.timestamp.desc()).limit(limit)
+    query = select(models.Log).options(*loaders.LOG_LIST).order_by(models.Log.timestamp.desc()).limit(limit)
     result = await db.execute(query)
     return result.scalars().all()
 
@@ -3,22 +3,20 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload, noload
 from sqlalchemy import or_, cast, String
 from backend import models, schemas
-from backend.auth import get_password_hash
+from backend.auth import get_password_hash, invalidate_principal, invalidate_all_principals
 from datetime import datetime
 from backend.audit import calculate_diff
+from backend import loaders
 
 async def get_user_by_email(db: AsyncSession, email: str):
-    result = await db.execute(select(models.User).where(models.User.email.ilike(email)))
+    result = await db.execute(select(models.User).options(*loaders.USER).where(models.User.email.ilike(email)))
     return result.scalars().first()
 
 
 async def get_user(db: AsyncSession, user_id: int):
     result = await db.execute(
         select(models.User)
-        .options(
-            selectinload(models.User.branches).options(noload(models.Branch.users)),
-            joinedload(models.User.branch)
-        )
+        .options(*loaders.USER)
         .where(models.User.id == user_id)
     )
     return result.scalars().first()
@@ -47,17 +45,12 @@ async def create_user(db: AsyncSession, user: schemas.UserCreate):
 
     db.add(db_user)
     await db.commit()
-    await db.refresh(db_user)
-    return db_user
+    return await get_user(db, db_user.id)
 
 
 async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, search: str = None):
     # Eager load branches for UserResponse
-    query = select(models.User).options(
-        selectinload(models.User.branches).options(noload(models.Branch.users)),
-        joinedload(models.User.branch),
-        joinedload(models.User.group).options(noload(models.UserGroup.users))
-    )
+    query = select(models.User).options(*loaders.USER)
     if search:
         search_filter = f"%{search}%"
         query = query.where(
@@ -72,10 +65,7 @@ async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, search: s
 
 async def get_users_by_role(db: AsyncSession, roles: list[models.UserRole]):
     """Fetch users by a list of roles."""
-    query = select(models.User).options(
-        selectinload(models.User.branches).options(noload(models.Branch.users)),
-        joinedload(models.User.branch)
-    ).where(models.User.role.in_(roles))
+    query = select(models.User).options(*loaders.USER).where(models.User.role.in_(roles))
     result = await db.execute(query)
     return result.scalars().all()
 
@@ -83,10 +73,7 @@ async def get_users_by_role(db: AsyncSession, roles: list[models.UserRole]):
 async def update_user(db: AsyncSession, user_id: int, user: schemas.UserUpdate):
     result = await db.execute(
         select(models.User)
-        .options(
-            selectinload(models.User.branches).options(noload(models.Branch.users)),
-            joinedload(models.User.branch)
-        )
+        .options(*loaders.USER)
         .where(models.User.id == user_id)
     )
     db_user = result.scalars().first()
@@ -96,6 +83,7 @@ async def update_user(db: AsyncSession, user_id: int, user: schemas.UserUpdate):
         if user.branch_id is not None: db_user.branch_id = user.branch_id # Legacy update
         if user.all_branches is not None: db_user.all_branches = user.all_branches
         if user.can_import is not None: db_user.can_import = user.can_import
+        if user.email_digest: db_user.email_digest = user.email_digest
         if user.password:
             db_user.hashed_password = get_password_hash(user.password)
 
@@ -148,10 +136,11 @@ async def update_user(db: AsyncSession, user_id: int, user: schemas.UserUpdate):
             db_user.group_id = update_data['group_id']
 
         await db.commit()
+        await invalidate_principal(db_user.email)
         # Reload user to ensure clean state and avoid async refresh issues
         result = await db.execute(
             select(models.User)
-            .options(selectinload(models.User.branches), joinedload(models.User.branch))
+            .options(*loaders.USER)
             .where(models.User.id == user_id)
         )
         db_user = result.scalars().first()
@@ -164,6 +153,7 @@ async def delete_user(db: AsyncSession, user_id: int):
     if db_user:
         await db.delete(db_user)
         await db.commit()
+        await invalidate_principal(db_user.email)
         return True
     return False
 
@@ -208,6 +198,8 @@ async def delete_user_group(db: AsyncSession, group_id: int):
     if db_group:
         await db.delete(db_group)
         await db.commit()
+        # Members lose their group_id
+        await invalidate_all_principals()
         return True
     return False
 
@@ -6,13 +6,10 @@ from backend import models, schemas
 from backend.auth import get_password_hash
 from datetime import datetime
 from backend.audit import calculate_diff
+from backend import loaders
 
 async def get_approval_workflows(db: AsyncSession, category_id: int = None):
-    query = select(models.ApprovalWorkflow).options(
-        joinedload(models.ApprovalWorkflow.category).options(noload(models.Category.items), noload(models.Category.requests)),
-        joinedload(models.ApprovalWorkflow.required_user).options(noload(models.User.branches), noload(models.User.requests)),
-        joinedload(models.ApprovalWorkflow.required_group).options(noload(models.UserGroup.users))
-    )
+    query = select(models.ApprovalWorkflow).options(*loaders.WORKFLOW)
     if category_id:
         query = query.where(models.ApprovalWorkflow.category_id == category_id)
     result = await db.execute(query)
@@ -41,11 +38,7 @@ async def create_approval_workflow(db: AsyncSession, workflow: schemas.ApprovalW
     await db.commit()
     await db.refresh(db_workflow)
     # Reload relation
-    query = select(models.ApprovalWorkflow).where(models.ApprovalWorkflow.id == db_workflow.id).options(
-        joinedload(models.ApprovalWorkflow.category).options(noload(models.Category.items), noload(models.Category.requests)),
-        joinedload(models.ApprovalWorkflow.required_user).options(noload(models.User.branches), noload(models.User.requests)),
-        joinedload(models.ApprovalWorkflow.required_group).options(noload(models.UserGroup.users))
-    )
+    query = select(models.ApprovalWorkflow).where(models.ApprovalWorkflow.id == db_workflow.id).options(*loaders.WORKFLOW)
     result = await db.execute(query)
     return result.scalars().first()
 
@@ -73,11 +66,7 @@ async def update_approval_workflow(db: AsyncSession, workflow_id: int, workflow_
         await db.refresh(db_workflow)
 
         # Reload relation
-        query = select(models.ApprovalWorkflow).where(models.ApprovalWorkflow.id == db_workflow.id).options(
-            joinedload(models.ApprovalWorkflow.category).options(noload(models.Category.items), noload(models.Category.requests)),
-            joinedload(models.ApprovalWorkflow.required_user).options(noload(models.User.branches), noload(models.User.requests)),
-            joinedload(models.ApprovalWorkflow.required_group).options(noload(models.UserGroup.users))
-        )
+        query = select(models.ApprovalWorkflow).where(models.ApprovalWorkflow.id == db_workflow.id).options(*loaders.WORKFLOW)
         result = await db.execute(query)
         db_workflow = result.scalars().first()
 
@@ -0,0 +1,276 @@
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+import numpy as np
+from sqlalchemy import event, inspect, select, update, delete, text, func, and_, case, cast, Date, Float, Numeric
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend import models
+
+# --- Straight-line depreciation (depreciation_periods / depreciation_entries) ---
+# Each month is closed once: the values at the end of the month are computed for
+# every depreciable item at once, over NumPy arrays, and written to
+# depreciation_entries. Closed months are not recomputed; the next close starts
+# from the accumulated depreciation stored for the previous month, so backdated
+# items and value/lifetime changes are absorbed by the next period.
+#
+# Convention: the purchase month counts as a full month of use, the monthly
+# charge is invoice_value / depreciation_months and the last month takes the
+# rounding difference (book value reaches exactly 0). Items whose category has
+# no lifetime keep their invoice value.
+
+# Statuses that are not (or no longer) part of the fixed assets
+NON_DEPRECIABLE_STATUSES = [models.ItemStatus.PENDING, models.ItemStatus.REJECTED, models.ItemStatus.WRITTEN_OFF]
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def last_closable_period(today: date = None) -> date:
+    """The most recent month that has already ended."""
+    return month_start(today or date.today()) - relativedelta(months=1)
+
+
+def straight_line(purchase_months: np.ndarray, values: np.ndarray, lives: np.ndarray, period: date) -> tuple:
+    """
+    Accumulated depreciation and net book value at the end of `period`.
+    purchase_months: datetime64[M]; values: float; lives: months (0 = not depreciated).
+    Returns (accumulated, book_value), rounded to cents.
+    """
+    period_month = np.datetime64(period, "M")
+    # Months of use at the end of the period, the purchase month included
+    elapsed = (period_month - purchase_months).astype(np.int64) + 1
+    depreciable = lives > 0
+    safe_lives = np.where(depreciable, lives, 1)
+    used = np.clip(elapsed, 0, safe_lives)
+
+    accumulated = np.where(used >= safe_lives, values, np.round(values * used / safe_lives, 2))
+    accumulated = np.where(depreciable, accumulated, 0.0)
+    return accumulated, np.round(values - accumulated, 2)
+
+
+async def _load_period_items(db: AsyncSession, period: date) -> dict:
+    """Item arrays for the close of `period`, with the accumulated value stored for the previous month."""
+    Item = models.Item
+    previous = aliased(models.DepreciationEntry)
+    query = select(
+        Item.id,
+        func.date_trunc("month", Item.purchase_date).label("purchase_month"),
+        func.coalesce(Item.invoice_value, 0.0),
+        func.coalesce(models.Category.depreciation_months, 0),
+        func.coalesce(previous.accumulated, 0),
+    ).select_from(Item).outerjoin(
+        models.Category, Item.category_id == models.Category.id
+    ).outerjoin(
+        previous, and_(previous.item_id == Item.id, previous.period == period - relativedelta(months=1))
+    ).where(
+        Item.purchase_date.isnot(None),
+        Item.purchase_date < period + relativedelta(months=1),
+        Item.status.notin_(NON_DEPRECIABLE_STATUSES),
+    )
+
+    rows = (await db.execute(query)).all()
+    ids, purchase, values, lives, previous_accumulated = zip(*rows) if rows else ((),) * 5
+    return {
+        "ids": np.array(ids, dtype=np.int64),
+        "purchase_months": np.array(purchase, dtype="datetime64[M]"),
+        "values": np.array(values, dtype=np.float64),
+        "lives": np.array(lives, dtype=np.int64),
+        "previous_accumulated": np.array(previous_accumulated, dtype=np.float64),
+    }
+
+
+async def close_period(db: AsyncSession, period: date) -> dict:
+    """
+    Computes and stores the depreciation of every item for `period` (any day of
+    the month), replacing a previous close of the same month, and commits.
+    """
+    period = month_start(period)
+    # One close at a time: each one reads the previous month written by the other
+    await db.execute(text("LOCK TABLE depreciation_periods IN EXCLUSIVE MODE"))
+
+    items = await _load_period_items(db, period)
+    accumulated, book_value = straight_line(items["purchase_months"], items["values"], items["lives"], period)
+    depreciation = np.round(accumulated - items["previous_accumulated"], 2)
+
+    Entry = models.DepreciationEntry
+    await db.execute(delete(Entry).where(Entry.period == period))
+    if len(items["ids"]):
+        # Whole arrays as parameters: one statement, no per-row Python objects
+        await db.execute(text("""
+            INSERT INTO depreciation_entries (period, item_id, depreciation, accumulated, book_value)
+            SELECT :period, t.item_id, t.depreciation, t.accumulated, t.book_value
+            FROM unnest(
+                CAST(:item_ids AS integer[]), CAST(:depreciation AS float8[]),
+                CAST(:accumulated AS float8[]), CAST(:book_value AS float8[])
+            ) AS t(item_id, depreciation, accumulated, book_value)
+        """), {
+            "period": period,
+            "item_ids": items["ids"].tolist(),
+            "depreciation": depreciation.tolist(),
+            "accumulated": accumulated.tolist(),
+            "book_value": book_value.tolist(),
+        })
+
+    summary = {
+        "period": period,
+        "item_count": int(len(items["ids"])),
+        "total_depreciation": round(float(depreciation.sum()), 2),
+        "total_book_value": round(float(book_value.sum()), 2),
+    }
+    stmt = insert(models.DepreciationPeriod).values(**summary)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.DepreciationPeriod.period],
+        set_={
+            "item_count": stmt.excluded.item_count,
+            "total_depreciation": stmt.excluded.total_depreciation,
+            "total_book_value": stmt.excluded.total_book_value,
+            "closed_at": func.now(),
+        }
+    ))
+    await db.commit()
+    return summary
+
+
+async def get_last_closed_period(db: AsyncSession):
+    return (await db.execute(select(func.max(models.DepreciationPeriod.period)))).scalar()
+
+
+async def close_pending_periods(db: AsyncSession, until: date = None) -> list[dict]:
+    """
+    Closes every month after the last closed one up to `until` (the last month
+    that has ended, by default), in order. The first close ever only closes
+    `until`: its entries carry the depreciation accumulated since purchase.
+    """
+    until = month_start(until or last_closable_period())
+    last = await get_last_closed_period(db)
+    period = until if last is None else last + relativedelta(months=1)
+
+    closed = []
+    while period <= until:
+        closed.append(await close_period(db, period))
+        period += relativedelta(months=1)
+    return closed
+
+
+def latest_period_subquery():
+    """Scalar subquery with the last closed month (book values "as of now")."""
+    return select(func.max(models.DepreciationPeriod.period)).scalar_subquery()
+
+
+def _straight_line_book_value_sql(period):
+    """
+    SQL counterpart of straight_line() for one item at the end of `period` (the
+    book value of items the close did not cover, e.g. approved after it).
+    """
+    Item = models.Item
+    life = select(models.Category.depreciation_months).where(
+        models.Category.id == Item.category_id
+    ).scalar_subquery()
+    month_index = lambda day: func.extract("year", day) * 12 + func.extract("month", day)
+    used = func.least(month_index(period) - month_index(Item.purchase_date) + 1, life)
+    accumulated = func.round(cast(Item.invoice_value * used / life, Numeric), 2)
+    return case(
+        (func.coalesce(life, 0) <= 0, Item.invoice_value),
+        (used <= 0, Item.invoice_value),
+        (used >= life, 0.0),
+        else_=Item.invoice_value - cast(accumulated, Float),
+    )
+
+
+def current_book_value(entry=models.DepreciationEntry):
+    """
+    Book value column for queries outer-joined to the latest entries (see
+    latest_period_subquery). Items outside the depreciable statuses are worth 0;
+    items bought after the last closed month (or before any close, or without a
+    purchase date) keep their invoice value; other items the close did not cover
+    are depreciated up to the last closed month in SQL.
+    """
+    Item = models.Item
+    period = latest_period_subquery()
+    return case(
+        (Item.status.in_(NON_DEPRECIABLE_STATUSES), 0.0),
+        (entry.book_value.isnot(None), entry.book_value),
+        (period.is_(None), Item.invoice_value),
+        (Item.purchase_date.is_(None), Item.invoice_value),
+        (Item.purchase_date >= period + text("interval '1 month'"), Item.invoice_value),
+        else_=_straight_line_book_value_sql(period),
+    )
+
+
+# --- End of life date (items.end_of_life_date) ---
+# purchase_date + the category's depreciation_months (NULL without either), stored
+# so the depreciation alerts can select the items reaching a threshold date in SQL.
+# Kept on every flush that adds an item or changes its category/purchase date, and
+# rewritten for all the items of a category when its depreciation_months changes.
+
+def end_of_life(purchase_date, depreciation_months):
+    if purchase_date is None or not depreciation_months or depreciation_months <= 0:
+        return None
+    start = purchase_date.date() if isinstance(purchase_date, datetime) else purchase_date
+    return start + relativedelta(months=depreciation_months)
+
+
+def end_of_life_sql(purchase_date, depreciation_months):
+    """SQL counterpart of end_of_life() (interval months clamp to the month end, like relativedelta)."""
+    return case(
+        (depreciation_months > 0, cast(purchase_date + func.make_interval(0, depreciation_months), Date)),
+        else_=None,
+    )
+
+
+def _items_needing_end_of_life(session) -> list:
+    items = []
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, models.Item):
+            continue
+        state = inspect(obj)
+        if state.key is None or any(state.attrs[col].history.has_changes() for col in ("category_id", "purchase_date")):
+            items.append(obj)
+    return items
+
+
+@event.listens_for(Session, "before_flush")
+def _set_item_end_of_life(session, flush_context, instances):
+    items = _items_needing_end_of_life(session)
+    if items:
+        category_ids = {obj.category_id for obj in items if obj.category_id is not None}
+        months = {}
+        if category_ids:
+            # Pending changes of these categories win over the stored value
+            months = dict(session.connection().execute(
+                select(models.Category.id, models.Category.depreciation_months).where(models.Category.id.in_(category_ids))
+            ).all())
+            for obj in session.dirty:
+                if isinstance(obj, models.Category) and obj.id in months:
+                    months[obj.id] = obj.depreciation_months
+        for obj in items:
+            obj.end_of_life_date = end_of_life(obj.purchase_date, months.get(obj.category_id))
+
+    changed = [
+        obj.id for obj in session.dirty
+        if isinstance(obj, models.Category) and inspect(obj).attrs.depreciation_months.history.has_changes()
+    ]
+    if changed:
+        session.info.setdefault("eol_categories", set()).update(changed)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_category_end_of_life(session, flush_context):
+    category_ids = session.info.pop("eol_categories", None)
+    if not category_ids:
+        return
+    Item, Category = models.Item, models.Category
+    session.connection().execute(
+        update(Item)
+        .where(Item.category_id == Category.id, Category.id.in_(sorted(category_ids)))
+        # Derived column: updated_at is left as is
+        .values(end_of_life_date=end_of_life_sql(Item.purchase_date, Category.depreciation_months), updated_at=Item.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_end_of_life_changes(session):
+    session.info.pop("eol_categories", None)
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend import models, crud, notifications
+
+# --- End of life alerts ---
+# Daily (worker cron): the items whose end_of_life_date falls on one of the
+# threshold dates are selected in SQL, recipients are resolved in one lookup,
+# and every recipient gets a single in-app notification and a single digest
+# email listing all of their items (or, for users on the hourly/daily email
+# digest, an entry in it). Notification rows go in one INSERT.
+
+ALERT_THRESHOLDS = [60, 30, 10, 0]
+ALERT_STATUSES = [models.ItemStatus.APPROVED, models.ItemStatus.IN_STOCK, models.ItemStatus.MAINTENANCE]
+
+# Items listed in the in-app notification text (the email lists all of them)
+MESSAGE_ITEM_LIMIT = 10
+
+
+async def get_alert_items(db: AsyncSession, today: date) -> list[dict]:
+    Item = models.Item
+    threshold_dates = [today + timedelta(days=days) for days in ALERT_THRESHOLDS]
+    query = select(
+        Item.id, Item.description, Item.fixed_asset_number, Item.category, Item.branch_id,
+        models.Branch.name.label("branch"), Item.purchase_date, Item.end_of_life_date,
+    ).outerjoin(models.Branch, Item.branch_id == models.Branch.id).where(
+        Item.status.in_(ALERT_STATUSES),
+        Item.end_of_life_date.in_(threshold_dates)
+    ).order_by(Item.end_of_life_date, Item.id)
+
+    items = []
+    for row in (await db.execute(query)).mappings():
+        item = dict(row)
+        item["days_remaining"] = (item["end_of_life_date"] - today).days
+        items.append(item)
+    return items
+
+
+def _alert_line(item: dict) -> str:
+    name = f"'{item['description']}' (Ativo: {item['fixed_asset_number'] or '-'}, Filial: {item['branch'] or '-'})"
+    if item["days_remaining"] <= 0:
+        return f"{name} atingiu o fim da vida útil hoje."
+    return f"{name} está a {item['days_remaining']} dias do fim da vida útil ({item['end_of_life_date'].strftime('%d/%m/%Y')})."
+
+
+def build_digest(items: list[dict]) -> tuple:
+    """(title, message) of one recipient's alert."""
+    critical = any(item["days_remaining"] <= 0 for item in items)
+    urgency = "ALERTA CRÍTICO" if critical else "Aviso de Depreciação"
+    if len(items) == 1:
+        title = f"{urgency}: {items[0]['description']}"
+    else:
+        title = f"{urgency}: {len(items)} itens próximos do fim da vida útil"
+
+    lines = [_alert_line(item) for item in items[:MESSAGE_ITEM_LIMIT]]
+    if len(items) > MESSAGE_ITEM_LIMIT:
+        lines.append(f"... e mais {len(items) - MESSAGE_ITEM_LIMIT} item(ns).")
+    return title, "\n".join(lines)
+
+
+def _email_rows(items: list[dict]) -> list[dict]:
+    return [
+        {
+            "description": item["description"],
+            "fixed_asset_number": item["fixed_asset_number"],
+            "category": item["category"],
+            "branch": item["branch"],
+            "purchase_date": item["purchase_date"],
+            "end_of_life": item["end_of_life_date"].strftime("%d/%m/%Y"),
+        }
+        for item in items
+    ]
+
+
+async def send_depreciation_alerts(db: AsyncSession, today: date = None) -> dict:
+    """Selects today's end of life alerts and notifies approvers and branch members, one digest each."""
+    today = today or date.today()
+    items = await get_alert_items(db, today)
+    if not items:
+        return {"items": 0, "recipients": 0}
+
+    # Recipients: approvers + members of the item's branch (all branches at once)
+    approvers = await notifications.get_approvers(db)
+    member_ids = await notifications.get_branch_member_ids(db, [item["branch_id"] for item in items])
+    users = {user.id: user for user in approvers}
+    members = await notifications.get_users_by_ids(
+        db, sorted({user_id for ids in member_ids.values() for user_id in ids} - set(users))
+    )
+    users.update((user.id, user) for user in members)
+
+    items_by_user = {}
+    for item in items:
+        recipients = dict.fromkeys([user.id for user in approvers] + member_ids.get(item["branch_id"], []))
+        for user_id in recipients:
+            items_by_user.setdefault(user_id, []).append(item)
+
+    digests = {user_id: build_digest(user_items) for user_id, user_items in items_by_user.items()}
+
+    await db.execute(insert(models.Notification), [
+        {"user_id": user_id, "title": title, "message": message}
+        for user_id, (title, message) in digests.items()
+    ])
+    await db.commit()
+
+    emails = 0
+    try:
+        if await crud.get_system_setting(db, "smtp_host"):
+            app_title_setting = await crud.get_system_setting(db, "app_title")
+            app_title = app_title_setting.value if app_title_setting else "Sistema de Inventário"
+            # Users on the hourly/daily email digest get the alert text there
+            await notifications.buffer_digest_emails(db, [
+                {"user_id": user_id, "title": title, "message": message}
+                for user_id, (title, message) in digests.items()
+                if users[user_id].email and "@" in users[user_id].email and notifications.wants_digest(users[user_id])
+            ])
+
+            pool = await notifications.get_arq_pool_cached()
+            sent = set()
+            for user_id, (title, message) in digests.items():
+                email = users[user_id].email
+                if not email or "@" not in email or email in sent or notifications.wants_digest(users[user_id]):
+                    continue
+                html = notifications.generate_html_email(
+                    title, "Itens próximos do fim da vida útil:", item_details=_email_rows(items_by_user[user_id]), app_title=app_title
+                )
+                await pool.enqueue_job('send_email_task', to_email=email, subject=f"[{app_title}] {title}", html_content=html)
+                sent.add(email)
+            emails = len(sent)
+    except Exception as e:
+        print(f"Depreciation Alert Error (Email skipped): {e}")
+
+    return {"items": len(items), "recipients": len(digests), "emails": emails}
@@ -0,0 +1,96 @@
+import os
+import enum
+import pickle
+import tempfile
+from datetime import date
+from typing import Callable, NamedTuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend import crud, rendering
+
+# Exports shared by the /reports endpoints and the report jobs of the worker.
+# Rows are read in chunks (crud.stream_item_rows) and spooled as plain tuples to a
+# temp file; rendering then runs in the process pool of backend.rendering.
+# `on_rows(n)` is awaited after each fetched chunk with the number of rows so far.
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_MEDIA_TYPE = "application/pdf"
+
+
+class Export(NamedTuple):
+    stream: Callable       # crud row streamer
+    render: Callable       # backend.rendering renderer
+    extension: str
+    media_type: str
+    filename: str          # download name
+    groupable: bool = False  # accepts group_by (sections with subtotals)
+
+
+EXPORTS = {
+    "excel": Export(crud.stream_items_for_report, rendering.render_inventory_workbook, ".xlsx", XLSX_MEDIA_TYPE, "inventory_report.xlsx"),
+    "pdf": Export(crud.stream_items_for_pdf, rendering.render_inventory_pdf, ".pdf", PDF_MEDIA_TYPE, "inventory_report.pdf", groupable=True),
+    "sap": Export(crud.stream_items_for_sap, rendering.render_sap_workbook, ".xlsx", XLSX_MEDIA_TYPE, "export_sap.xlsx"),
+}
+
+
+async def filters_subtitle(db: AsyncSession, group_by: str = None, **filters) -> str:
+    """Filters line printed under the PDF report title (status labels, branch name)."""
+    labels = {
+        "status": "Status", "category": "Categoria", "branch_id": "Filial", "search": "Busca",
+        "description": "Descrição", "fixed_asset_number": "Ativo", "purchase_date": "Data de compra",
+        "purchase_date_from": "Compra de", "purchase_date_to": "Compra até",
+        "created_at_from": "Cadastro de", "created_at_to": "Cadastro até",
+    }
+    parts = []
+    for key, value in filters.items():
+        if key not in labels or value in (None, ""):
+            continue
+        if key == "status":
+            value = rendering.status_label(value)
+        elif key == "branch_id":
+            branch = await crud.get_branch(db, value)
+            value = branch.name if branch else value
+        elif isinstance(value, date):
+            value = value.strftime('%d/%m/%Y')
+        parts.append(f"{labels[key]}: {value}")
+    if group_by:
+        parts.append(f"Agrupado por: {'filial' if group_by == 'branch' else 'centro de custo'}")
+    return " | ".join(parts) or "Todos os itens"
+
+
+def _plain(value):
+    # Enums are sent by value: the pool processes only get builtin types
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+async def export_items(
+    kind: str, db: AsyncSession, out_path: str, on_rows=None, reject_when_full: bool = True,
+    group_by: str = None, options: dict = None, **filters
+) -> int:
+    """
+    Writes the `kind` export of the items matching `filters` to out_path.
+    `group_by` (groupable exports only) sorts the rows into sections; `options`
+    are handed to the renderer. Returns the number of rows written. Raises
+    rendering.RenderQueueFull, before any row is fetched, when the render pool
+    is saturated (unless reject_when_full=False) and ValueError for an invalid group_by.
+    """
+    export = EXPORTS[kind]
+    if group_by:
+        if not export.groupable:
+            raise ValueError(f"Agrupamento não suportado na exportação {kind}")
+        filters["group_by"] = group_by
+    options = dict(options or {}, group_by=group_by)
+
+    # The queue place is taken before fetching: a full pool rejects without touching the DB
+    async with rendering.reserve(reject_when_full) as reservation:
+        spool = tempfile.NamedTemporaryFile(prefix="export-", suffix=".rows", delete=False)
+        try:
+            with spool:
+                fetched = 0
+                async for rows in export.stream(db, **filters):
+                    pickle.dump([tuple(_plain(v) for v in row) for row in rows], spool, protocol=pickle.HIGHEST_PROTOCOL)
+                    fetched += len(rows)
+                    if on_rows:
+                        await on_rows(fetched)
+            return await rendering.render(export.render, spool.name, out_path, options, reservation=reservation)
+        finally:
+            os.remove(spool.name)
@@ -0,0 +1,93 @@
+from sqlalchemy.orm import selectinload, joinedload, noload
+from backend import models
+
+# Named loader profiles.
+#
+# Collections on the models are declared lazy="raise" (Item.logs is lazy="noload"),
+# so loading a row never cascades into its children. Every query that needs a
+# relationship graph asks for it explicitly with one of the profiles below:
+#
+#     select(models.Item).options(*loader_profile("item-list"))
+#
+# Many-to-one relationships stay eager by default (one batched query each) and
+# are folded into the main query by the profiles through joinedload.
+
+# Principal: what auth and UserResponse read (authorization scope + group)
+USER = (
+    selectinload(models.User.branches),
+    joinedload(models.User.branch),
+    joinedload(models.User.group),
+)
+
+# Many-to-one relations serialized by ItemResponse
+_ITEM_RELATIONS = (
+    joinedload(models.Item.branch),
+    joinedload(models.Item.transfer_target_branch),
+    joinedload(models.Item.category_rel),
+    joinedload(models.Item.supplier),
+    joinedload(models.Item.responsible).options(noload(models.User.branches)),
+    joinedload(models.Item.cost_center),
+    joinedload(models.Item.sector).joinedload(models.Sector.branch),
+)
+
+# Inventory grid / exports: every scalar relation of ItemResponse, no history
+ITEM_LIST = _ITEM_RELATIONS + (
+    noload(models.Item.logs),
+    noload(models.Item.request),
+)
+
+# Details modal: same relations plus the audit history with its authors
+ITEM_DETAIL = _ITEM_RELATIONS + (
+    selectinload(models.Item.logs).options(
+        joinedload(models.Log.user).options(noload(models.User.branches)),
+        noload(models.Log.item)
+    ),
+    noload(models.Item.request),
+)
+
+# Approval screens: requester, category and the items being transferred/written off
+REQUEST_DETAIL = (
+    joinedload(models.Request.requester).options(noload(models.User.branches)),
+    joinedload(models.Request.category),
+    selectinload(models.Request.items).options(*ITEM_LIST),
+)
+
+# Request lists only show the item branch and responsible
+REQUEST_LIST = (
+    joinedload(models.Request.requester).options(noload(models.User.branches)),
+    joinedload(models.Request.category),
+    selectinload(models.Request.items).options(
+        joinedload(models.Item.branch),
+        joinedload(models.Item.responsible).options(noload(models.User.branches)),
+        noload(models.Item.logs),
+        noload(models.Item.request)
+    ),
+)
+
+# Approval workflow rules with the approver they point to
+WORKFLOW = (
+    joinedload(models.ApprovalWorkflow.category),
+    joinedload(models.ApprovalWorkflow.required_user).options(noload(models.User.branches)),
+    joinedload(models.ApprovalWorkflow.required_group),
+)
+
+# System log viewer
+LOG_LIST = (
+    joinedload(models.Log.user),
+    joinedload(models.Log.item).options(noload("*")),
+)
+
+LOADER_PROFILES = {
+    "user": USER,
+    "item-list": ITEM_LIST,
+    "item-detail": ITEM_DETAIL,
+    "request-list": REQUEST_LIST,
+    "request-detail": REQUEST_DETAIL,
+    "workflow": WORKFLOW,
+    "log-list": LOG_LIST,
+}
+
+
+def loader_profile(name: str) -> tuple:
+    """Loader options for a named profile. Raises KeyError for unknown profiles."""
+    return LOADER_PROFILES[name]
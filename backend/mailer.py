@@ -0,0 +1,205 @@
+import ssl
+import time
+import asyncio
+from email.message import EmailMessage
+from typing import List, NamedTuple, Optional
+import aiosmtplib
+from sqlalchemy import select
+from backend import models
+from backend.cache import get_cached_json, set_cached_json
+
+# --- Worker SMTP sender ---
+# The worker keeps one SMTP session open (aiosmtplib) and sends every email job
+# through it: jobs arriving within SMTP_IDLE_TIMEOUT of each other share the
+# connection, TLS handshake and login. Sends are serialized on the session; a
+# NOOP health check runs before reusing a connection that sat idle, and a
+# dropped connection is reopened once per message.
+#
+# SMTP settings are read in one query and cached in Redis under "settings:smtp",
+# which PUT /settings/ drops ("settings:*"); the worker re-checks that copy every
+# SMTP_SETTINGS_CHECK seconds and reconnects when the settings changed.
+
+SMTP_IDLE_TIMEOUT = 30
+SMTP_HEALTH_CHECK_AFTER = 10
+SMTP_SETTINGS_CHECK = 30
+SMTP_SEND_TIMEOUT = 60
+SMTP_SETTINGS_CACHE_KEY = "settings:smtp"
+
+SMTP_SETTING_KEYS = {
+    "smtp_host": "host",
+    "smtp_port": "port",
+    "smtp_username": "username",
+    "smtp_password": "password",
+    "smtp_from_email": "from_email",
+    "smtp_security": "security",
+}
+
+
+class SmtpSettings(NamedTuple):
+    host: str
+    port: int
+    username: str
+    password: str
+    from_email: str
+    security: str
+
+
+async def load_smtp_settings(db) -> Optional[SmtpSettings]:
+    """SMTP settings from system_settings (single query), or None without a host."""
+    result = await db.execute(
+        select(models.SystemSetting.key, models.SystemSetting.value)
+        .where(models.SystemSetting.key.in_(list(SMTP_SETTING_KEYS)))
+    )
+    values = {SMTP_SETTING_KEYS[key]: value for key, value in result.all()}
+    if not values.get("host"):
+        return None
+    return SmtpSettings(
+        host=values["host"],
+        port=int(values.get("port") or 0),
+        username=values.get("username") or "",
+        password=values.get("password") or "",
+        from_email=values.get("from_email") or "",
+        security=values.get("security") or "",
+    )
+
+
+def build_message(settings: SmtpSettings, to_email: str, subject: str, html_body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg.set_content("Por favor, ative a visualização HTML para ler esta mensagem.")
+    msg.add_alternative(html_body, subtype='html')
+    msg["Subject"] = subject
+    msg["From"] = settings.from_email
+    msg["To"] = to_email
+    return msg
+
+
+class Mailer:
+    def __init__(self, session_factory):
+        self._session_factory = session_factory
+        self._lock = asyncio.Lock()
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._connected_with: Optional[SmtpSettings] = None
+        self._settings: Optional[SmtpSettings] = None
+        self._settings_checked_at = 0.0
+        self._last_used = 0.0
+        self._idle_closer: Optional[asyncio.Task] = None
+        self.stats = {"sent": 0, "failed": 0, "connections": 0}
+
+    async def _get_settings(self) -> Optional[SmtpSettings]:
+        if time.monotonic() - self._settings_checked_at < SMTP_SETTINGS_CHECK:
+            return self._settings
+
+        cached = await get_cached_json(SMTP_SETTINGS_CACHE_KEY)
+        if cached is not None:
+            settings = SmtpSettings(**cached) if cached else None
+        else:
+            async with self._session_factory() as db:
+                settings = await load_smtp_settings(db)
+            # Empty dict = "no SMTP configured", also cached
+            await set_cached_json(SMTP_SETTINGS_CACHE_KEY, settings._asdict() if settings else {})
+
+        self._settings = settings
+        self._settings_checked_at = time.monotonic()
+        return settings
+
+    async def _connect(self, settings: SmtpSettings):
+        context = ssl.create_default_context()
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.host,
+            port=settings.port,
+            use_tls=settings.security == "SSL",
+            start_tls=settings.security == "TLS",
+            tls_context=context,
+            timeout=SMTP_SEND_TIMEOUT,
+        )
+        try:
+            await smtp.connect()
+            if settings.username:
+                await smtp.login(settings.username, settings.password)
+        except Exception:
+            # Not stored in self._smtp yet: close it here or the connection leaks
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self._connected_with = settings
+        self.stats["connections"] += 1
+
+    async def _disconnect(self):
+        smtp, self._smtp, self._connected_with = self._smtp, None, None
+        if smtp is None:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _session(self, settings: SmtpSettings) -> aiosmtplib.SMTP:
+        """Open, healthy connection for `settings`."""
+        if self._smtp is not None and self._connected_with != settings:
+            await self._disconnect()
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_HEALTH_CHECK_AFTER:
+            try:
+                await self._smtp.noop()
+            except Exception:
+                await self._disconnect()
+        if self._smtp is None or not self._smtp.is_connected:
+            await self._disconnect()
+            await self._connect(settings)
+        return self._smtp
+
+    async def send(self, to_email: str, subject: str, html_body: str) -> bool:
+        """Sends one email over the shared session. Returns False when not sent (errors are logged)."""
+        settings = await self._get_settings()
+        if not settings:
+            print("No SMTP host configured.")
+            return False
+
+        msg = build_message(settings, to_email, subject, html_body)
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    smtp = await self._session(settings)
+                    await smtp.send_message(msg)
+                    self._last_used = time.monotonic()
+                    self.stats["sent"] += 1
+                    self._schedule_idle_close()
+                    return True
+                except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError) as e:
+                    # Stale session: reconnect once
+                    await self._disconnect()
+                    if attempt:
+                        print(f"Failed to send email to {to_email}: {e}")
+                except Exception as e:
+                    # Recipient refused etc.: the session itself is still usable
+                    print(f"Failed to send email to {to_email}: {e}")
+                    break
+        self.stats["failed"] += 1
+        return False
+
+    async def send_batch(self, recipients: List[str], subject: str, html_body: str) -> int:
+        """Same message to every recipient, over one session. Returns how many were sent."""
+        sent = 0
+        for to_email in recipients:
+            if await self.send(to_email, subject, html_body):
+                sent += 1
+        return sent
+
+    def _schedule_idle_close(self):
+        if self._idle_closer is None or self._idle_closer.done():
+            self._idle_closer = asyncio.create_task(self._close_when_idle())
+
+    async def _close_when_idle(self):
+        while self._smtp is not None:
+            idle = time.monotonic() - self._last_used
+            if idle >= SMTP_IDLE_TIMEOUT:
+                async with self._lock:
+                    if time.monotonic() - self._last_used >= SMTP_IDLE_TIMEOUT:
+                        await self._disconnect()
+                return
+            await asyncio.sleep(SMTP_IDLE_TIMEOUT - idle)
+
+    async def close(self):
+        if self._idle_closer is not None:
+            self._idle_closer.cancel()
+        async with self._lock:
+            await self._disconnect()
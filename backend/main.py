@@ -1,4 +1,4 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
@@ -18,7 +18,10 @@ if not hasattr(bcrypt, '__about__'):
 
 from backend.routers import auth, users, items, dashboard, reports, branches, categories, logs, suppliers, imports, settings, notifications, jobs, backup, approval_workflows, user_groups, requests, cost_centers, sectors
 from backend.initial_data import init_db
-from backend.websocket_manager import manager
+from backend.websocket_manager import manager, relay_events
+from backend import rendering, search
+from backend import auth as auth_service
+from backend.database import SessionLocal
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -42,6 +45,9 @@ async def on_startup():
         async with engine.begin() as conn:
              await conn.run_sync(Base.metadata.create_all)
         print("DEBUG: Database Tables Created.")
+        async with engine.connect() as conn:
+            if not await search.detect_search_support(conn):
+                print("WARNING: Full-text search objects missing (run alembic upgrade head); item search uses plain ILIKE.")
     except Exception as e:
         print(f"CRITICAL ERROR: Failed to create tables: {e}")
 
@@ -51,6 +57,16 @@ async def on_startup():
         print(f"Startup Error (init_db): {e}")
         pass
 
+    # Websocket events published by the worker (e.g. report jobs finished)
+    app.state.ws_relay = asyncio.create_task(relay_events())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    relay = getattr(app.state, "ws_relay", None)
+    if relay:
+        relay.cancel()
+    rendering.shutdown()
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "message": "Server is running"}
@@ -75,12 +91,25 @@ if not os.path.exists(UPLOAD_DIR):
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 @app.websocket("/ws/notifications")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, token: str = ""):
+    # Browsers cannot send headers on the handshake: the access token comes in the query string
+    async with SessionLocal() as db:
+        principal = await auth_service.principal_from_token(db, token)
+    if principal is None:
+        # Accept first: a close before the handshake becomes an HTTP 403 and the browser
+        # only sees 1006, while 1008 tells the client to stop reconnecting
+        await websocket.accept()
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await manager.connect(websocket, principal)
     try:
         while True:
             data = await websocket.receive_text()
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: socket already closed by the manager (slow client evicted)
+        pass
+    finally:
         manager.disconnect(websocket)
 
 # Routers
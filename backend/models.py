@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Text, Enum, Table, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, ForeignKey, Text, Enum, Table, JSON, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -10,6 +10,8 @@ user_branches = Table(
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
     Column("branch_id", Integer, ForeignKey("branches.id"), primary_key=True),
+    # Members of a branch (the primary key leads with user_id)
+    Index("ix_user_branches_branch_id", "branch_id"),
     extend_existing=True
 )
 
@@ -21,8 +23,8 @@ class UserGroup(Base):
     name = Column(String, unique=True, index=True)
     description = Column(String, nullable=True)
 
-    users = relationship("User", back_populates="group", lazy="selectin")
-    approval_workflows = relationship("ApprovalWorkflow", back_populates="required_group")
+    users = relationship("User", back_populates="group", lazy="raise")
+    approval_workflows = relationship("ApprovalWorkflow", back_populates="required_group", lazy="raise")
 
 class UserRole(str, enum.Enum):
     ADMIN = "ADMIN"
@@ -66,11 +68,12 @@ class Branch(Base):
     address = Column(String)
     cnpj = Column(String, nullable=True)
 
+    # Coleções usam lazy="raise": carregue explicitamente via backend.loaders
     # Nota: foreign_keys como string lista para evitar erro de inicialização
-    items = relationship("Item", foreign_keys="[Item.branch_id]", back_populates="branch", lazy="selectin")
+    items = relationship("Item", foreign_keys="[Item.branch_id]", back_populates="branch", lazy="raise")
     # Restaurado nome users_legacy para tentar compatibilidade com cache teimoso, mas definindo antes de User
-    users_legacy = relationship("User", back_populates="branch", lazy="selectin")
-    users = relationship("User", secondary=user_branches, back_populates="branches", lazy="selectin")
+    users_legacy = relationship("User", back_populates="branch", lazy="raise")
+    users = relationship("User", secondary=user_branches, back_populates="branches", lazy="raise")
 
 class User(Base):
     __tablename__ = "users"
@@ -84,22 +87,26 @@ class User(Base):
     all_branches = Column(Boolean, default=False)
     can_import = Column(Boolean, default=False)
     # branch_id mantido para compatibilidade
-    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True)
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True, index=True)
     group_id = Column(Integer, ForeignKey("user_groups.id"), nullable=True)
+    # Entrega de e-mails: immediate, hourly ou daily (resumo, ver notifications.py)
+    email_digest = Column(String, nullable=False, default="immediate", server_default="immediate")
 
     # Relacionamento legado (Many-to-One)
     branch = relationship("Branch", back_populates="users_legacy")
     # Novo relacionamento (Many-to-Many)
+    # Única coleção eager: é o escopo de autorização lido em praticamente toda rota.
+    # Branch.users/items são lazy="raise", então o carregamento não cascateia.
     branches = relationship("Branch", secondary=user_branches, back_populates="users", lazy="selectin")
 
     # Grupo (Many-to-One)
     group = relationship("UserGroup", back_populates="users", lazy="selectin")
 
-    logs = relationship("Log", back_populates="user")
-    items_responsible = relationship("Item", back_populates="responsible")
+    logs = relationship("Log", back_populates="user", lazy="raise")
+    items_responsible = relationship("Item", back_populates="responsible", lazy="raise")
     # Changed from lazy="selectin" to lazy="select" (or default) to avoid performance issues
-    notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
-    requests = relationship("Request", back_populates="requester")
+    notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan", lazy="raise")
+    requests = relationship("Request", back_populates="requester", lazy="raise")
 
 class Category(Base):
     __tablename__ = "categories"
@@ -110,9 +117,9 @@ class Category(Base):
     depreciation_months = Column(Integer, nullable=True)
     asset_class = Column(String, nullable=True)
 
-    items = relationship("Item", back_populates="category_rel", lazy="selectin")
-    approval_workflows = relationship("ApprovalWorkflow", back_populates="category", lazy="selectin")
-    requests = relationship("Request", back_populates="category", lazy="selectin")
+    items = relationship("Item", back_populates="category_rel", lazy="raise")
+    approval_workflows = relationship("ApprovalWorkflow", back_populates="category", lazy="raise")
+    requests = relationship("Request", back_populates="category", lazy="raise")
 
 class Supplier(Base):
     __tablename__ = "suppliers"
@@ -122,7 +129,7 @@ class Supplier(Base):
     name = Column(String, index=True)
     cnpj = Column(String, unique=True, index=True)
 
-    items = relationship("Item", back_populates="supplier", lazy="selectin")
+    items = relationship("Item", back_populates="supplier", lazy="raise")
 
 class CostCenter(Base):
     __tablename__ = "cost_centers"
@@ -133,7 +140,7 @@ class CostCenter(Base):
     name = Column(String)
     description = Column(String, nullable=True)
 
-    items = relationship("Item", back_populates="cost_center", lazy="selectin")
+    items = relationship("Item", back_populates="cost_center", lazy="raise")
 
 class Sector(Base):
     __tablename__ = "sectors"
@@ -144,7 +151,7 @@ class Sector(Base):
     branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True) # Null = Global, Value = Specific Branch
 
     branch = relationship("Branch", lazy="selectin")
-    items = relationship("Item", back_populates="sector", lazy="selectin")
+    items = relationship("Item", back_populates="sector", lazy="raise")
 
 class Request(Base):
     __tablename__ = "requests"
@@ -162,7 +169,7 @@ class Request(Base):
 
     requester = relationship("User", back_populates="requests", lazy="selectin")
     category = relationship("Category", back_populates="requests", lazy="selectin")
-    items = relationship("Item", back_populates="request", lazy="selectin")
+    items = relationship("Item", back_populates="request", lazy="raise")
 
 class Item(Base):
     __tablename__ = "items"
@@ -172,7 +179,9 @@ class Item(Base):
     description = Column(String, index=True)
     category = Column(String, index=True)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
-    purchase_date = Column(DateTime)
+    purchase_date = Column(DateTime, index=True)
+    # purchase_date + category depreciation_months, kept by backend/depreciation.py (depreciation alerts)
+    end_of_life_date = Column(Date, index=True, nullable=True)
     invoice_value = Column(Float)
     invoice_number = Column(String, index=True)
     invoice_file = Column(String, nullable=True)
@@ -192,7 +201,7 @@ class Item(Base):
     request_id = Column(Integer, ForeignKey("requests.id"), nullable=True)
     cost_center_id = Column(Integer, ForeignKey("cost_centers.id"), nullable=True)
     sector_id = Column(Integer, ForeignKey("sectors.id"), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     branch = relationship("Branch", foreign_keys=[branch_id], back_populates="items", lazy="selectin")
@@ -200,8 +209,9 @@ class Item(Base):
     category_rel = relationship("Category", back_populates="items", lazy="selectin")
     supplier = relationship("Supplier", back_populates="items", lazy="selectin")
     responsible = relationship("User", back_populates="items_responsible", lazy="selectin")
-    logs = relationship("Log", back_populates="item", lazy="selectin")
-    request = relationship("Request", back_populates="items", lazy="selectin")
+    # Histórico só é carregado pelo perfil "item-detail"
+    logs = relationship("Log", back_populates="item", lazy="noload")
+    request = relationship("Request", back_populates="items", lazy="raise")
     cost_center = relationship("CostCenter", back_populates="items", lazy="selectin")
     sector = relationship("Sector", back_populates="items", lazy="selectin")
 
@@ -219,6 +229,75 @@ class Log(Base):
     item = relationship("Item", back_populates="logs", lazy="selectin")
     user = relationship("User", back_populates="logs", lazy="selectin")
 
+class InventoryRollup(Base):
+    """
+    Item count and invoice value per (branch, category, cost center, status).
+    Maintained in the same transaction as the item changes by backend.rollup;
+    a NULL key means "not set" on the item (no FKs, so lookups can be deleted freely).
+    """
+    __tablename__ = "inventory_rollup"
+    __table_args__ = (
+        Index(
+            "ux_inventory_rollup_bucket", "branch_id", "category_id", "cost_center_id", "status",
+            unique=True, postgresql_nulls_not_distinct=True
+        ),
+        {'extend_existing': True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    branch_id = Column(Integer, nullable=True)
+    category_id = Column(Integer, nullable=True)
+    cost_center_id = Column(Integer, nullable=True)
+    status = Column(Enum(ItemStatus), nullable=True)
+    item_count = Column(Integer, nullable=False, default=0)
+    total_value = Column(Numeric(16, 2), nullable=False, default=0)
+
+class InventorySnapshot(Base):
+    """Daily copy of the rollup per (branch, category, status), the time axis of the trend charts."""
+    __tablename__ = "inventory_snapshots"
+    __table_args__ = (
+        Index(
+            "ux_inventory_snapshots_bucket", "snapshot_date", "branch_id", "category_id", "status",
+            unique=True, postgresql_nulls_not_distinct=True
+        ),
+        {'extend_existing': True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    snapshot_date = Column(Date, nullable=False)
+    branch_id = Column(Integer, nullable=True)
+    category_id = Column(Integer, nullable=True)
+    status = Column(Enum(ItemStatus), nullable=True)
+    item_count = Column(Integer, nullable=False, default=0)
+    total_value = Column(Numeric(16, 2), nullable=False, default=0)
+
+class DepreciationPeriod(Base):
+    """A closed depreciation month (see backend/depreciation.py); `period` is the first day of the month."""
+    __tablename__ = "depreciation_periods"
+    __table_args__ = {'extend_existing': True}
+
+    period = Column(Date, primary_key=True)
+    closed_at = Column(DateTime(timezone=True), server_default=func.now())
+    item_count = Column(Integer, nullable=False, default=0)
+    total_depreciation = Column(Numeric(16, 2), nullable=False, default=0)
+    total_book_value = Column(Numeric(16, 2), nullable=False, default=0)
+
+class DepreciationEntry(Base):
+    """Straight-line depreciation of one item in one closed month (values at the end of the month)."""
+    __tablename__ = "depreciation_entries"
+    __table_args__ = (
+        Index("ux_depreciation_entries_period_item", "period", "item_id", unique=True),
+        Index("ix_depreciation_entries_item_period", "item_id", "period"),
+        {'extend_existing': True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    period = Column(Date, nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False)
+    depreciation = Column(Numeric(16, 2), nullable=False, default=0)
+    accumulated = Column(Numeric(16, 2), nullable=False, default=0)
+    book_value = Column(Numeric(16, 2), nullable=False, default=0)
+
 class SystemSetting(Base):
     __tablename__ = "system_settings"
     __table_args__ = {'extend_existing': True}
@@ -229,7 +308,12 @@ class SystemSetting(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Unread counter (user_id, read = false) and the notification center pages (user_id, id desc)
+        Index("ix_notifications_user_read_created", "user_id", "read", "created_at"),
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -240,6 +324,17 @@ class Notification(Base):
 
     user = relationship("User", back_populates="notifications")
 
+class EmailDigestEntry(Base):
+    """Email content waiting for the next digest of a user (hourly/daily delivery)."""
+    __tablename__ = "email_digest_entries"
+    __table_args__ = {'extend_existing': True}
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    title = Column(String)
+    message = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class ApprovalWorkflow(Base):
     __tablename__ = "approval_workflows"
     __table_args__ = {'extend_existing': True}
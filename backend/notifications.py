@@ -1,35 +1,155 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend import models, crud
+from sqlalchemy import event, inspect, select, insert, delete, union, null
+from sqlalchemy.orm import Session
+from backend import models, crud, loaders
+import json
 import smtplib
 import ssl
 from email.message import EmailMessage
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 import asyncio
-from backend.redis_client import get_redis_settings
+from backend.redis_client import get_redis_settings, get_redis_cache
 from arq import create_pool
 
 async def get_approvers(db: AsyncSession) -> List[models.User]:
     """Get all admins and approvers."""
     return await crud.get_users_by_role(db, [models.UserRole.ADMIN, models.UserRole.APPROVER])
 
+# --- Branch membership ---
+# Operators who receive a branch's notifications: all_branches users, users whose
+# legacy users.branch_id is the branch and users assigned through user_branches.
+# Member ids are cached per branch in this process and in Redis under the current
+# BRANCH_MEMBERS_VERSION_KEY; committing any change to a user's role/branches (or
+# deleting a branch) bumps the version, which retires both levels in every process.
+
+BRANCH_MEMBERS_VERSION_KEY = "branch_members:version"
+BRANCH_MEMBERS_TTL = 3600
+_MEMBERSHIP_COLUMNS = ("role", "all_branches", "branch_id", "branches")
+_member_cache = {"version": None, "branches": {}}
+_pending_invalidations: set = set()
+
+async def query_branch_member_ids(db: AsyncSession, branch_ids: List[int]) -> Dict[int, List[int]]:
+    """Operator ids per branch, straight from the database (single query)."""
+    User = models.User
+    assigned = models.user_branches
+    operator = User.role == models.UserRole.OPERATOR
+    query = union(
+        select(User.branch_id.label("branch_id"), User.id.label("user_id")).where(operator, User.branch_id.in_(branch_ids)),
+        select(assigned.c.branch_id, assigned.c.user_id)
+        .join(User, User.id == assigned.c.user_id)
+        .where(operator, assigned.c.branch_id.in_(branch_ids)),
+        # Members of every branch
+        select(null().label("branch_id"), User.id).where(operator, User.all_branches.is_(True)),
+    )
+
+    members = {branch_id: set() for branch_id in branch_ids}
+    everywhere = set()
+    for branch_id, user_id in (await db.execute(query)).all():
+        (everywhere if branch_id is None else members[branch_id]).add(user_id)
+    return {branch_id: sorted(ids | everywhere) for branch_id, ids in members.items()}
+
+async def _get_members_version(redis) -> str:
+    return str(await redis.get(BRANCH_MEMBERS_VERSION_KEY) or 0)
+
+async def get_branch_member_ids(db: AsyncSession, branch_ids: List[int]) -> Dict[int, List[int]]:
+    """Operator ids per branch for one or many branches (cached, see above)."""
+    branch_ids = sorted({b for b in branch_ids if b is not None})
+    if not branch_ids:
+        return {}
+
+    redis = None
+    try:
+        redis = await get_redis_cache()
+        version = await _get_members_version(redis)
+    except Exception as e:
+        print(f"Cache Read Error: {e}")
+        return await query_branch_member_ids(db, branch_ids)
+
+    if _member_cache["version"] != version:
+        _member_cache["version"] = version
+        _member_cache["branches"] = {}
+    local = _member_cache["branches"]
+
+    found = {b: local[b] for b in branch_ids if b in local}
+    missing = [b for b in branch_ids if b not in found]
+    if missing:
+        try:
+            cached = await redis.mget([f"branch_members:{version}:{b}" for b in missing])
+            for branch_id, value in zip(missing, cached):
+                if value is not None:
+                    found[branch_id] = local[branch_id] = json.loads(value)
+        except Exception as e:
+            print(f"Cache Read Error: {e}")
+
+    missing = [b for b in branch_ids if b not in found]
+    if missing:
+        fetched = await query_branch_member_ids(db, missing)
+        found.update(fetched)
+        local.update(fetched)
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for branch_id, ids in fetched.items():
+                pipe.set(f"branch_members:{version}:{branch_id}", json.dumps(ids), ex=BRANCH_MEMBERS_TTL)
+            await pipe.execute()
+        except Exception as e:
+            print(f"Cache Write Error: {e}")
+    return found
+
+async def get_users_by_ids(db: AsyncSession, user_ids: List[int]) -> List[models.User]:
+    if not user_ids:
+        return []
+    result = await db.execute(select(models.User).options(*loaders.USER).where(models.User.id.in_(user_ids)))
+    return result.scalars().all()
+
 async def get_branch_members(db: AsyncSession, branch_id: int) -> List[models.User]:
     """Get all operators assigned to a specific branch."""
-    operators = await crud.get_users_by_role(db, [models.UserRole.OPERATOR])
-    branch_members = []
+    member_ids = await get_branch_member_ids(db, [branch_id])
+    return await get_users_by_ids(db, member_ids.get(branch_id, []))
 
-    for user in operators:
-        if user.all_branches:
-            branch_members.append(user)
-            continue
+def _touches_membership(session) -> bool:
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, models.User) or (isinstance(obj, models.Branch) and obj in session.deleted):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, models.User):
+            state = inspect(obj)
+            if any(state.attrs[col].history.has_changes() for col in _MEMBERSHIP_COLUMNS):
+                return True
+    return False
+
+async def invalidate_branch_members():
+    """Retires the cached memberships of every process."""
+    _member_cache["version"] = None
+    _member_cache["branches"] = {}
+    try:
+        redis = await get_redis_cache()
+        await redis.incr(BRANCH_MEMBERS_VERSION_KEY)
+    except Exception as e:
+        print(f"Cache Write Error: {e}")
 
-        if user.branch_id == branch_id:
-            branch_members.append(user)
-            continue
+@event.listens_for(Session, "before_flush")
+def _track_membership_changes(session, flush_context, instances):
+    if _touches_membership(session):
+        session.info["branch_members_stale"] = True
 
-        if any(b.id == branch_id for b in user.branches):
-            branch_members.append(user)
+@event.listens_for(Session, "after_commit")
+def _invalidate_branch_members(session):
+    if not session.info.pop("branch_members_stale", False):
+        return
+    # This process stops using its copy right away; the Redis bump follows
+    _member_cache["version"] = None
+    _member_cache["branches"] = {}
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(invalidate_branch_members())
+    _pending_invalidations.add(task)
+    task.add_done_callback(_pending_invalidations.discard)
 
-    return branch_members
+@event.listens_for(Session, "after_rollback")
+def _discard_membership_changes(session):
+    session.info.pop("branch_members_stale", None)
 
 def generate_html_email(title: str, message: str, item_details: Optional[Union[dict, List[dict]]] = None, action_url: Optional[str] = None, action_text: Optional[str] = "Ver no Sistema", app_title: str = "Sistema de Inventário") -> str:
     """Generates a modern, responsive HTML email body with item details table (single or list)."""
@@ -44,7 +164,8 @@ def generate_html_email(title: str, message: str, item_details: Optional[Union[d
                 "serial_number": "Nº Série", "branch": "Filial", "status": "Status",
                 "invoice_value": "Valor (R$)", "purchase_date": "Data Compra", "supplier": "Fornecedor",
                 "invoice_number": "Número da NF", "invoice_link": "Arquivo da NF", "observations": "Observações",
-                "responsible": "Responsável", "transfer_target": "Destino (Transferência)"
+                "responsible": "Responsável", "transfer_target": "Destino (Transferência)",
+                "end_of_life": "Fim Vida Útil"
             }
             def format_val(k, v):
                 if v is None or v == "": return "-"
@@ -156,23 +277,39 @@ async def notify_users(
     if not users:
         return
 
-    # 1. In-App Notifications
+    # Same person listed twice (e.g. approver and branch member) gets one notification
+    users = list({user.id: user for user in users}.values())
+
+    # 1. In-App Notifications (one multi-row INSERT)
     try:
-        for user in users:
-            notification = models.Notification(user_id=user.id, title=title, message=message)
-            db.add(notification)
+        await db.execute(insert(models.Notification), [
+            {"user_id": user.id, "title": title, "message": message} for user in users
+        ])
         await db.commit()
     except Exception as e:
         print(f"Error saving in-app notifications: {e}")
         try: await db.rollback()
         except: pass
 
-    # 2. Email Notifications (Async Enqueue)
+    # 2. Email Notifications (one fan-out job with every recipient; digest users get it buffered)
     try:
+        mailable = [user for user in users if user.email and "@" in user.email]
+        if not mailable:
+            return
+
         smtp_host_setting = await crud.get_system_setting(db, "smtp_host")
         if not smtp_host_setting:
             return
 
+        await buffer_digest_emails(db, [
+            {"user_id": user.id, "title": email_subject or title, "message": message}
+            for user in mailable if wants_digest(user)
+        ])
+
+        recipients = list(dict.fromkeys(user.email for user in mailable if not wants_digest(user)))
+        if not recipients:
+            return
+
         # Prepare context data once
         app_title_setting = await crud.get_system_setting(db, "app_title")
         app_title = app_title_setting.value if app_title_setting else "Sistema de Inventário"
@@ -180,17 +317,76 @@ async def notify_users(
         if app_title: final_subject = f"[{app_title}] {final_subject}"
         body_html = email_html or generate_html_email(title, message, app_title=app_title)
 
-        # Enqueue tasks
         pool = await get_arq_pool_cached()
-        sent_emails = set()
-        for user in users:
-            if user.email and "@" in user.email and user.email not in sent_emails:
-                await pool.enqueue_job('send_email_task', to_email=user.email, subject=final_subject, html_content=body_html)
-                sent_emails.add(user.email)
+        await pool.enqueue_job('send_email_batch_task', recipients=recipients, subject=final_subject, html_content=body_html)
 
     except Exception as e:
         print(f"Notification Logic Error (Email skipped): {e}")
 
+# --- Email digests ---
+# Users with email_digest "hourly"/"daily" get their notification emails buffered in
+# email_digest_entries (see notify_users) and delivered as one email per window by
+# the worker (send_email_digests_task). Entries left behind by users who switched
+# back to "immediate" go out with the next hourly run.
+
+DIGEST_DAILY_HOUR = 8
+DIGEST_MAX_LINES = 100
+
+def wants_digest(user: models.User) -> bool:
+    """True when the user's notification emails go to the hourly/daily digest."""
+    return (user.email_digest or "immediate") != "immediate"
+
+async def buffer_digest_emails(db: AsyncSession, entries: List[dict]):
+    """Stores {"user_id", "title", "message"} entries for the next digest (one INSERT) and commits."""
+    if not entries:
+        return
+    await db.execute(insert(models.EmailDigestEntry), entries)
+    await db.commit()
+
+def render_digest(entries: list, app_title: str) -> tuple:
+    """(subject, html) of one user's digest; entries are (title, message, created_at) rows."""
+    count = len(entries)
+    subject = f"[{app_title}] Resumo: {count} notificaç{'ão' if count == 1 else 'ões'}"
+    lines = []
+    for entry in entries[:DIGEST_MAX_LINES]:
+        when = entry.created_at.strftime("%d/%m %H:%M") if entry.created_at else ""
+        lines.append(f"<b>{when} - {entry.title}</b>\n{entry.message}")
+    if count > DIGEST_MAX_LINES:
+        lines.append(f"... e mais {count - DIGEST_MAX_LINES} notificação(ões) no sistema.")
+    html = generate_html_email(f"Resumo de notificações ({count})", "\n\n".join(lines), app_title=app_title)
+    return subject, html
+
+async def send_email_digests(db: AsyncSession, mailer, modes: List[str]) -> dict:
+    """Sends one digest per user whose delivery mode is in `modes` (plus "immediate" leftovers)."""
+    Entry, User = models.EmailDigestEntry, models.User
+    result = await db.execute(
+        select(Entry.id, Entry.user_id, Entry.title, Entry.message, Entry.created_at, User.email)
+        .join(User, User.id == Entry.user_id)
+        .where(User.email_digest.in_(list(modes) + ["immediate"]))
+        .order_by(Entry.user_id, Entry.id)
+    )
+    by_user = {}
+    for row in result.all():
+        by_user.setdefault((row.user_id, row.email), []).append(row)
+    if not by_user:
+        return {"users": 0, "sent": 0}
+
+    app_title_setting = await crud.get_system_setting(db, "app_title")
+    app_title = app_title_setting.value if app_title_setting else "Sistema de Inventário"
+
+    sent = 0
+    for (user_id, email), entries in by_user.items():
+        delivered = False
+        if email and "@" in email:
+            subject, html = render_digest(entries, app_title)
+            delivered = await mailer.send(email, subject, html)
+        # Undeliverable addresses are dropped; failed sends stay for the next run
+        if delivered or not (email and "@" in email):
+            await db.execute(delete(Entry).where(Entry.user_id == user_id, Entry.id <= entries[-1].id))
+            await db.commit()
+        sent += delivered
+    return {"users": len(by_user), "sent": sent}
+
 async def create_notification(db: AsyncSession, user_id: int, title: str, message: str):
     notification = models.Notification(user_id=user_id, title=title, message=message)
     db.add(notification)
@@ -201,63 +397,8 @@ async def create_notification(db: AsyncSession, user_id: int, title: str, messag
         await db.rollback()
     return notification
 
-async def send_email_sync_wrapper(to_email, subject, html_content):
-    """
-    Wrapper to run synchronous SMTP code.
-    In a real worker, we might get SMTP settings from DB again or pass them in job args.
-    Passing sensitive SMTP creds in job args (Redis) is risky if Redis isn't secure.
-    Better: Worker fetches creds from DB or Env.
-    For this refactor, we'll fetch from DB inside the worker or assume Env.
-    Since the worker code in worker.py imports this, let's keep the logic here but make it self-contained
-    or strictly require DB access.
-
-    ISSUE: The worker process needs a DB session to fetch SMTP settings if we don't pass them.
-    Passing them in args is easier for now but less secure.
-    Let's fetch from ENV or DB. The original code fetched from DB.
-
-    Refactor: We will use a separate DB session in the worker task if needed, OR pass creds if we trust Redis.
-    To be robust/enterprise, we should fetch from Vault/Env/DB.
-    Let's implement a 'get_smtp_settings' helper and use it.
-
-    However, 'send_email' used to take host/port/etc.
-    Let's modify 'send_email_sync_wrapper' to instantiate a session and fetch settings,
-    OR just accept that we need to pass them.
-
-    Decision: To avoid complexity of DB connection in worker right now (needs async session setup in sync context or async task),
-    we will rely on the `send_email` function being called with args.
-    Wait, `send_email_task` in `worker.py` calls `send_email_sync_wrapper`.
-    We need to retrieve SMTP settings inside `send_email_sync_wrapper`.
-
-    We'll implement a context manager for DB in the worker if possible, or just pass the config for this iteration.
-    Passing config via Redis job args is acceptable for internal Redis.
-    """
-    # This function is called by the worker.
-    # We need to fetch SMTP settings. Since this is async, we can connect to DB.
-    # But wait, send_email_sync_wrapper suggests it wraps the sync call.
-
-    # Let's actually Fetch settings here.
-    # We need a new DB session.
-    from backend.database import SessionLocal
-    from backend import crud
-
-    async with SessionLocal() as db:
-        host = await crud.get_system_setting(db, "smtp_host")
-        if not host:
-            print("No SMTP host configured.")
-            return
-        host = host.value
-        port = int((await crud.get_system_setting(db, "smtp_port")).value)
-        username = (await crud.get_system_setting(db, "smtp_username")).value
-        password = (await crud.get_system_setting(db, "smtp_password")).value
-        from_email = (await crud.get_system_setting(db, "smtp_from_email")).value
-        security = (await crud.get_system_setting(db, "smtp_security")).value
-
-    # Now call sync send_email in a thread
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, send_email, to_email, subject, html_content, host, port, username, password, from_email, security)
-
 def send_email(to_email, subject, html_body, host, port, username, password, from_email, security):
-    # Pure sync SMTP logic
+    # Pure sync SMTP logic (one-off sends from the API; the worker uses backend/mailer.py)
     try:
         msg = EmailMessage()
         msg.set_content("Por favor, ative a visualização HTML para ler esta mensagem.")
@@ -7,6 +7,9 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 # Separate pool for general caching
 redis_cache: Redis | None = None
 
+# Dedicated connection for pub/sub subscribers (a subscribed connection can't run other commands)
+redis_pubsub: Redis | None = None
+
 # Separate pool for ARQ jobs (if needed, though create_pool manages its own)
 arq_pool: ArqRedis | None = None
 
@@ -16,6 +19,13 @@ async def get_redis_cache() -> Redis:
         redis_cache = from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
     return redis_cache
 
+async def get_redis_pubsub() -> Redis:
+    global redis_pubsub
+    if redis_pubsub is None:
+        # Health checks detect a dead subscription on an otherwise idle connection
+        redis_pubsub = from_url(REDIS_URL, encoding="utf-8", decode_responses=True, health_check_interval=30)
+    return redis_pubsub
+
 async def get_arq_pool() -> ArqRedis:
     global arq_pool
     if arq_pool is None:
@@ -64,8 +74,10 @@ def get_redis_settings():
     return RedisSettings(host=host, port=port, database=db, password=password)
 
 async def close_redis():
-    global redis_cache, arq_pool
+    global redis_cache, redis_pubsub, arq_pool
     if redis_cache:
         await redis_cache.close()
+    if redis_pubsub:
+        await redis_pubsub.close()
     if arq_pool:
         await arq_pool.close()
@@ -0,0 +1,457 @@
+import os
+import time
+import pickle
+import asyncio
+import contextlib
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# --- Report rendering subsystem ---
+# Formatting and file generation (openpyxl, reportlab) are CPU-bound and would
+# freeze the event loop, websockets included. They run in a shared, bounded
+# ProcessPoolExecutor. The async side only fetches rows from the DB and spools
+# them, as plain tuples pickled in chunks, to a temp file; the renderers below
+# read that file in the worker process and write the output file. Neither side
+# holds the whole data set in memory.
+#
+# This module is imported by the pool processes: keep it free of DB/app imports.
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", 2))
+# Exports fetching rows + renders waiting + running beyond which new requests are
+# refused (RenderQueueFull). The place is reserved before the rows are fetched
+# (reserve()), so a saturated pool costs a rejected request no DB or disk work.
+RENDER_QUEUE_LIMIT = int(os.getenv("RENDER_QUEUE_LIMIT", 8))
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+# Row layouts spooled by backend.exports (same column order as the crud streamers)
+SapRow = namedtuple("SapRow", [
+    "description", "invoice_number", "fixed_asset_number", "purchase_date", "invoice_value",
+    "category", "asset_class", "cost_center_code", "supplier_name"
+])
+ReportRow = namedtuple("ReportRow", [
+    "id", "description", "category", "purchase_date", "invoice_value", "status", "branch_id", "book_value"
+])
+
+SAP_HEADER = [
+    "CLASSE", "C CUSTO", "Denominação do imobilizado", "Denominação do imobilizado (continuação)",
+    "Texto do nº principal do imobilizado", "Nº inventário", "DATA", "DATA", "DATA", "MONTANTE", "TEXTO DO ITEM"
+]
+
+PdfRow = namedtuple("PdfRow", [
+    "id", "fixed_asset_number", "description", "category", "purchase_date", "invoice_value",
+    "status", "branch_name", "cost_center_code", "cost_center_name"
+])
+
+REPORT_HEADER = ["ID", "Description", "Category", "Purchase Date", "Invoice Value", "Status", "Branch ID", "Book Value"]
+
+
+def read_spool(path: str):
+    """Yields the row chunks written to a spool file by backend.exports."""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def format_brl(value) -> str:
+    """1234.5 -> '1.234,50' (padrão brasileiro)."""
+    return f"{value or 0.0:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def sap_row(row: SapRow) -> list:
+    """One SAP sheet row."""
+    # Determine values for SAP columns
+    classe = row.asset_class if row.asset_class else row.category
+    c_custo = row.cost_center_code or ""
+
+    nf = row.invoice_number or ""
+    desc = row.description or ""
+    fornecedor = row.supplier_name or ""
+
+    # Formata a NF adicionando o prefixo NF se existir
+    nf_formatada = f"NF{nf}" if nf else ""
+
+    # Denominação do imobilizado: Descrição do Item - a NF
+    desc_imobilizado = f"{desc} - {nf_formatada}".strip(" - ")
+    # Truncating to 50 chars as SAP usually limits these fields
+    desc_curta = desc_imobilizado[:50]
+
+    # Denominação do imobilizado (continuação): a NF - Nome do Fornecedor
+    desc_cont = f"{nf_formatada} - {fornecedor}".strip(" - ")
+
+    # Texto do nº principal do imobilizado: repete Denominação do imobilizado
+    texto_principal = desc_imobilizado
+
+    # Nº inventário: o numero do ativo fixo
+    num_inventario = row.fixed_asset_number or ""
+
+    data_formatada = row.purchase_date.strftime("%d%m%Y") if row.purchase_date else ""
+
+    # Formatando o montante para o padrão brasileiro (ex: 1.234,56)
+    montante = format_brl(row.invoice_value)
+
+    # TEXTO DO ITEM: repete Texto do nº principal do imobilizado
+    texto_item = texto_principal
+
+    return [classe, c_custo, desc_curta, desc_cont, texto_principal, num_inventario,
+            data_formatada, data_formatada, data_formatada, montante, texto_item]
+
+
+def report_row(row: ReportRow) -> list:
+    """One inventory report row."""
+    return [row.id, row.description, row.category, row.purchase_date, row.invoice_value, row.status, row.branch_id,
+            float(row.book_value) if row.book_value is not None else None]
+
+
+def _render_workbook(spool_path: str, out_path: str, header: list, layout, to_row) -> int:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(header)
+    written = 0
+    for chunk in read_spool(spool_path):
+        for values in chunk:
+            sheet.append(to_row(layout._make(values)))
+        written += len(chunk)
+    workbook.save(out_path)
+    return written
+
+
+def render_sap_workbook(spool_path: str, out_path: str, options: dict = None) -> int:
+    """SAP asset upload sheet. Returns the number of rows written."""
+    return _render_workbook(spool_path, out_path, SAP_HEADER, SapRow, sap_row)
+
+
+def render_inventory_workbook(spool_path: str, out_path: str, options: dict = None) -> int:
+    """Inventory report sheet. Returns the number of rows written."""
+    return _render_workbook(spool_path, out_path, REPORT_HEADER, ReportRow, report_row)
+
+
+# Pages kept in one canvas before it is written out as a part file
+PDF_PAGES_PER_PART = int(os.getenv("PDF_PAGES_PER_PART", 100))
+
+# Item statuses as printed on the PDF (rows and filters line); keyed by the enum value
+STATUS_LABELS = {
+    "PENDING": "Pendente", "APPROVED": "Aprovado", "REJECTED": "Rejeitado",
+    "TRANSFER_PENDING": "Transf. Pendente", "WRITE_OFF_PENDING": "Baixa Pendente",
+    "READY_FOR_WRITE_OFF": "Aguardando Baixa", "WRITTEN_OFF": "Baixado",
+    "MAINTENANCE": "Manutenção", "IN_STOCK": "Estoque", "IN_TRANSIT": "Em Trânsito",
+}
+
+
+def status_label(status) -> str:
+    value = getattr(status, "value", status)
+    return STATUS_LABELS.get(value, value or "")
+
+
+PDF_GROUP_TITLES = {"branch": "Filial", "cost_center": "Centro de Custo"}
+PDF_GROUP_EMPTY = {"branch": "Sem filial", "cost_center": "Sem centro de custo"}
+
+
+def pdf_section_label(row: PdfRow, group_by: str) -> str:
+    if group_by == "branch":
+        return row.branch_name or PDF_GROUP_EMPTY[group_by]
+    # Same text as the ORDER BY expression (concat_ws skips NULLs)
+    label = " - ".join(v for v in (row.cost_center_code, row.cost_center_name) if v)
+    return label or PDF_GROUP_EMPTY[group_by]
+
+
+class _PdfReport:
+    """
+    Inventory report drawn row by row. Every PDF_PAGES_PER_PART pages the canvas is
+    saved as a part file, so memory does not grow with the report; the parts are
+    merged into the output at the end.
+    """
+    columns = [
+        # (title, x, max chars); the value column is right-aligned at value_right
+        ("Ativo", 30, 16),
+        ("Descrição", 120, 58),
+        ("Categoria", 430, 24),
+        ("Compra", 570, None),
+        ("Status", 640, 20),
+        ("Valor (R$)", None, None),
+    ]
+
+    def __init__(self, out_path: str, title: str, subtitle: str = ""):
+        from reportlab.lib.pagesizes import A4, landscape
+
+        self.out_path = out_path
+        self.title = title
+        self.subtitle = subtitle
+        self.pagesize = landscape(A4)
+        self.width, self.height = self.pagesize
+        self.value_right = self.width - 30
+        self.parts = []
+        self.page_number = 0
+        self.pages_in_part = 0
+        self.canvas = None
+        self._new_part()
+        self._start_page()
+
+    def _new_part(self):
+        from reportlab.pdfgen import canvas
+
+        path = f"{self.out_path}.part{len(self.parts)}"
+        self.parts.append(path)
+        self.canvas = canvas.Canvas(path, pagesize=self.pagesize)
+        self.pages_in_part = 0
+
+    def _start_page(self):
+        p = self.canvas
+        self.page_number += 1
+        y = self.height - 40
+        p.setFont("Helvetica-Bold", 14)
+        p.drawString(30, y, self.title)
+        p.setFont("Helvetica", 8)
+        p.drawRightString(self.width - 30, y, f"Página {self.page_number}")
+        if self.subtitle:
+            y -= 14
+            p.drawString(30, y, self.subtitle[:180])
+        y -= 22
+        p.setFont("Helvetica-Bold", 9)
+        for title, x, _ in self.columns[:-1]:
+            p.drawString(x, y, title)
+        p.drawRightString(self.value_right, y, self.columns[-1][0])
+        p.line(30, y - 4, self.width - 30, y - 4)
+        self.y = y - 18
+        p.setFont("Helvetica", 9)
+
+    def _end_page(self):
+        self.canvas.showPage()
+        self.pages_in_part += 1
+        if self.pages_in_part >= PDF_PAGES_PER_PART:
+            self.canvas.save()
+            self._new_part()
+
+    def _ensure_space(self, height: float):
+        if self.y - height < 40:
+            self._end_page()
+            self._start_page()
+
+    def section(self, label: str):
+        self._ensure_space(40)
+        p = self.canvas
+        self.y -= 4
+        p.setFont("Helvetica-Bold", 10)
+        p.drawString(30, self.y, label)
+        p.setFont("Helvetica", 9)
+        self.y -= 16
+
+    def row(self, row: PdfRow):
+        self._ensure_space(14)
+        p = self.canvas
+        values = [
+            row.fixed_asset_number or "",
+            row.description or "",
+            row.category or "",
+            row.purchase_date.strftime("%d/%m/%Y") if row.purchase_date else "",
+            status_label(row.status),
+        ]
+        for (_, x, max_chars), value in zip(self.columns, values):
+            p.drawString(x, self.y, value[:max_chars] if max_chars else value)
+        p.drawRightString(self.value_right, self.y, format_brl(row.invoice_value))
+        self.y -= 14
+
+    def total(self, label: str, count: int, value: float):
+        self._ensure_space(24)
+        p = self.canvas
+        p.line(self.value_right - 200, self.y + 10, self.value_right, self.y + 10)
+        p.setFont("Helvetica-Bold", 9)
+        p.drawString(305, self.y, f"{label} ({count} {'item' if count == 1 else 'itens'})")
+        p.drawRightString(self.value_right, self.y, format_brl(value))
+        p.setFont("Helvetica", 9)
+        self.y -= 22
+
+    def save(self):
+        import fitz
+
+        self.canvas.showPage()
+        self.canvas.save()
+        if len(self.parts) == 1:
+            os.replace(self.parts[0], self.out_path)
+            return
+        merged = fitz.open()
+        try:
+            for part in self.parts:
+                with fitz.open(part) as src:
+                    merged.insert_pdf(src)
+            merged.save(self.out_path)
+        finally:
+            merged.close()
+            for part in self.parts:
+                if os.path.exists(part):
+                    os.remove(part)
+
+
+def render_inventory_pdf(spool_path: str, out_path: str, options: dict = None) -> int:
+    """
+    Inventory report PDF. options: group_by ("branch" / "cost_center") for sections
+    with subtotals, subtitle (filters description). Returns the number of rows written.
+    """
+    options = options or {}
+    group_by = options.get("group_by")
+    report = _PdfReport(out_path, "Relatório de Inventário", options.get("subtitle", ""))
+
+    written = 0
+    total_value = 0.0
+    section, section_count, section_value = None, 0, 0.0
+    for chunk in read_spool(spool_path):
+        for values in chunk:
+            row = PdfRow._make(values)
+            if group_by:
+                label = pdf_section_label(row, group_by)
+                if label != section:
+                    if section is not None:
+                        report.total(f"Subtotal {section}", section_count, section_value)
+                    section, section_count, section_value = label, 0, 0.0
+                    report.section(f"{PDF_GROUP_TITLES[group_by]}: {label}")
+                section_count += 1
+                section_value += row.invoice_value or 0.0
+            report.row(row)
+            total_value += row.invoice_value or 0.0
+        written += len(chunk)
+
+    if group_by and section is not None:
+        report.total(f"Subtotal {section}", section_count, section_value)
+    report.total("Total geral", written, total_value)
+    report.save()
+    return written
+
+
+# --- Pool ---
+
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+_metrics = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+    "reserved": 0,
+    "waiting": 0,
+    "running": 0,
+    "wait_seconds_total": 0.0,
+    "render_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs an event loop and DB/Redis connections is unsafe
+        _executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(RENDER_WORKERS)
+    return _slots
+
+
+def _queued() -> int:
+    return _metrics["reserved"] + _metrics["waiting"] + _metrics["running"]
+
+
+class RenderReservation:
+    """A place in the render queue held while an export fetches its rows."""
+
+    def __init__(self):
+        self.held = True
+        _metrics["reserved"] += 1
+
+    def release(self):
+        if self.held:
+            self.held = False
+            _metrics["reserved"] -= 1
+
+
+@contextlib.asynccontextmanager
+async def reserve(reject_when_full: bool = True):
+    """
+    Reserves a place in the render queue for the block (released on exit, or
+    handed over to render()). With reject_when_full, RenderQueueFull is raised
+    right away when RENDER_QUEUE_LIMIT places are taken.
+    """
+    if reject_when_full and _queued() >= RENDER_QUEUE_LIMIT:
+        _metrics["rejected"] += 1
+        raise RenderQueueFull("Fila de relatórios cheia")
+    reservation = RenderReservation()
+    try:
+        yield reservation
+    finally:
+        reservation.release()
+
+
+async def render(
+    renderer, spool_path: str, out_path: str, options: dict = None,
+    reject_when_full: bool = True, reservation: RenderReservation = None
+) -> int:
+    """
+    Runs `renderer(spool_path, out_path, options)` in the process pool. At most RENDER_WORKERS
+    renders run at once per process; the others wait in line. With a reservation
+    (see reserve()) its place is used; otherwise, with reject_when_full,
+    RenderQueueFull is raised instead of queueing beyond RENDER_QUEUE_LIMIT.
+    """
+    if reservation is not None:
+        reservation.release()
+    elif reject_when_full and _queued() >= RENDER_QUEUE_LIMIT:
+        _metrics["rejected"] += 1
+        raise RenderQueueFull("Fila de relatórios cheia")
+
+    _metrics["submitted"] += 1
+    _metrics["waiting"] += 1
+    queued_at = time.monotonic()
+    try:
+        await _get_slots().acquire()
+    finally:
+        _metrics["waiting"] -= 1
+
+    waited = time.monotonic() - queued_at
+    _metrics["wait_seconds_total"] += waited
+    _metrics["wait_seconds_max"] = max(_metrics["wait_seconds_max"], waited)
+    _metrics["running"] += 1
+    started_at = time.monotonic()
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_get_executor(), renderer, spool_path, out_path, options)
+        _metrics["completed"] += 1
+        return result
+    except Exception:
+        _metrics["failed"] += 1
+        raise
+    finally:
+        _metrics["running"] -= 1
+        _metrics["render_seconds_total"] += time.monotonic() - started_at
+        _get_slots().release()
+
+
+def render_metrics() -> dict:
+    """Counters of this process' render pool (queue depth, throughput, wait/render times)."""
+    finished = _metrics["completed"] + _metrics["failed"]
+    return {
+        **_metrics,
+        "workers": RENDER_WORKERS,
+        "queue_limit": RENDER_QUEUE_LIMIT,
+        "wait_seconds_avg": _metrics["wait_seconds_total"] / _metrics["submitted"] if _metrics["submitted"] else 0.0,
+        "render_seconds_avg": _metrics["render_seconds_total"] / finished if finished else 0.0,
+    }
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
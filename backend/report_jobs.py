@@ -0,0 +1,125 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+from backend.redis_client import get_redis_cache, get_arq_pool
+from backend.cache import get_items_version, branch_scope_key
+
+# --- Report jobs ---
+# Exports requested through POST /reports/jobs are generated by the arq worker
+# (generate_report_task) and stored under REPORTS_DIR for REPORT_JOB_TTL seconds.
+# The job state lives in the Redis hash "report_job:<id>"; the id is derived from
+# kind + filters + branch scope + item data version, so identical requests made
+# while the data is unchanged share one job. Users waiting on a job are kept in
+# "report_job:<id>:subscribers" and notified through the websocket when it ends.
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", "/app/uploads/reports")
+REPORT_JOB_TTL = int(os.getenv("REPORT_JOB_TTL", 24 * 3600))
+# Generation time limit in the worker (arq's default of 5 minutes is too short for full exports)
+REPORT_JOB_TIMEOUT = int(os.getenv("REPORT_JOB_TIMEOUT", 30 * 60))
+
+def _job_key(job_id: str) -> str:
+    return f"report_job:{job_id}"
+
+def _subscribers_key(job_id: str) -> str:
+    return f"report_job:{job_id}:subscribers"
+
+def report_job_id(kind: str, filters: dict, allowed_branch_ids: Optional[list], version: int) -> str:
+    fingerprint = json.dumps(
+        {"kind": kind, "filters": filters, "scope": branch_scope_key(allowed_branch_ids), "version": version},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+async def get_report_job(job_id: str) -> Optional[dict]:
+    """Job state as stored by the API/worker, or None if unknown or expired."""
+    redis = await get_redis_cache()
+    data = await redis.hgetall(_job_key(job_id))
+    if not data:
+        return None
+    job = dict(data)
+    job["id"] = job_id
+    job.setdefault("status", "queued")
+    job["progress"] = int(job.get("progress") or 0)
+    job["rows"] = int(job.get("rows") or 0)
+    job["filters"] = json.loads(job.get("filters") or "{}")
+    job["allowed_branch_ids"] = json.loads(job.get("allowed_branch_ids") or "null")
+    return job
+
+async def update_report_job(job_id: str, **fields):
+    redis = await get_redis_cache()
+    await redis.hset(_job_key(job_id), mapping={k: ("" if v is None else v) for k, v in fields.items()})
+
+async def get_report_job_subscribers(job_id: str) -> list[int]:
+    redis = await get_redis_cache()
+    return [int(u) for u in await redis.smembers(_subscribers_key(job_id))]
+
+async def is_report_job_subscriber(job_id: str, user_id: int) -> bool:
+    redis = await get_redis_cache()
+    return bool(await redis.sismember(_subscribers_key(job_id), user_id))
+
+# Creates the job hash in one step, unless a live (not failed) job already has it.
+# KEYS[1] = job hash; ARGV[1] = ttl, ARGV[2..] = field/value pairs.
+# Returns the new attempt number, or 0 when the existing job is kept.
+_CREATE_JOB_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if status and status ~= 'failed' then
+    return 0
+end
+local attempt = redis.call('HINCRBY', KEYS[1], 'attempt', 1)
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return attempt
+"""
+
+async def submit_report_job(kind: str, filters: dict, allowed_branch_ids: Optional[list], user_id: int) -> dict:
+    """
+    Returns the job for these parameters, enqueuing it only if no live job exists
+    (a failed job is retried). The caller is added to the job subscribers.
+    """
+    version = await get_items_version()
+    job_id = report_job_id(kind, filters, allowed_branch_ids, version)
+    redis = await get_redis_cache()
+
+    await redis.sadd(_subscribers_key(job_id), user_id)
+    await redis.expire(_subscribers_key(job_id), REPORT_JOB_TTL)
+
+    # Only the first request for these parameters (or the first retry of a failed
+    # job) writes the hash and enqueues it; the others read a complete job
+    fields = {
+        "status": "queued",
+        "kind": kind,
+        "progress": 0,
+        "rows": 0,
+        "error": "",
+        "file": "",
+        "filters": json.dumps(filters, default=str),
+        "allowed_branch_ids": json.dumps(allowed_branch_ids),
+        "created_at": _now(),
+        "finished_at": "",
+    }
+    attempt = await redis.eval(
+        _CREATE_JOB_SCRIPT, 1, _job_key(job_id), REPORT_JOB_TTL,
+        *[str(item) for pair in fields.items() for item in pair]
+    )
+    if not attempt:
+        return await get_report_job(job_id)
+
+    try:
+        pool = await get_arq_pool()
+        # One arq job per attempt: a repeated enqueue of the same attempt is a no-op
+        await pool.enqueue_job("generate_report_task", job_id, _job_id=f"report:{job_id}:{attempt}")
+    except Exception as e:
+        print(f"Report job {job_id} enqueue failed: {e}")
+        # Failed jobs are retried by the next identical request instead of waiting forever
+        await update_report_job(job_id, status="failed", error="Falha ao enfileirar o relatório.", finished_at=_now())
+    return await get_report_job(job_id)
+
+def report_file_path(job: dict) -> Optional[str]:
+    if not job.get("file"):
+        return None
+    return os.path.join(REPORTS_DIR, job["file"])
@@ -0,0 +1,200 @@
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import event, inspect, func, select, delete, text, cast
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from backend import models
+
+# --- Inventory rollup (models.InventoryRollup) ---
+# Item count and invoice value per (branch_id, category_id, cost_center_id, status),
+# kept in step with items by applying the deltas of every flush in the same
+# transaction, whatever code path changed the items (create, status changes,
+# request approve/reject, bulk transfer/write-off, edits, imports, deletes).
+#
+# Bulk UPDATE/DELETE statements on items bypass the unit of work and cannot be
+# turned into deltas; they are reported and left to reconcile_rollup().
+
+BUCKET_COLUMNS = ("branch_id", "category_id", "cost_center_id", "status")
+_TRACKED_COLUMNS = BUCKET_COLUMNS + ("invoice_value",)
+_CENT = Decimal("0.01")
+
+
+def _money(value) -> Decimal:
+    """Invoice value as stored in the rollup (rounded to cents, same as the rebuild query)."""
+    if value is None:
+        return Decimal(0)
+    # Half away from zero, like the numeric cast used by the rebuild query
+    return Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def _current_values(obj) -> tuple:
+    return tuple(getattr(obj, col) for col in _TRACKED_COLUMNS)
+
+
+def _committed_values(state):
+    """Values of the tracked columns before this flush, or None if one of them was not loaded."""
+    values = []
+    for col in _TRACKED_COLUMNS:
+        history = state.attrs[col].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            # Expired/never loaded (or set without the old value loaded)
+            return None
+    return tuple(values)
+
+
+def _capture_old_buckets(session) -> dict:
+    """Old values of the items this flush updates or deletes, read while the rows are untouched."""
+    old = {}
+    missing = {}
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, models.Item) or obj in old:
+            continue
+        state = inspect(obj)
+        if state.key is None:
+            continue
+        if obj not in session.deleted and not any(state.attrs[col].history.has_changes() for col in _TRACKED_COLUMNS):
+            continue
+        values = _committed_values(state)
+        if values is None:
+            missing[obj.id] = obj
+        else:
+            old[obj] = values
+
+    if missing:
+        Item = models.Item
+        result = session.connection().execute(
+            select(Item.id, *(getattr(Item, col) for col in _TRACKED_COLUMNS)).where(Item.id.in_(list(missing)))
+        )
+        for row in result:
+            old[missing[row[0]]] = tuple(row[1:])
+    return old
+
+
+def _collect_deltas(session, old: dict) -> dict:
+    deltas = {}
+
+    def add(values, sign):
+        key, value = values[:4], values[4]
+        count, total = deltas.get(key, (0, Decimal(0)))
+        deltas[key] = (count + sign, total + sign * _money(value))
+
+    for obj in session.new:
+        if isinstance(obj, models.Item):
+            add(_current_values(obj), 1)
+
+    for obj, values in old.items():
+        add(values, -1)
+        if obj not in session.deleted:
+            add(_current_values(obj), 1)
+
+    return {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+
+
+def _upsert_statement(deltas: dict):
+    Rollup = models.InventoryRollup
+    # Sorted keys: concurrent transactions lock the bucket rows in the same order
+    rows = [
+        dict(zip(BUCKET_COLUMNS, key), item_count=count, total_value=total)
+        for key, (count, total) in sorted(deltas.items(), key=lambda kv: tuple((v is None, str(v)) for v in kv[0]))
+    ]
+    stmt = insert(Rollup).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[getattr(Rollup, col) for col in BUCKET_COLUMNS],
+        set_={
+            "item_count": Rollup.item_count + stmt.excluded.item_count,
+            "total_value": Rollup.total_value + stmt.excluded.total_value,
+        }
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _capture_item_changes(session, flush_context, instances):
+    session.info["rollup_old"] = _capture_old_buckets(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_item_deltas(session, flush_context):
+    # session.new/deleted still hold the pre-flush state here, while server and
+    # column defaults of the inserted items are already populated
+    deltas = _collect_deltas(session, session.info.pop("rollup_old", {}))
+    if deltas:
+        session.connection().execute(_upsert_statement(deltas))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_item_statements(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is models.Item:
+        orm_execute_state.session.info["rollup_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _report_stale_rollup(session):
+    if session.info.pop("rollup_stale", False):
+        print("Rollup Warning: itens alterados fora do unit of work, o rollup será corrigido na próxima reconciliação")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stale_flag(session):
+    session.info.pop("rollup_stale", None)
+    session.info.pop("rollup_old", None)
+
+
+def _bucket_query():
+    """Buckets computed from items, with the same rounding as the incremental path."""
+    Item = models.Item
+    return select(
+        Item.branch_id, Item.category_id, Item.cost_center_id, Item.status,
+        func.count(Item.id).label("item_count"),
+        func.coalesce(func.sum(cast(Item.invoice_value, models.InventoryRollup.total_value.type)), 0).label("total_value"),
+    ).group_by(Item.branch_id, Item.category_id, Item.cost_center_id, Item.status)
+
+
+async def reconcile_rollup(db: AsyncSession, repair: bool = True) -> dict:
+    """
+    Compares the rollup against a full aggregation of items.
+    With repair=True mismatching buckets are rewritten and the transaction is committed.
+    Writers are blocked on the rollup table while the check runs, so both sides
+    reflect the same committed item changes.
+    """
+    Rollup = models.InventoryRollup
+    await db.execute(text("LOCK TABLE inventory_rollup IN SHARE ROW EXCLUSIVE MODE"))
+
+    expected = {
+        tuple(row[:4]): (row.item_count, Decimal(row.total_value))
+        for row in (await db.execute(_bucket_query())).all()
+    }
+    stored = {}
+    for row in (await db.execute(select(Rollup))).scalars().all():
+        stored[(row.branch_id, row.category_id, row.cost_center_id, row.status)] = (row.item_count, Decimal(row.total_value))
+
+    mismatched = [
+        key for key in set(expected) | set(stored)
+        if expected.get(key, (0, Decimal(0))) != stored.get(key, (0, Decimal(0)))
+    ]
+    # Buckets emptied by moves keep a zero row until the next reconciliation
+    empty = [key for key, delta in stored.items() if delta == (0, 0) and key not in expected]
+
+    if repair and (mismatched or empty):
+        await db.execute(delete(Rollup))
+        rows = [dict(zip(BUCKET_COLUMNS, key), item_count=count, total_value=total)
+                for key, (count, total) in expected.items()]
+        if rows:
+            await db.execute(insert(Rollup).values(rows))
+    await db.commit()
+
+    if mismatched:
+        print(f"Rollup Reconciliation: {len(mismatched)} bucket(s) divergente(s){' corrigido(s)' if repair else ''}")
+
+    return {
+        "buckets": len(expected),
+        "mismatched": len(mismatched),
+        "empty_removed": len(empty) if repair else 0,
+        "repaired": bool(repair and mismatched),
+    }
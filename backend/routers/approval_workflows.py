@@ -10,7 +10,7 @@ router = APIRouter(prefix="/approval-workflows", tags=["approval-workflows"])
 async def read_approval_workflows(
     category_id: int = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -20,7 +20,7 @@ async def read_approval_workflows(
 async def create_approval_workflow(
     workflow: schemas.ApprovalWorkflowCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -33,7 +33,7 @@ async def create_approval_workflow(
 async def reorder_approval_workflows(
     updates: List[dict],
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -46,7 +46,7 @@ async def update_approval_workflow(
     workflow_id: int,
     workflow_update: schemas.ApprovalWorkflowUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -60,7 +60,7 @@ async def update_approval_workflow(
 async def delete_approval_workflow(
     workflow_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -9,10 +9,12 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Backgro
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.database import get_db, DATABASE_URL
-from backend.auth import get_current_user
-from backend.models import User, UserRole, Log
-from backend.cache import invalidate_cache
+from backend.database import get_db, DATABASE_URL, SessionLocal
+from backend.auth import get_current_user, Principal, invalidate_all_principals
+from backend.models import UserRole, Log
+from backend.cache import invalidate_cache, bump_items_version
+from backend.rollup import reconcile_rollup
+from backend import report_jobs, notifications
 
 router = APIRouter(
     prefix="/backup",
@@ -49,7 +51,7 @@ def get_db_connection_params():
 @router.get("/export")
 async def export_backup(
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -115,6 +117,8 @@ async def export_backup(
             uploads_dir = "/app/uploads"
             if os.path.exists(uploads_dir):
                 for root, dirs, files in os.walk(uploads_dir):
+                    # Generated report files are temporary, not part of the backup
+                    dirs[:] = [d for d in dirs if os.path.join(root, d) != report_jobs.REPORTS_DIR]
                     for file in files:
                         file_path = os.path.join(root, file)
                         # Archive name should be relative to allow restoration
@@ -157,7 +161,7 @@ async def export_backup(
 @router.post("/import")
 async def import_backup(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -325,6 +329,19 @@ async def import_backup(
         await invalidate_cache("settings:*")
         await invalidate_cache("branches:*")
         await invalidate_cache("categories:*")
+        await invalidate_all_principals()
+        # users/user_branches were rewritten: cached branch members would be the old ones
+        await notifications.invalidate_branch_members()
+        # Items were replaced outside the ORM: new data version (report jobs) and dashboards
+        await bump_items_version()
+        await invalidate_cache("dashboard:*")
+
+        # Dumps do not necessarily carry inventory_rollup (older backups): rebuild it
+        try:
+            async with SessionLocal() as restore_db:
+                await reconcile_rollup(restore_db)
+        except Exception as e:
+            print(f"Erro ao reconstruir rollup após restore: {e}")
 
         return {"message": "Restauração concluída com sucesso. Por favor, faça login novamente se necessário."}
 
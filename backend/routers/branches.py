@@ -16,7 +16,7 @@ async def read_branches(
     search: str = None,
     scope: str = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     branches = await crud.get_branches(db, skip=skip, limit=limit, search=search)
 
@@ -25,9 +25,7 @@ async def read_branches(
     # In a stricter system, we might want a separate endpoint or permission check,
     # but for this requirement "Operator sees all branches for transfer", we allow it.
     if current_user.role == models.UserRole.OPERATOR and scope != 'all':
-        allowed_branch_ids = {b.id for b in current_user.branches}
-        if current_user.branch_id:
-            allowed_branch_ids.add(current_user.branch_id)
+        allowed_branch_ids = set(current_user.allowed_branch_ids)
 
         # Filter the list
         branches = [b for b in branches if b.id in allowed_branch_ids]
@@ -38,7 +36,7 @@ async def read_branches(
 async def create_branch(
     branch: schemas.BranchCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores e aprovadores podem criar filiais")
@@ -52,7 +50,7 @@ async def update_branch(
     branch_id: int,
     branch: schemas.BranchBase,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores e aprovadores podem editar filiais")
@@ -67,7 +65,7 @@ async def update_branch(
 async def delete_branch(
     branch_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores e aprovadores podem excluir filiais")
@@ -15,7 +15,7 @@ async def read_cost_centers(
     limit: int = 100,
     search: str = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # All authenticated users can read (for dropdowns)
     return await crud.get_cost_centers(db, skip=skip, limit=limit, search=search)
@@ -24,7 +24,7 @@ async def read_cost_centers(
 async def create_cost_center(
     cost_center: schemas.CostCenterCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores e aprovadores podem criar centros de custo")
@@ -36,7 +36,7 @@ async def update_cost_center(
     cost_center_id: int,
     cost_center: schemas.CostCenterUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissão negada")
@@ -50,7 +50,7 @@ async def update_cost_center(
 async def delete_cost_center(
     cost_center_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissão negada")
@@ -64,7 +64,7 @@ async def delete_cost_center(
 
 @router.get("/import/template")
 async def get_import_template(
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
          raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissão negada")
@@ -92,7 +92,7 @@ async def get_import_template(
 async def import_cost_centers(
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissão negada")
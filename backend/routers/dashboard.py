@@ -1,99 +1,164 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func
-from sqlalchemy.future import select
-from backend import models, auth
+from typing import List, Optional
+from datetime import date
+from backend import models, auth, crud, schemas
 from backend.database import get_db
+from backend.cache import get_cached_json, set_cached_json, branch_scope_key
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+DASHBOARD_STATS_TTL = 300
+# Snapshots change once a day; the snapshot job drops "trends:*" after writing
+TRENDS_TTL = 3600
+
 @router.get("/stats")
-async def get_dashboard_stats(db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def get_dashboard_stats(
+    purchase_date_from: Optional[date] = None,
+    purchase_date_to: Optional[date] = None,
+    created_at_from: Optional[date] = None,
+    created_at_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
     # Base Filters based on user role
-    branch_filter = None
+    allowed_branch_ids = None
     # AUDITOR também pode ver tudo
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR]:
-         # Filtrar por lista de branches permitidas
-         allowed_branches = [b.id for b in current_user.branches]
-         if current_user.branch_id and current_user.branch_id not in allowed_branches:
-             allowed_branches.append(current_user.branch_id)
-
-         if allowed_branches:
-             branch_filter = models.Item.branch_id.in_(allowed_branches)
-         else:
-             # Se não tem branches, não vê nada (filtros impossível)
-             branch_filter = models.Item.id == -1
-
-    # Total Pending Items
-    query_pending = select(func.count(models.Item.id)).where(models.Item.status == models.ItemStatus.PENDING)
-    if branch_filter is not None:
-        query_pending = query_pending.where(branch_filter)
-    result_pending = await db.execute(query_pending)
-    pending_count = result_pending.scalar()
-
-    # Total Value of Pending Items
-    query_value = select(func.sum(models.Item.invoice_value)).where(models.Item.status == models.ItemStatus.PENDING)
-    if branch_filter is not None:
-        query_value = query_value.where(branch_filter)
-    result_value = await db.execute(query_value)
-    pending_value = result_value.scalar() or 0.0
-
-    # Total Write-off Pending Items
-    query_write_off = select(func.count(models.Item.id)).where(models.Item.status == models.ItemStatus.WRITE_OFF_PENDING)
-    if branch_filter is not None:
-        query_write_off = query_write_off.where(branch_filter)
-    result_write_off = await db.execute(query_write_off)
-    write_off_count = result_write_off.scalar()
-
-    # Items by Category (Only approved/active items)
-    query_category = select(models.Item.category, func.count(models.Item.id))
-    
-    # Exclude pending, rejected, and written-off items
-    query_category = query_category.where(
-        ~models.Item.status.in_([models.ItemStatus.PENDING, models.ItemStatus.REJECTED, models.ItemStatus.WRITTEN_OFF])
-    )
-
-    if branch_filter is not None:
-        query_category = query_category.where(branch_filter)
-
-    query_category = query_category.group_by(models.Item.category)
-    result_category = await db.execute(query_category)
-    items_by_category = [{"category": row[0], "count": row[1]} for row in result_category.all()]
-
-    # Items by Branch (Only approved/active items)
-    query_branch = select(models.Branch.id, models.Branch.name, func.count(models.Item.id)).join(models.Branch, models.Item.branch_id == models.Branch.id)
-    
-    # Exclude pending, rejected, and written-off items
-    query_branch = query_branch.where(
-        ~models.Item.status.in_([models.ItemStatus.PENDING, models.ItemStatus.REJECTED, models.ItemStatus.WRITTEN_OFF])
+         # Filtrar por lista de branches permitidas (vazia = não vê nada)
+         allowed_branch_ids = current_user.allowed_branch_ids
+
+    # One cache entry per branch scope and date window, dropped on any item change
+    cache_key = ":".join([
+        "dashboard", "stats", branch_scope_key(allowed_branch_ids),
+        *(str(d or "") for d in (purchase_date_from, purchase_date_to, created_at_from, created_at_to))
+    ])
+    stats = await get_cached_json(cache_key)
+    if stats is not None:
+        return stats
+
+    stats = await crud.get_dashboard_stats(
+        db, allowed_branch_ids=allowed_branch_ids,
+        purchase_date_from=purchase_date_from, purchase_date_to=purchase_date_to,
+        created_at_from=created_at_from, created_at_to=created_at_to
     )
-
-    if branch_filter is not None:
-        query_branch = query_branch.where(branch_filter)
-
-    query_branch = query_branch.group_by(models.Branch.id, models.Branch.name)
-    result_branch = await db.execute(query_branch)
-    items_by_branch = [{"branch_id": row[0], "branch": row[1], "count": row[2]} for row in result_branch.all()]
-
-    # Write-offs by Reason (Baixas por Motivo)
-    query_reason = select(models.Item.write_off_reason, func.count(models.Item.id), func.sum(models.Item.invoice_value))\
-        .where(models.Item.status == models.ItemStatus.WRITTEN_OFF)
-
-    if branch_filter is not None:
-        query_reason = query_reason.where(branch_filter)
-
-    query_reason = query_reason.group_by(models.Item.write_off_reason)
-    result_reason = await db.execute(query_reason)
-    write_offs_by_reason = [
-        {"reason": row[0] or "Não especificado", "count": row[1], "value": row[2] or 0.0}
-        for row in result_reason.all()
-    ]
-
-    return {
-        "pending_items_count": pending_count,
-        "pending_items_value": pending_value,
-        "write_off_count": write_off_count,
-        "items_by_category": items_by_category,
-        "items_by_branch": items_by_branch,
-        "write_offs_by_reason": write_offs_by_reason
-    }
+    await set_cached_json(cache_key, stats, ttl=DASHBOARD_STATS_TTL)
+    return stats
+
+@router.get("/aggregate")
+async def get_dashboard_aggregate(
+    request: Request,
+    group_by: List[str] = Query([]),
+    metrics: List[str] = Query(["count"]),
+    status: List[models.ItemStatus] = Query([]),
+    branch_id: List[int] = Query([]),
+    category_id: List[int] = Query([]),
+    cost_center_id: List[int] = Query([]),
+    sector_id: List[int] = Query([]),
+    supplier_id: List[int] = Query([]),
+    search: Optional[str] = None,
+    purchase_date_from: Optional[date] = None,
+    purchase_date_to: Optional[date] = None,
+    created_at_from: Optional[date] = None,
+    created_at_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Aggregated buckets for the dashboard widgets.
+    group_by: branch, category, cost_center, sector, status, supplier, purchase_month (repeatable).
+    metrics: count, sum_invoice_value, avg_invoice_value, sum_book_value, count_zero_book_value (repeatable).
+    sum_book_value is the net book value at the end of the last closed depreciation month;
+    count_zero_book_value counts the items fully depreciated by then.
+    Filters are repeatable too (e.g. ?status=APPROVED&status=IN_STOCK).
+    """
+    # Same branch scope as GET /items/
+    allowed_branch_ids = None
+    if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR, models.UserRole.REVIEWER] and not current_user.all_branches:
+        allowed_branch_ids = current_user.allowed_branch_ids
+        if any(b not in allowed_branch_ids for b in branch_id):
+            raise HTTPException(status_code=403, detail="Acesso negado a esta filial")
+
+    cache_key = f"dashboard:aggregate:{branch_scope_key(allowed_branch_ids)}:{request.url.query}"
+    buckets = await get_cached_json(cache_key)
+    if buckets is None:
+        try:
+            buckets = await crud.get_dashboard_aggregate(
+                db, group_by=group_by, metrics=metrics, allowed_branch_ids=allowed_branch_ids,
+                statuses=status, branch_ids=branch_id, category_ids=category_id,
+                cost_center_ids=cost_center_id, sector_ids=sector_id, supplier_ids=supplier_id,
+                search=search, purchase_date_from=purchase_date_from, purchase_date_to=purchase_date_to,
+                created_at_from=created_at_from, created_at_to=created_at_to
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await set_cached_json(cache_key, buckets, ttl=DASHBOARD_STATS_TTL)
+
+    return {"group_by": group_by, "metrics": metrics, "buckets": buckets}
+
+@router.get("/items", response_model=List[schemas.ItemResponse])
+async def get_dashboard_items(
+    order: str = "book_value",
+    limit: int = Query(10, ge=1, le=50),
+    status: List[models.ItemStatus] = Query([]),
+    branch_id: List[int] = Query([]),
+    category_id: List[int] = Query([]),
+    search: Optional[str] = None,
+    purchase_date_from: Optional[date] = None,
+    purchase_date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Item lists of the dashboard widgets: order=book_value (highest net book value)
+    or order=recent (last registered), at most `limit` items, with the filters of /aggregate.
+    """
+    allowed_branch_ids = None
+    if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR, models.UserRole.REVIEWER] and not current_user.all_branches:
+        allowed_branch_ids = current_user.allowed_branch_ids
+        if any(b not in allowed_branch_ids for b in branch_id):
+            raise HTTPException(status_code=403, detail="Acesso negado a esta filial")
+
+    try:
+        return await crud.get_dashboard_items(
+            db, order=order, limit=limit, allowed_branch_ids=allowed_branch_ids,
+            statuses=status, branch_ids=branch_id, category_ids=category_id, search=search,
+            purchase_date_from=purchase_date_from, purchase_date_to=purchase_date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/trends")
+async def get_dashboard_trends(
+    request: Request,
+    months: int = Query(12, ge=1, le=60),
+    group_by: List[str] = Query([]),
+    status: List[models.ItemStatus] = Query([]),
+    branch_id: List[int] = Query([]),
+    category_id: List[int] = Query([]),
+    db: AsyncSession = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Month-over-month inventory series from the daily snapshots.
+    group_by: branch, category, status (repeatable). Each point carries count and total_value.
+    """
+    allowed_branch_ids = None
+    if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR, models.UserRole.REVIEWER] and not current_user.all_branches:
+        allowed_branch_ids = current_user.allowed_branch_ids
+        if any(b not in allowed_branch_ids for b in branch_id):
+            raise HTTPException(status_code=403, detail="Acesso negado a esta filial")
+
+    cache_key = f"trends:{branch_scope_key(allowed_branch_ids)}:{request.url.query}"
+    points = await get_cached_json(cache_key)
+    if points is None:
+        try:
+            points = await crud.get_inventory_trends(
+                db, months=months, group_by=group_by, allowed_branch_ids=allowed_branch_ids,
+                statuses=status, branch_ids=branch_id, category_ids=category_id
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await set_cached_json(cache_key, points, ttl=TRENDS_TTL)
+
+    return {"months": months, "group_by": group_by, "points": points}
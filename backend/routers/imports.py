@@ -57,7 +57,7 @@ async def upload_import(
     branch_id: int = Form(...),
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Permission Check
     if current_user.role == models.UserRole.AUDITOR:
@@ -65,8 +65,7 @@ async def upload_import(
 
     # Branch Permission
     if current_user.role == models.UserRole.OPERATOR and not current_user.all_branches:
-        allowed = [b.id for b in current_user.branches]
-        if current_user.branch_id: allowed.append(current_user.branch_id)
+        allowed = current_user.allowed_branch_ids
         if branch_id not in allowed:
              raise HTTPException(status_code=403, detail="Sem permissão para esta filial")
 
@@ -270,7 +269,7 @@ async def upload_categories(
     update_existing: bool = Form(False),
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER] and not current_user.can_import:
         raise HTTPException(status_code=403, detail="Sem permissão para importar categorias")
@@ -384,7 +383,7 @@ async def upload_suppliers(
     file: UploadFile = File(...),
     update_existing: bool = Form(False),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissão negada")
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Request
-from typing import List, Optional
+from typing import List, Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend import schemas, models, crud, auth, notifications, workflow_engine
+from backend import schemas, models, crud, auth, notifications, workflow_engine, loaders
 from backend.database import get_db
 import shutil
 import os
 import json
-from datetime import datetime
+from datetime import datetime, date
 from backend.audit import calculate_diff
 import fitz  # PyMuPDF
 from PIL import Image
@@ -239,7 +239,7 @@ async def notify_status_change(db: AsyncSession, item: models.Item, old_status:
 @router.get("/my-requests", response_model=List[schemas.ItemResponse])
 async def read_my_requests(
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     Returns items initiated/responsible by the current user that are in a PENDING state.
@@ -254,13 +254,7 @@ async def read_my_requests(
 
     # Fetch items responsible by user AND in pending status
     from sqlalchemy.future import select
-    query = select(models.Item).options(
-        crud.selectinload(models.Item.branch),
-        crud.selectinload(models.Item.transfer_target_branch),
-        crud.selectinload(models.Item.category_rel),
-        crud.selectinload(models.Item.supplier),
-        crud.selectinload(models.Item.responsible)
-    ).where(
+    query = select(models.Item).options(*loaders.ITEM_LIST).where(
         models.Item.responsible_id == current_user.id,
         models.Item.status.in_(pending_statuses)
     )
@@ -299,19 +293,17 @@ async def read_my_requests(
 @router.get("/pending-actions", response_model=List[schemas.ItemResponse])
 async def read_pending_actions(
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     Returns items that require operator action (Receipt or Finalize Write-off).
     """
-    allowed_branches = [b.id for b in current_user.branches]
-    if current_user.branch_id and current_user.branch_id not in allowed_branches:
-        allowed_branches.append(current_user.branch_id)
+    allowed_branches = current_user.allowed_branch_ids
 
     items = await crud.get_pending_action_items(db, current_user.id, allowed_branches)
     return items
 
-@router.get("/", response_model=List[schemas.ItemResponse])
+@router.get("/", response_model=Union[List[schemas.ItemResponse], schemas.ItemPage, schemas.ItemListView])
 async def read_items(
     skip: int = 0,
     limit: int = 100,
@@ -322,14 +314,32 @@ async def read_items(
     description: Optional[str] = None,
     fixed_asset_number: Optional[str] = None,
     purchase_date: Optional[str] = None,
+    purchase_date_from: Optional[date] = None,
+    purchase_date_to: Optional[date] = None,
+    created_at_from: Optional[date] = None,
+    created_at_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    view: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
+    """
+    Lists items. Passing `cursor` (empty for the first page) switches to keyset
+    pagination ordered by id and returns {"items": [...], "next_cursor": ...};
+    without it the legacy skip/limit list is returned.
+    `view=summary` returns the compact projection (scalar rows plus branch/category/
+    supplier dictionaries) instead of full ItemResponse objects.
+    """
+    filters = dict(
+        status=status, category=category, branch_id=branch_id, search=search,
+        description=description, fixed_asset_number=fixed_asset_number, purchase_date=purchase_date,
+        purchase_date_from=purchase_date_from, purchase_date_to=purchase_date_to,
+        created_at_from=created_at_from, created_at_to=created_at_to
+    )
+
     # Enforce branch filtering for non-admins (Approvers and Auditors can see all)
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR, models.UserRole.REVIEWER] and not current_user.all_branches:
-        allowed_branches = [b.id for b in current_user.branches]
-        if current_user.branch_id and current_user.branch_id not in allowed_branches:
-            allowed_branches.append(current_user.branch_id)
+        allowed_branches = current_user.allowed_branch_ids
 
         if branch_id:
             if branch_id not in allowed_branches:
@@ -337,16 +347,24 @@ async def read_items(
 
         # Modified Logic: If no specific branch filter is requested,
         # return items in allowed branches OR items in transit TO allowed branches.
-        return await crud.get_items(
-            db, skip=skip, limit=limit, status=status, category=category, branch_id=None,
-            search=search, allowed_branch_ids=allowed_branches, description=description,
-            fixed_asset_number=fixed_asset_number, purchase_date=purchase_date
-        )
+        filters["branch_id"] = None
+        filters["allowed_branch_ids"] = allowed_branches
 
-    return await crud.get_items(
-        db, skip=skip, limit=limit, status=status, category=category, branch_id=branch_id,
-        search=search, description=description, fixed_asset_number=fixed_asset_number, purchase_date=purchase_date
-    )
+    if view == "summary":
+        try:
+            summary = await crud.get_items_summary(db, skip=skip, limit=limit, cursor=cursor, **filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return schemas.ItemListView(**summary)
+
+    if cursor is not None:
+        try:
+            items, next_cursor = await crud.get_items_page(db, cursor=cursor, limit=limit, **filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return schemas.ItemPage(items=items, next_cursor=next_cursor)
+
+    return await crud.get_items(db, skip=skip, limit=limit, **filters)
 
 from pydantic import BaseModel
 
@@ -359,13 +377,31 @@ async def check_asset(
     fixed_asset_number: str,
     exclude_item_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     item = await crud.get_item_by_fixed_asset(db, fixed_asset_number, exclude_item_id)
     if item:
         return CheckAssetResponse(exists=True, item=item)
     return CheckAssetResponse(exists=False, item=None)
 
+@router.get("/{item_id}", response_model=schemas.ItemResponse)
+async def read_item(
+    item_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Item with its history (loader profile "item-detail"), used by the details modal."""
+    item = await crud.get_item(db, item_id, profile="item-detail")
+    if not item:
+        raise HTTPException(status_code=404, detail="Item não encontrado")
+
+    if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR, models.UserRole.REVIEWER] and not current_user.all_branches:
+        allowed_branches = current_user.allowed_branch_ids
+        if item.branch_id not in allowed_branches and item.transfer_target_branch_id not in allowed_branches:
+            raise HTTPException(status_code=403, detail="Acesso negado a esta filial")
+
+    return item
+
 @router.post("/", response_model=schemas.ItemResponse)
 async def create_item(
     request: Request,
@@ -381,15 +417,13 @@ async def create_item(
     observations: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role == models.UserRole.AUDITOR:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Auditores não podem criar itens")
 
     if current_user.role == models.UserRole.OPERATOR and not current_user.all_branches:
-        allowed_branches = [b.id for b in current_user.branches]
-        if current_user.branch_id and current_user.branch_id not in allowed_branches:
-            allowed_branches.append(current_user.branch_id)
+        allowed_branches = current_user.allowed_branch_ids
         if branch_id not in allowed_branches:
             raise HTTPException(status_code=403, detail="Você não tem permissão para criar itens nesta filial")
 
@@ -499,19 +533,15 @@ async def create_item(
             await db.commit()
 
         # Explicitly refresh with relationships to prevent MissingGreenlet in notification logic
-        from sqlalchemy.orm import selectinload
         from sqlalchemy.future import select
-        query = select(models.Item).where(models.Item.id == db_item.id).options(
-            selectinload(models.Item.branch),
-            selectinload(models.Item.category_rel)
-        )
+        query = select(models.Item).where(models.Item.id == db_item.id).options(*loaders.ITEM_LIST)
         result = await db.execute(query)
         db_item = result.scalars().first()
 
         # Notify Approvers
         if db_item.status == models.ItemStatus.PENDING:
             # WebSocket Broadcast (JSON Payload)
-            from backend.websocket_manager import manager
+            from backend.websocket_manager import publish_event
             # Calculate approvers for WS targeting
             approvers = await workflow_engine.get_current_step_approvers(db, db_item, models.ApprovalActionType.CREATE)
             approver_ids = [u.id for u in approvers]
@@ -520,10 +550,10 @@ async def create_item(
                 "message": f"Novo item cadastrado: {db_item.description}",
                 "actor_id": current_user.id,
                 "target_roles": ["ADMIN", "APPROVER"],
-                "target_user_ids": approver_ids,
+                "target_user_ids": approver_ids or None,  # none: fall back to the roles
                 "target_branch_id": db_item.branch_id
             }
-            await manager.broadcast(json.dumps(payload))
+            await publish_event(payload)
 
             # Persistent Notification & Email
             frontend_url = request.headers.get("origin")
@@ -541,7 +571,7 @@ async def bulk_write_off(
     payload: schemas.BulkWriteOffRequest,
     request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     Solicita baixa em lote de itens.
@@ -567,8 +597,7 @@ async def bulk_write_off(
 
         # Permission check per item
         if current_user.role == models.UserRole.OPERATOR and not current_user.all_branches:
-             allowed = [b.id for b in current_user.branches]
-             if current_user.branch_id: allowed.append(current_user.branch_id)
+             allowed = current_user.allowed_branch_ids
              if item.branch_id not in allowed:
                  raise HTTPException(status_code=403, detail=f"Sem permissão para o item {item.description}")
 
@@ -654,7 +683,7 @@ async def bulk_transfer(
     payload: schemas.BulkTransferRequest,
     request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     Solicita transferência em lote de itens.
@@ -711,8 +740,7 @@ async def bulk_transfer(
     for item in items:
         # Permission check
         if current_user.role == models.UserRole.OPERATOR and not current_user.all_branches:
-             allowed = [b.id for b in current_user.branches]
-             if current_user.branch_id: allowed.append(current_user.branch_id)
+             allowed = current_user.allowed_branch_ids
              if item.branch_id not in allowed:
                  raise HTTPException(status_code=403, detail=f"Sem permissão para o item {item.description}")
 
@@ -788,7 +816,7 @@ async def update_item_status(
     fixed_asset_number: Optional[str] = None,
     reason: str = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     item_obj = await crud.get_item(db, item_id)
     if not item_obj:
@@ -812,9 +840,7 @@ async def update_item_status(
     if is_operator:
         if is_receipt_confirmation:
             # Check if operator belongs to target branch
-            allowed_branches = [b.id for b in current_user.branches]
-            if current_user.branch_id and current_user.branch_id not in allowed_branches:
-                allowed_branches.append(current_user.branch_id)
+            allowed_branches = current_user.allowed_branch_ids
 
             # Use transfer_target_branch_id because the item is technically still in the old branch until received
             if item_obj.transfer_target_branch_id not in allowed_branches:
@@ -823,18 +849,14 @@ async def update_item_status(
         elif is_write_off_conclusion:
              # Check if operator belongs to the branch (Standard check)
             if not current_user.all_branches:
-                allowed_branches = [b.id for b in current_user.branches]
-                if current_user.branch_id and current_user.branch_id not in allowed_branches:
-                    allowed_branches.append(current_user.branch_id)
+                allowed_branches = current_user.allowed_branch_ids
                 if item_obj.branch_id not in allowed_branches:
                     raise HTTPException(status_code=403, detail="Sem permissão nesta filial")
 
         else:
             # Standard Operator Permissions
             if not current_user.all_branches:
-                allowed_branches = [b.id for b in current_user.branches]
-                if current_user.branch_id and current_user.branch_id not in allowed_branches:
-                    allowed_branches.append(current_user.branch_id)
+                allowed_branches = current_user.allowed_branch_ids
                 if item_obj.branch_id not in allowed_branches:
                     raise HTTPException(status_code=403, detail="Sem permissão nesta filial")
 
@@ -904,15 +926,15 @@ async def update_item_status(
             await notifications.notify_users(db, next_approvers, title, msg, email_subject=title, email_html=html)
 
             # Broadcast update
-            from backend.websocket_manager import manager
+            from backend.websocket_manager import publish_event
             payload = {
                 "message": f"Item {item_obj.description} avançou para etapa {item_obj.approval_step}",
                 "actor_id": current_user.id,
                 "target_roles": ["ADMIN", "APPROVER"],
-                "target_user_ids": approver_ids,
+                "target_user_ids": approver_ids or None,  # none: fall back to the roles
                 "target_branch_id": item_obj.branch_id
             }
-            await manager.broadcast(json.dumps(payload))
+            await publish_event(payload)
 
             return item_obj
 
@@ -933,14 +955,14 @@ async def update_item_status(
         pass
 
     # Websocket Broadcast (JSON Payload)
-    from backend.websocket_manager import manager
+    from backend.websocket_manager import publish_event
     payload = {
         "message": f"Item {updated_item.description} atualizado para {status_update}",
         "actor_id": current_user.id,
         "target_roles": ["OPERATOR", "ADMIN", "APPROVER"], # Notify all relevant roles
         "target_branch_id": updated_item.branch_id
     }
-    await manager.broadcast(json.dumps(payload))
+    await publish_event(payload)
 
     # Notify Branch Members about the outcome (Persistent/Email)
     await notify_status_change(db, updated_item, old_status, updated_item.status, reason)
@@ -956,7 +978,7 @@ async def request_transfer(
     transfer_invoice_series: Optional[str] = None,
     transfer_invoice_date: Optional[datetime] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role == models.UserRole.AUDITOR:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Auditores não podem solicitar transferências")
@@ -966,9 +988,7 @@ async def request_transfer(
         raise HTTPException(status_code=404, detail="Item não encontrado")
 
     if current_user.role == models.UserRole.OPERATOR:
-        allowed_branches = [b.id for b in current_user.branches]
-        if current_user.branch_id and current_user.branch_id not in allowed_branches:
-            allowed_branches.append(current_user.branch_id)
+        allowed_branches = current_user.allowed_branch_ids
         if item.branch_id not in allowed_branches:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Você não tem permissão para transferir este item")
 
@@ -1009,14 +1029,7 @@ async def request_transfer(
 
     # Reload item with relationships
     from sqlalchemy.future import select
-    from sqlalchemy.orm import joinedload, noload
-    query = select(models.Item).where(models.Item.id == item_id).options(
-        joinedload(models.Item.branch),
-        joinedload(models.Item.transfer_target_branch),
-        joinedload(models.Item.category_rel),
-        joinedload(models.Item.supplier),
-        joinedload(models.Item.responsible)
-    )
+    query = select(models.Item).where(models.Item.id == item_id).options(*loaders.ITEM_LIST)
     result = await db.execute(query)
     item = result.scalars().first()
 
@@ -1024,15 +1037,15 @@ async def request_transfer(
     approvers = await workflow_engine.get_current_step_approvers(db, item, models.ApprovalActionType.TRANSFER)
     approver_ids = [u.id for u in approvers]
 
-    from backend.websocket_manager import manager
+    from backend.websocket_manager import publish_event
     payload = {
         "message": f"Solicitação de transferência para item {item.description}",
         "actor_id": current_user.id,
         "target_roles": ["ADMIN", "APPROVER"],
-        "target_user_ids": approver_ids,
+        "target_user_ids": approver_ids or None,  # none: fall back to the roles
         "target_branch_id": item.branch_id # Optional context
     }
-    await manager.broadcast(json.dumps(payload))
+    await publish_event(payload)
 
     frontend_url = request.headers.get("origin")
     await notify_transfer_request(db, item, frontend_url=frontend_url)
@@ -1046,7 +1059,7 @@ async def request_write_off(
     justification: Optional[str] = Form(None),
     reason: str = Form(...),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role == models.UserRole.AUDITOR:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Auditores não podem solicitar baixas")
@@ -1056,9 +1069,7 @@ async def request_write_off(
         raise HTTPException(status_code=404, detail="Item não encontrado")
 
     if current_user.role == models.UserRole.OPERATOR:
-        allowed_branches = [b.id for b in current_user.branches]
-        if current_user.branch_id and current_user.branch_id not in allowed_branches:
-            allowed_branches.append(current_user.branch_id)
+        allowed_branches = current_user.allowed_branch_ids
         if item.branch_id not in allowed_branches:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Você não tem permissão para solicitar baixa deste item")
 
@@ -1090,14 +1101,7 @@ async def request_write_off(
 
     # Reload item with relationships
     from sqlalchemy.future import select
-    from sqlalchemy.orm import joinedload, noload
-    query = select(models.Item).where(models.Item.id == item_id).options(
-        joinedload(models.Item.branch),
-        joinedload(models.Item.transfer_target_branch),
-        joinedload(models.Item.category_rel),
-        joinedload(models.Item.supplier),
-        joinedload(models.Item.responsible)
-    )
+    query = select(models.Item).where(models.Item.id == item_id).options(*loaders.ITEM_LIST)
     result = await db.execute(query)
     item = result.scalars().first()
 
@@ -1105,15 +1109,15 @@ async def request_write_off(
     approvers = await workflow_engine.get_current_step_approvers(db, item, models.ApprovalActionType.WRITE_OFF)
     approver_ids = [u.id for u in approvers]
 
-    from backend.websocket_manager import manager
+    from backend.websocket_manager import publish_event
     payload = {
         "message": f"Solicitação de baixa para item {item.description}",
         "actor_id": current_user.id,
         "target_roles": ["ADMIN", "APPROVER"],
-        "target_user_ids": approver_ids,
+        "target_user_ids": approver_ids or None,  # none: fall back to the roles
         "target_branch_id": item.branch_id
     }
-    await manager.broadcast(json.dumps(payload))
+    await publish_event(payload)
 
     # Notify Approvers
     frontend_url = request.headers.get("origin")
@@ -1127,7 +1131,7 @@ async def update_item(
     item_id: int,
     item_update: schemas.ItemUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     existing_item = await crud.get_item(db, item_id)
     if not existing_item:
@@ -1141,9 +1145,7 @@ async def update_item(
         if is_operator and existing_item.status == models.ItemStatus.REJECTED:
              # Check Branch Permission
             if not current_user.all_branches:
-                allowed_branches = [b.id for b in current_user.branches]
-                if current_user.branch_id and current_user.branch_id not in allowed_branches:
-                    allowed_branches.append(current_user.branch_id)
+                allowed_branches = current_user.allowed_branch_ids
                 if existing_item.branch_id not in allowed_branches:
                      raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Você não tem permissão para editar este item")
         else:
@@ -1177,7 +1179,7 @@ async def update_item(
     # Notify if re-submitted
     if existing_item.status == models.ItemStatus.REJECTED and updated_item.status == models.ItemStatus.PENDING:
          # Manually broadcast here for resubmission too
-         from backend.websocket_manager import manager
+         from backend.websocket_manager import publish_event
 
          approvers = await workflow_engine.get_current_step_approvers(db, updated_item, models.ApprovalActionType.CREATE)
          approver_ids = [u.id for u in approvers]
@@ -1186,10 +1188,10 @@ async def update_item(
             "message": f"Item re-enviado para aprovação: {updated_item.description}",
             "actor_id": current_user.id,
             "target_roles": ["ADMIN", "APPROVER"],
-            "target_user_ids": approver_ids,
+            "target_user_ids": approver_ids or None,  # none: fall back to the roles
             "target_branch_id": updated_item.branch_id
          }
-         await manager.broadcast(json.dumps(payload))
+         await publish_event(payload)
 
          frontend_url = request.headers.get("origin")
          await notify_new_item(db, updated_item, frontend_url=frontend_url)
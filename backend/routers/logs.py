@@ -11,7 +11,7 @@ router = APIRouter(prefix="/logs", tags=["logs"])
 async def read_logs(
     limit: int = 1000,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Only Admin/Approver/Auditor can see audit logs
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR]:
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -19,31 +22,77 @@ class NotificationResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.get("/", response_model=List[NotificationResponse])
+class NotificationPage(BaseModel):
+    items: List[NotificationResponse] = []
+    next_cursor: Optional[str] = None
+
+class UnreadCount(BaseModel):
+    count: int
+
+# The badge shows "99+": counting stops here, so the poll costs the same for everyone
+UNREAD_COUNT_CAP = 100
+
+def encode_notification_cursor(notification_id: int) -> str:
+    """Opaque cursor pointing right after (older than) the given notification id."""
+    raw = json.dumps({"id": notification_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_notification_cursor(cursor: str) -> int:
+    """Reverses encode_notification_cursor. Raises ValueError on malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode()))["id"])
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+@router.get("/", response_model=NotificationPage)
 async def get_notifications(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
-    Get all notifications for the current user, ordered by creation date desc.
+    Keyset page of the current user's notifications, newest first (ids grow with
+    created_at). Pass the returned `next_cursor` to get the following page.
     """
-    # Using a direct query here since crud for notifications is simple
-    from sqlalchemy.future import select
     query = select(models.Notification).where(
         models.Notification.user_id == current_user.id
-    ).order_by(models.Notification.created_at.desc())
+    )
+    if cursor:
+        try:
+            query = query.where(models.Notification.id < decode_notification_cursor(cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    result = await db.execute(query)
+    # One extra row tells whether another page exists
+    result = await db.execute(query.order_by(models.Notification.id.desc()).limit(limit + 1))
     notifications = result.scalars().all()
-    return notifications
+    next_cursor = None
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        next_cursor = encode_notification_cursor(notifications[-1].id)
+    return NotificationPage(items=notifications, next_cursor=next_cursor)
+
+@router.get("/unread-count", response_model=UnreadCount)
+async def get_unread_count(
+    db: AsyncSession = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Unread notifications of the current user, capped at UNREAD_COUNT_CAP (index-only scan)."""
+    unread = select(models.Notification.id).where(
+        models.Notification.user_id == current_user.id,
+        models.Notification.read == False
+    ).limit(UNREAD_COUNT_CAP).subquery()
+    count = (await db.execute(select(func.count()).select_from(unread))).scalar()
+    return UnreadCount(count=count)
 
 @router.put("/{notification_id}/read", response_model=NotificationResponse)
 async def mark_as_read(
     notification_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
-    from sqlalchemy.future import select
     query = select(models.Notification).where(
         models.Notification.id == notification_id,
         models.Notification.user_id == current_user.id
@@ -59,19 +108,17 @@ async def mark_as_read(
     await db.refresh(notification)
     return notification
 
-@router.put("/read-all", response_model=List[NotificationResponse])
+@router.put("/read-all", response_model=UnreadCount)
 async def mark_all_as_read(
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
-    from sqlalchemy import update
+    """Marks every unread notification as read. Returns how many were updated."""
     query = update(models.Notification).where(
         models.Notification.user_id == current_user.id,
         models.Notification.read == False
     ).values(read=True)
 
-    await db.execute(query)
+    result = await db.execute(query)
     await db.commit()
-
-    # Return updated list
-    return await get_notifications(db, current_user)
+    return UnreadCount(count=result.rowcount)
@@ -1,92 +1,116 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import status as fastapi_status
+from fastapi.responses import StreamingResponse, FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend import schemas, models, crud, auth
+from backend import schemas, models, crud, auth, exports, report_jobs, rendering
+import os
 from backend.database import get_db
-import pandas as pd
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+import tempfile
+from typing import Optional
+from datetime import date
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
-@router.get("/export/excel")
-async def export_inventory_excel(db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    items = await crud.get_items(db, limit=10000) # Fetch all relevant items
-
-    data = []
-    for item in items:
-        data.append({
-            "ID": item.id,
-            "Description": item.description,
-            "Category": item.category,
-            "Purchase Date": item.purchase_date,
-            "Invoice Value": item.invoice_value,
-            "Status": item.status,
-            "Branch ID": item.branch_id
-        })
-
-    df = pd.DataFrame(data)
-    stream = BytesIO()
-    with pd.ExcelWriter(stream) as writer:
-        df.to_excel(writer, index=False)
-
-    stream.seek(0)
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def iter_file(path: str, chunk_size: int = FILE_CHUNK_SIZE):
+    """Streams a temporary export file in chunks and deletes it at the end (or when the client goes away)."""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+async def export_response(kind: str, db: AsyncSession, **filters) -> StreamingResponse:
+    """Renders an export to a temp file (process pool, see backend/rendering.py) and streams it back."""
+    export = exports.EXPORTS[kind]
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=export.extension)
+    os.close(fd)
+    try:
+        await exports.export_items(kind, db, path, **filters)
+    except rendering.RenderQueueFull:
+        os.remove(path)
+        raise HTTPException(
+            status_code=fastapi_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitos relatórios sendo gerados no momento. Tente novamente em instantes ou use a exportação em segundo plano.",
+            headers={"Retry-After": "30"}
+        )
+    except ValueError as e:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        os.remove(path)
+        raise
 
     return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=inventory_report.xlsx"}
+        iter_file(path),
+        media_type=export.media_type,
+        headers={"Content-Disposition": f"attachment; filename={export.filename}"}
     )
 
-@router.get("/export/pdf")
-async def export_inventory_pdf(db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    items = await crud.get_items(db, limit=10000)
-
-    stream = BytesIO()
-    p = canvas.Canvas(stream, pagesize=letter)
-    width, height = letter
-    y = height - 40
-
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(30, y, "Inventory Report")
-    y -= 30
-    p.setFont("Helvetica", 10)
 
-    headers = ["ID", "Description", "Category", "Value", "Status"]
-    x_positions = [30, 80, 250, 350, 450]
+def pdf_allowed_branch_ids(current_user: auth.Principal, branch_id: Optional[int]) -> Optional[list]:
+    """Branch visibility of GET /items/ (Approvers and Auditors can see all); None means every branch."""
+    if current_user.role in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR, models.UserRole.REVIEWER] or current_user.all_branches:
+        return None
+    if branch_id and branch_id not in current_user.allowed_branch_ids:
+        raise HTTPException(status_code=403, detail="Acesso negado a esta filial")
+    return current_user.allowed_branch_ids
 
-    for i, header in enumerate(headers):
-        p.drawString(x_positions[i], y, header)
-
-    y -= 20
-    p.line(30, y+15, 550, y+15)
-
-    for item in items:
-        if y < 40:
-            p.showPage()
-            y = height - 40
+@router.get("/export/excel")
+async def export_inventory_excel(db: AsyncSession = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    return await export_response("excel", db, limit=10000)
 
-        p.drawString(x_positions[0], y, str(item.id))
-        p.drawString(x_positions[1], y, item.description[:30])
-        p.drawString(x_positions[2], y, item.category)
-        p.drawString(x_positions[3], y, f"{item.invoice_value:.2f}")
-        p.drawString(x_positions[4], y, item.status)
-        y -= 20
+@router.get("/export/pdf")
+async def export_inventory_pdf(
+    skip: int = 0,
+    limit: Optional[int] = None,
+    status: str = None,
+    category: str = None,
+    branch_id: int = None,
+    search: str = None,
+    description: str = None,
+    fixed_asset_number: str = None,
+    purchase_date: str = None,
+    purchase_date_from: date = None,
+    purchase_date_to: date = None,
+    created_at_from: date = None,
+    created_at_to: date = None,
+    group_by: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Inventory report PDF with the same filters and branch visibility as GET /items/.
+    `group_by` ("branch" or "cost_center") splits the report into sections with
+    subtotals. Rows are streamed in chunks and pages are written to disk as they
+    fill, so there is no row cap; very large reports should use POST /reports/jobs.
+    """
+    filters = dict(
+        status=status, category=category, branch_id=branch_id, search=search,
+        description=description, fixed_asset_number=fixed_asset_number, purchase_date=purchase_date,
+        purchase_date_from=purchase_date_from, purchase_date_to=purchase_date_to,
+        created_at_from=created_at_from, created_at_to=created_at_to
+    )
 
-    p.save()
-    stream.seek(0)
+    filters["allowed_branch_ids"] = pdf_allowed_branch_ids(current_user, branch_id)
 
-    return StreamingResponse(
-        stream,
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=inventory_report.pdf"}
+    return await export_response(
+        "pdf", db, skip=skip, limit=limit, group_by=group_by,
+        options={"subtitle": await exports.filters_subtitle(db, group_by, **filters)},
+        **filters
     )
 
 @router.get("/export/sap")
 async def export_inventory_sap(
     skip: int = 0,
-    limit: int = 100000,
+    limit: Optional[int] = None,
     status: str = None,
     category: str = None,
     branch_id: int = None,
@@ -94,96 +118,115 @@ async def export_inventory_sap(
     description: str = None,
     fixed_asset_number: str = None,
     purchase_date: str = None,
+    purchase_date_from: date = None,
+    purchase_date_to: date = None,
+    created_at_from: date = None,
+    created_at_to: date = None,
     db: AsyncSession = Depends(get_db), 
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
+    """
+    SAP asset upload sheet with the inventory filters applied.
+    Rows are read in chunks through a server-side cursor and the workbook is
+    rendered in the process pool, so memory stays flat with the row count.
+    """
     if current_user.role == models.UserRole.OPERATOR:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access Denied")
+        raise HTTPException(status_code=fastapi_status.HTTP_403_FORBIDDEN, detail="Access Denied")
 
     # Fetch items based on filters using the exact same logic as the main get endpoint
-    allowed_branch_ids = [b.id for b in current_user.branches] if current_user.branches else []
-    if current_user.all_branches:
-        allowed_branch_ids = None
-    elif current_user.branch_id and current_user.branch_id not in allowed_branch_ids:
-        allowed_branch_ids.append(current_user.branch_id)
-
-    items = await crud.get_items(
-        db, 
-        skip=skip, 
-        limit=limit, 
-        status=status, 
-        category=category, 
-        branch_id=branch_id, 
-        search=search, 
+    allowed_branch_ids = None if current_user.all_branches else current_user.allowed_branch_ids
+
+    return await export_response(
+        "sap",
+        db,
+        skip=skip,
+        limit=limit,
+        status=status,
+        category=category,
+        branch_id=branch_id,
+        search=search,
         allowed_branch_ids=allowed_branch_ids,
         description=description,
         fixed_asset_number=fixed_asset_number,
-        purchase_date=purchase_date
+        purchase_date=purchase_date,
+        purchase_date_from=purchase_date_from,
+        purchase_date_to=purchase_date_to,
+        created_at_from=created_at_from,
+        created_at_to=created_at_to
     )
 
-    data = []
-    for item in items:
-        # Determine values for SAP columns
-        classe = item.category_rel.asset_class if item.category_rel and item.category_rel.asset_class else item.category
-        c_custo = item.cost_center.code if item.cost_center else ""
-        
-        nf = item.invoice_number or ""
-        desc = item.description or ""
-        fornecedor = item.supplier.name if item.supplier else ""
-        
-        # Formata a NF adicionando o prefixo NF se existir
-        nf_formatada = f"NF{nf}" if nf else ""
-
-        # Denominação do imobilizado: Descrição do Item - a NF
-        desc_imobilizado = f"{desc} - {nf_formatada}".strip(" - ")
-        # Truncating to 50 chars as SAP usually limits these fields
-        desc_curta = desc_imobilizado[:50]
-
-        # Denominação do imobilizado (continuação): a NF - Nome do Fornecedor
-        desc_cont = f"{nf_formatada} - {fornecedor}".strip(" - ")
-
-        # Texto do nº principal do imobilizado: repete Denominação do imobilizado
-        texto_principal = desc_imobilizado
-
-        # Nº inventário: o numero do ativo fixo
-        num_inventario = item.fixed_asset_number or ""
-        
-        data_formatada = item.purchase_date.strftime("%d%m%Y") if item.purchase_date else ""
-        
-        # Formatando o montante para o padrão brasileiro (ex: 1.234,56)
-        valor = item.invoice_value or 0.0
-        montante = f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-        # TEXTO DO ITEM: repete Texto do nº principal do imobilizado
-        texto_item = texto_principal
-
-        data.append({
-            "CLASSE": classe,
-            "C CUSTO": c_custo,
-            "Denominação do imobilizado": desc_curta,
-            "Denominação do imobilizado (continuação)": desc_cont,
-            "Texto do nº principal do imobilizado": texto_principal,
-            "Nº inventário": num_inventario,
-            "DATA 1": data_formatada,
-            "DATA 2": data_formatada,
-            "DATA 3": data_formatada,
-            "MONTANTE": montante,
-            "TEXTO DO ITEM": texto_item
-        })
-
-    df = pd.DataFrame(data)
-    # Rename DATA 1, 2, 3 to just DATA
-    df.columns = ["CLASSE", "C CUSTO", "Denominação do imobilizado", "Denominação do imobilizado (continuação)", 
-                  "Texto do nº principal do imobilizado", "Nº inventário", "DATA", "DATA", "DATA", "MONTANTE", "TEXTO DO ITEM"]
-
-    stream = BytesIO()
-    with pd.ExcelWriter(stream, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-
-    stream.seek(0)
 
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=export_sap.xlsx"}
+# --- Report jobs (generated by the worker, see backend/report_jobs.py) ---
+
+def _report_job_response(job: dict) -> schemas.ReportJobResponse:
+    return schemas.ReportJobResponse(
+        id=job["id"],
+        kind=job.get("kind") or "",
+        status=job["status"],
+        progress=job["progress"],
+        rows=job["rows"],
+        error=job.get("error") or None,
+        created_at=job.get("created_at") or None,
+        finished_at=job.get("finished_at") or None,
+        download_url=f"/reports/jobs/{job['id']}/download" if job["status"] == "done" else None
     )
+
+async def _get_visible_job(job_id: str, current_user: auth.Principal) -> dict:
+    job = await report_jobs.get_report_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Relatório não encontrado ou expirado")
+    if current_user.role != models.UserRole.ADMIN and not await report_jobs.is_report_job_subscriber(job_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Relatório não encontrado ou expirado")
+    return job
+
+@router.post("/jobs", response_model=schemas.ReportJobResponse, status_code=202)
+async def create_report_job(
+    payload: schemas.ReportJobCreate,
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Queues an export (excel, pdf or sap) in the worker. Identical requests made
+    while the items are unchanged return the same job. Poll GET /reports/jobs/{id}
+    or wait for the REPORT_READY websocket event, then download the file.
+    """
+    if payload.kind == "sap" and current_user.role == models.UserRole.OPERATOR:
+        raise HTTPException(status_code=fastapi_status.HTTP_403_FORBIDDEN, detail="Access Denied")
+
+    if payload.filters.group_by and not exports.EXPORTS[payload.kind].groupable:
+        raise HTTPException(status_code=400, detail=f"Agrupamento não suportado na exportação {payload.kind}")
+
+    allowed_branch_ids = None if current_user.all_branches else current_user.allowed_branch_ids
+    if payload.kind == "pdf":
+        # Same branch visibility as GET /items/ and GET /reports/export/pdf
+        allowed_branch_ids = pdf_allowed_branch_ids(current_user, payload.filters.branch_id)
+    job = await report_jobs.submit_report_job(
+        payload.kind, payload.filters.model_dump(mode="json"), allowed_branch_ids, current_user.id
+    )
+    return _report_job_response(job)
+
+@router.get("/jobs/{job_id}", response_model=schemas.ReportJobResponse)
+async def get_report_job(
+    job_id: str,
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    return _report_job_response(await _get_visible_job(job_id, current_user))
+
+@router.get("/jobs/{job_id}/download")
+async def download_report_job(
+    job_id: str,
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    job = await _get_visible_job(job_id, current_user)
+    path = report_jobs.report_file_path(job)
+    if job["status"] != "done" or not path or not os.path.exists(path):
+        raise HTTPException(status_code=409, detail="Relatório ainda não está pronto")
+
+    export = exports.EXPORTS[job["kind"]]
+    return FileResponse(path, media_type=export.media_type, filename=export.filename)
+
+@router.get("/render-metrics")
+async def get_render_metrics(current_user: auth.Principal = Depends(auth.get_current_user)):
+    """Render pool counters of this API process (queue depth, wait and render times)."""
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return rendering.render_metrics()
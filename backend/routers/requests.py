@@ -14,7 +14,7 @@ async def read_my_requests(
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     requests = await crud.get_requests(db, skip=skip, limit=limit, requester_id=current_user.id)
 
@@ -30,7 +30,7 @@ async def read_my_requests(
 @router.get("/pending", response_model=List[schemas.RequestResponse])
 async def read_pending_requests(
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Fetch all PENDING requests
     all_pending = await crud.get_requests(db, status=models.RequestStatus.PENDING, limit=1000)
@@ -60,7 +60,7 @@ async def approve_request(
     request_id: int,
     req_context: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     req = await crud.get_request(db, request_id)
     if not req:
@@ -168,7 +168,7 @@ async def reject_request(
     request_id: int,
     req_context: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     req = await crud.get_request(db, request_id)
     if not req:
@@ -13,7 +13,7 @@ async def read_sectors(
     search: str = None,
     branch_id: int = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Filter by user's branch if they are restricted?
     # Or just return all global + branch specific.
@@ -24,15 +24,14 @@ async def read_sectors(
 async def create_sector(
     sector: schemas.SectorCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Operators can create sectors (per user request: "filial poderá cadastrar")
     # But maybe restrict them to create only for THEIR branch?
     if current_user.role == models.UserRole.OPERATOR:
         if sector.branch_id:
             # Check if user belongs to this branch
-            allowed = [b.id for b in current_user.branches]
-            if current_user.branch_id: allowed.append(current_user.branch_id)
+            allowed = current_user.allowed_branch_ids
             if sector.branch_id not in allowed and not current_user.all_branches:
                  raise HTTPException(status_code=403, detail="Você só pode criar setores para suas filiais")
         else:
@@ -46,7 +45,7 @@ async def update_sector(
     sector_id: int,
     sector: schemas.SectorUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Retrieve existing sector to check permissions
     # Need a crud get_sector or check logic inside update.
@@ -62,7 +61,7 @@ async def update_sector(
 async def delete_sector(
     sector_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Only Admin/Approver can delete? Or creator?
     # Let's restrict delete to Admin/Approver for safety.
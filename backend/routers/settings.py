@@ -21,7 +21,7 @@ router = APIRouter(prefix="/settings", tags=["settings"])
 async def read_settings(
     request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: Optional[models.User] = Depends(auth.get_current_user_optional)
+    current_user: Optional[auth.Principal] = Depends(auth.get_current_user_optional)
 ):
     settings_list = await crud.get_system_settings(db)
     all_settings = {s.key: s.value for s in settings_list}
@@ -61,7 +61,7 @@ async def read_settings(
 async def update_settings(
     settings: Dict[str, str],
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Allow Approvers to update 'safeguard_threshold'
     if current_user.role != models.UserRole.ADMIN:
@@ -89,7 +89,7 @@ async def update_settings(
 async def upload_favicon(
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem alterar o favicon")
@@ -116,7 +116,7 @@ async def upload_favicon(
 async def upload_logo(
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem alterar o logo")
@@ -204,7 +204,7 @@ def process_background_image(file_content: bytes, output_path: str) -> Tuple[boo
 async def upload_background(
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem alterar o fundo de tela")
@@ -241,7 +241,7 @@ async def upload_background(
 @router.post("/smtp/test")
 async def test_smtp(
     smtp_settings: schemas.SmtpTestRequest,
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem testar SMTP")
@@ -13,7 +13,7 @@ async def read_suppliers(
     limit: int = 100,
     search: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Todos podem visualizar
     return await crud.get_suppliers(db, skip=skip, limit=limit, search=search)
@@ -22,7 +22,7 @@ async def read_suppliers(
 async def create_supplier(
     supplier: schemas.SupplierCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Todas as filiais podem cadastrar (qualquer usuário logado)
     # Verificar se CNPJ já existe
@@ -36,7 +36,7 @@ async def update_supplier(
     supplier_id: int,
     supplier: schemas.SupplierBase,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Apenas Aprovador e Admin podem editar
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
@@ -51,7 +51,7 @@ async def update_supplier(
 async def delete_supplier(
     supplier_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Apenas Admin pode deletar (assumindo restrição similar a Branch/Category, ou Admin/Approver?)
     # Pedido diz: "editar apenas Aprovador e Admin". Não especificou deletar, vou assumir mesmo grupo.
@@ -11,7 +11,7 @@ async def read_user_groups(
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -21,7 +21,7 @@ async def read_user_groups(
 async def create_user_group(
     group: schemas.UserGroupCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Only Admins can create groups")
@@ -33,7 +33,7 @@ async def update_user_group(
     group_id: int,
     group: schemas.UserGroupUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Only Admins can update groups")
@@ -47,7 +47,7 @@ async def update_user_group(
 async def delete_user_group(
     group_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Only Admins can delete groups")
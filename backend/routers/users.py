@@ -7,14 +7,14 @@ from backend.database import get_db
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=schemas.UserResponse)
-async def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+async def read_users_me(current_user: models.User = Depends(auth.get_current_user_record)):
     return current_user
 
 @router.post("/me/change-password", status_code=status.HTTP_200_OK)
 async def change_password(
     request: schemas.ChangePasswordRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: models.User = Depends(auth.get_current_user_record)
 ):
     # Verify current password
     if not auth.verify_password(request.current_password, current_user.hashed_password):
@@ -25,13 +25,24 @@ async def change_password(
     await db.commit()
     return {"message": "Senha alterada com sucesso"}
 
+@router.put("/me/preferences", response_model=schemas.UserResponse)
+async def update_preferences(
+    preferences: schemas.UserPreferences,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user_record)
+):
+    """Own notification preferences (email_digest: immediate, hourly or daily)."""
+    current_user.email_digest = preferences.email_digest
+    await db.commit()
+    return current_user
+
 @router.get("/", response_model=List[schemas.UserResponse])
 async def read_users(
     skip: int = 0,
     limit: int = 100,
     search: str = None,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado")
@@ -41,7 +52,7 @@ async def read_users(
 async def create_user(
     user: schemas.UserCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores e aprovadores podem criar usuários")
@@ -62,7 +73,7 @@ async def update_user(
     user_id: int,
     user: schemas.UserUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores e aprovadores podem atualizar usuários")
@@ -91,7 +102,7 @@ async def update_user(
 async def delete_user(
     user_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if current_user.role not in [models.UserRole.ADMIN, models.UserRole.APPROVER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores e aprovadores podem remover usuários")
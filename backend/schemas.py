@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, computed_field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime, date
 from backend.models import UserRole, ItemStatus, RequestType, RequestStatus, ApprovalActionType
 
@@ -26,6 +26,8 @@ class UserCreate(UserBase):
     all_branches: Optional[bool] = False
     can_import: Optional[bool] = False
 
+EmailDigestMode = Literal["immediate", "hourly", "daily"]
+
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     role: Optional[UserRole] = None
@@ -35,6 +37,10 @@ class UserUpdate(BaseModel):
     all_branches: Optional[bool] = None
     can_import: Optional[bool] = None
     password: Optional[str] = None
+    email_digest: Optional[EmailDigestMode] = None
+
+class UserPreferences(BaseModel):
+    email_digest: EmailDigestMode
 
 class UserResponse(UserBase):
     id: int
@@ -48,6 +54,7 @@ class UserResponse(UserBase):
     branches: List["BranchResponse"] = []
     group: Optional["UserGroupResponse"] = None
     group_id: Optional[int] = None
+    email_digest: str = "immediate"
 
     class Config:
         from_attributes = True
@@ -202,6 +209,45 @@ class ItemUpdate(BaseModel):
     cost_center_id: Optional[int] = None
     sector_id: Optional[int] = None
 
+def calculate_accounting_value(invoice_value: Optional[float], purchase_date: Optional[datetime], depreciation_months: Optional[int]) -> float:
+    """Valor contábil linear (por dia) considerando a vida útil da categoria."""
+    if invoice_value is None or purchase_date is None:
+        return 0.0
+
+    # Se não houver depreciação configurada ou for 0, mantém o valor original
+    if not depreciation_months or depreciation_months <= 0:
+        return invoice_value
+
+    from dateutil.relativedelta import relativedelta
+
+    # Normaliza datas para evitar problemas com timezones e frações de dia (usa apenas a data)
+    start_date = purchase_date.date() if isinstance(purchase_date, datetime) else purchase_date
+    today = date.today()
+
+    # Calcula data final baseado nos meses
+    end_date = start_date + relativedelta(months=depreciation_months)
+
+    # Calcula dias totais de vida útil e dias passados
+    total_days = (end_date - start_date).days
+    elapsed_days = (today - start_date).days
+
+    if total_days <= 0:
+        return 0.0
+
+    if elapsed_days >= total_days:
+        return 0.0
+
+    if elapsed_days < 0:
+        return invoice_value
+
+    # Cálculo linear por dia
+    remaining_ratio = 1 - (elapsed_days / total_days)
+
+    # Garante que não retorne negativo (embora a checagem acima já deva prevenir)
+    final_value = max(0.0, invoice_value * remaining_ratio)
+
+    return round(final_value, 2)
+
 class ItemResponse(ItemBase):
     id: int
     status: ItemStatus
@@ -242,46 +288,47 @@ class ItemResponse(ItemBase):
         return self.calculate_accounting_value()
 
     def calculate_accounting_value(self) -> float:
-        if self.invoice_value is None or self.purchase_date is None:
-            return 0.0
-
-        depreciation_months = None
-        if self.category_rel:
-            depreciation_months = self.category_rel.depreciation_months
-
-        # Se não houver depreciação configurada ou for 0, mantém o valor original
-        if not depreciation_months or depreciation_months <= 0:
-            return self.invoice_value
-
-        from dateutil.relativedelta import relativedelta
-
-        # Normaliza datas para evitar problemas com timezones e frações de dia (usa apenas a data)
-        start_date = self.purchase_date.date() if isinstance(self.purchase_date, datetime) else self.purchase_date
-        today = date.today()
-
-        # Calcula data final baseado nos meses
-        end_date = start_date + relativedelta(months=depreciation_months)
-
-        # Calcula dias totais de vida útil e dias passados
-        total_days = (end_date - start_date).days
-        elapsed_days = (today - start_date).days
-
-        if total_days <= 0:
-            return 0.0
-
-        if elapsed_days >= total_days:
-            return 0.0
-
-        if elapsed_days < 0:
-            return self.invoice_value
-
-        # Cálculo linear por dia
-        remaining_ratio = 1 - (elapsed_days / total_days)
+        depreciation_months = self.category_rel.depreciation_months if self.category_rel else None
+        return calculate_accounting_value(self.invoice_value, self.purchase_date, depreciation_months)
 
-        # Garante que não retorne negativo (embora a checagem acima já deva prevenir)
-        final_value = max(0.0, self.invoice_value * remaining_ratio)
+class ItemPage(BaseModel):
+    """Keyset page returned by GET /items/ when a cursor is supplied."""
+    view: Literal["full"] = "full"
+    items: List[ItemResponse] = []
+    next_cursor: Optional[str] = None
 
-        return round(final_value, 2)
+class ItemListRow(BaseModel):
+    """Scalar-only item row used by the compact list view (?view=summary)."""
+    id: int
+    description: Optional[str] = None
+    category: Optional[str] = None
+    category_id: Optional[int] = None
+    status: ItemStatus
+    branch_id: Optional[int] = None
+    transfer_target_branch_id: Optional[int] = None
+    supplier_id: Optional[int] = None
+    cost_center_id: Optional[int] = None
+    sector_id: Optional[int] = None
+    responsible_id: Optional[int] = None
+    fixed_asset_number: Optional[str] = None
+    serial_number: Optional[str] = None
+    invoice_number: Optional[str] = None
+    invoice_value: Optional[float] = None
+    purchase_date: Optional[datetime] = None
+    approval_step: Optional[int] = 1
+    created_at: Optional[datetime] = None
+    accounting_value: float = 0.0
+
+class ItemListView(BaseModel):
+    """Compact item list: rows reference the side dictionaries by id."""
+    view: Literal["summary"] = "summary"
+    items: List[ItemListRow] = []
+    branches: Dict[int, Dict[str, Any]] = {}
+    categories: Dict[int, Dict[str, Any]] = {}
+    suppliers: Dict[int, Dict[str, Any]] = {}
+    cost_centers: Dict[int, Dict[str, Any]] = {}
+    sectors: Dict[int, Dict[str, Any]] = {}
+    next_cursor: Optional[str] = None
 
 # Settings
 class SystemSettingBase(BaseModel):
@@ -387,3 +434,36 @@ class RequestResponse(RequestBase):
 
     class Config:
         from_attributes = True
+
+# Report jobs (exports generated by the worker)
+class ReportFilters(BaseModel):
+    skip: int = 0
+    limit: Optional[int] = None
+    status: Optional[str] = None
+    category: Optional[str] = None
+    branch_id: Optional[int] = None
+    search: Optional[str] = None
+    description: Optional[str] = None
+    fixed_asset_number: Optional[str] = None
+    purchase_date: Optional[str] = None
+    purchase_date_from: Optional[date] = None
+    purchase_date_to: Optional[date] = None
+    created_at_from: Optional[date] = None
+    created_at_to: Optional[date] = None
+    # PDF only: sections with subtotals
+    group_by: Optional[Literal["branch", "cost_center"]] = None
+
+class ReportJobCreate(BaseModel):
+    kind: Literal["excel", "pdf", "sap"]
+    filters: ReportFilters = ReportFilters()
+
+class ReportJobResponse(BaseModel):
+    id: str
+    kind: str
+    status: Literal["queued", "running", "done", "failed"]
+    progress: int = 0
+    rows: int = 0
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
@@ -0,0 +1,74 @@
+from sqlalchemy import func, or_, literal_column, text
+from backend import models
+
+# Columns/functions created by migration b7c8d9e0f1a2 (pg_trgm + unaccent).
+# search_vector is a generated column maintained by Postgres, so it is not mapped on models.Item.
+SEARCH_VECTOR = literal_column("items.search_vector")
+TS_CONFIG = literal_column("'portuguese'::regconfig")
+
+# Databases built by create_all (or stamped without running b7c8d9e0f1a2), and
+# other dialects, lack those objects: the filters then fall back to plain ilike.
+# Set once per process by detect_search_support() at startup.
+_full_text_enabled = False
+
+
+async def detect_search_support(conn) -> bool:
+    """Enables the trigram/full-text predicates if the migration objects exist on this database."""
+    global _full_text_enabled
+    enabled = False
+    if conn.dialect.name == 'postgresql':
+        result = await conn.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'items' AND column_name = 'search_vector'
+            ) AND to_regprocedure('f_unaccent(text)') IS NOT NULL
+        """))
+        enabled = bool(result.scalar())
+    _full_text_enabled = enabled
+    return enabled
+
+
+def unaccent(expr):
+    """Immutable unaccent wrapper, matches the expression used by the trigram indexes."""
+    return func.f_unaccent(expr)
+
+
+def ts_query(term: str):
+    return func.websearch_to_tsquery(TS_CONFIG, unaccent(term))
+
+
+def description_filter(term: str):
+    """Accent-insensitive substring match served by ix_items_description_trgm."""
+    if not _full_text_enabled:
+        return models.Item.description.ilike(f"%{term}%")
+    return unaccent(models.Item.description).ilike(unaccent(f"%{term}%"))
+
+
+def fixed_asset_number_filter(term: str):
+    """Substring match served by ix_items_fixed_asset_number_trgm."""
+    return models.Item.fixed_asset_number.ilike(f"%{term}%")
+
+
+def item_search_filter(term: str):
+    """
+    Free-text filter for the Inventory search box.
+    Keeps substring semantics through the trigram indexes and adds
+    stemmed, accent-insensitive matches through the tsvector column.
+    """
+    pattern = f"%{term}%"
+    filters = [
+        description_filter(term),
+        models.Item.serial_number.ilike(pattern),
+        models.Item.invoice_number.ilike(pattern),
+        fixed_asset_number_filter(term),
+    ]
+    if _full_text_enabled:
+        filters.append(SEARCH_VECTOR.op("@@")(ts_query(term)))
+    return or_(*filters)
+
+
+def item_search_rank(term: str):
+    """Relevance of an item for the search term (higher is better); None without the full-text column."""
+    if not _full_text_enabled:
+        return None
+    return func.ts_rank(SEARCH_VECTOR, ts_query(term))
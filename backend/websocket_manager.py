@@ -1,18 +1,207 @@
+import json
+import asyncio
 from fastapi import WebSocket
+from backend import models
+from backend.redis_client import get_redis_cache, get_redis_pubsub
+
+# Redis pub/sub backplane: every event (API routers and the arq worker alike) is
+# published on this channel, and every API process subscribes once and delivers
+# it to the connections it holds. Any number of uvicorn workers or replicas can
+# run behind the load balancer.
+EVENTS_CHANNEL = "ws:events"
+
+# Every connection has a bounded outbound queue drained by its own writer task:
+# delivering an event only enqueues it, so the request or relay that produced it
+# never waits on (or fails because of) a client's socket. Under bursts the writer
+# sends everything already queued as one frame, a JSON array of events (duplicates
+# dropped). A client whose queue fills up, or that does not take a frame within
+# WS_SEND_TIMEOUT, is disconnected (1013) and reconnects.
+WS_QUEUE_SIZE = 100
+WS_BATCH_MAX = 50
+WS_SEND_TIMEOUT = 5
+WS_CLOSE_TRY_AGAIN = 1013
+
+# Roles that see the events of every branch (same rule as the item listings)
+GLOBAL_ROLES = {models.UserRole.ADMIN, models.UserRole.APPROVER, models.UserRole.AUDITOR, models.UserRole.REVIEWER}
+
+# --- Event routing ---
+# Connections are authenticated (auth.Principal) and indexed by user id and role.
+# Event payloads are routed on the server:
+#   target_user_ids  -> only those users' connections (takes priority; an empty
+#                       list reaches nobody, None counts as not set)
+#   target_roles     -> connections with one of the roles; with target_branch_id,
+#                       roles outside GLOBAL_ROLES also need access to that branch
+#   no targeting key -> every connection
+# The actor_id user does not get the echo of their own action.
+
+
+def _role(principal) -> str:
+    return principal.role.value if isinstance(principal.role, models.UserRole) else str(principal.role)
+
+
+def _frame(messages: list[str]) -> str:
+    """One event as is; several as a JSON array (messages are already serialized)."""
+    messages = list(dict.fromkeys(messages))
+    return messages[0] if len(messages) == 1 else "[" + ",".join(messages) + "]"
+
+
+class Client:
+    """A registered connection: its principal, outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, principal):
+        self.websocket = websocket
+        self.principal = principal
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+        self.writer: asyncio.Task | None = None
+
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.clients: dict[WebSocket, Client] = {}
+        self.by_user: dict[int, set[WebSocket]] = {}
+        self.by_role: dict[str, set[WebSocket]] = {}
+        self.stats = {"sent": 0, "frames": 0, "evicted": 0}
+        self._closing: set[asyncio.Task] = set()
+
+    @property
+    def active_connections(self) -> list[WebSocket]:
+        return list(self.clients)
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, principal):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = Client(websocket, principal)
+        self.clients[websocket] = client
+        self.by_user.setdefault(principal.id, set()).add(websocket)
+        self.by_role.setdefault(_role(principal), set()).add(websocket)
+        client.writer = asyncio.create_task(self._write(client))
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        for index, key in ((self.by_user, client.principal.id), (self.by_role, _role(client.principal))):
+            sockets = index.get(key)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del index[key]
+        if client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def _evict(self, client: Client, reason: str):
+        """Unregisters a slow client and closes its socket in the background."""
+        print(f"WS client of user {client.principal.id} evicted: {reason}")
+        self.stats["evicted"] += 1
+        self.disconnect(client.websocket)
+        task = asyncio.create_task(self._close(client.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=WS_CLOSE_TRY_AGAIN), 1)
+        except Exception:
+            pass
+
+    async def _write(self, client: Client):
+        """Writer task: drains the client's queue, coalescing whatever piled up into one frame."""
+        while True:
+            messages = [await client.queue.get()]
+            while len(messages) < WS_BATCH_MAX and not client.queue.empty():
+                messages.append(client.queue.get_nowait())
+            try:
+                await asyncio.wait_for(client.websocket.send_text(_frame(messages)), WS_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._evict(client, f"send failed ({e.__class__.__name__})")
+                return
+            self.stats["frames"] += 1
+            self.stats["sent"] += len(messages)
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+    def _sees_branch(self, websocket: WebSocket, branch_id: int) -> bool:
+        principal = self.clients[websocket].principal
+        if principal.role in GLOBAL_ROLES or principal.all_branches:
+            return True
+        return branch_id in principal.allowed_branch_ids
+
+    def recipients(self, payload: dict) -> set[WebSocket]:
+        """Connections an event payload is meant for."""
+        roles = payload.get("target_roles")
+        user_ids = payload.get("target_user_ids")
+        if user_ids is not None:
+            # Exact recipient list, even when empty (e.g. a report job nobody waits for anymore)
+            targets = set().union(*(self.by_user.get(user_id, ()) for user_id in user_ids))
+        elif roles is not None:
+            targets = set().union(*(self.by_role.get(role, ()) for role in roles))
+            branch_id = payload.get("target_branch_id")
+            if branch_id is not None:
+                targets = {ws for ws in targets if self._sees_branch(ws, branch_id)}
+        else:
+            targets = set(self.clients)
+
+        actor_id = payload.get("actor_id")
+        if actor_id is not None:
+            targets -= self.by_user.get(actor_id, set())
+        return targets
+
+    async def send_event(self, payload: dict) -> int:
+        """
+        Queues an event for its recipients on this process and returns how many
+        were queued. Never waits on a socket; clients with a full queue are evicted.
+        """
+        targets = self.recipients(payload)
+        if not targets:
+            return 0
+        message = json.dumps(payload)
+        queued = 0
+        for websocket in targets:
+            client = self.clients[websocket]
+            try:
+                client.queue.put_nowait(message)
+                queued += 1
+            except asyncio.QueueFull:
+                self._evict(client, "outbound queue full")
+        return queued
 
 manager = ConnectionManager()
+
+async def publish_event(payload: dict):
+    """
+    Sends a websocket payload to the clients of every API process (and replica):
+    it goes through EVENTS_CHANNEL and each process delivers it to its own
+    connections (relay_events). Without Redis, only this process' clients get it.
+    """
+    try:
+        redis = await get_redis_cache()
+        await redis.publish(EVENTS_CHANNEL, json.dumps(payload))
+    except Exception as e:
+        print(f"WS Publish Error (delivering locally): {e}")
+        await manager.send_event(payload)
+
+async def relay_events():
+    """Delivers EVENTS_CHANNEL messages to this process' connections (one subscription per process, app lifetime)."""
+    while True:
+        pubsub = None
+        try:
+            redis = await get_redis_pubsub()
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(EVENTS_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    try:
+                        await manager.send_event(json.loads(message["data"]))
+                    except Exception as e:
+                        print(f"WS Relay Error: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Events published while resubscribing are lost (clients still poll the notification counter)
+            print(f"WS Relay Error: {e}")
+            await asyncio.sleep(5)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
@@ -1,5 +1,9 @@
 import asyncio
-from arq import create_pool
+import secrets
+import time
+from datetime import datetime, timezone
+from arq import create_pool, cron
+from arq.worker import func
 from arq.connections import RedisSettings
 import os
 import sys
@@ -7,34 +11,170 @@ import sys
 # Add backend path to sys.path to resolve imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.notifications import send_email_sync_wrapper
+from backend.mailer import Mailer
 from backend.redis_client import get_redis_settings
+from backend.database import SessionLocal, engine
+from backend import rollup, crud, exports, report_jobs, schemas, rendering, depreciation, depreciation_alerts, notifications, search
+from backend.cache import invalidate_cache
+from backend.websocket_manager import publish_event
 
 # Task Definition
 async def send_email_task(ctx, to_email: str, subject: str, html_content: str):
-    """
-    Background task to send email.
-    We wrap the synchronous send_email logic if it's blocking,
-    or just call it if we refactor it to be async.
-    The current implementation uses standard smtplib which is blocking.
-    So we run it in a threadpool executor via the wrapper or just direct sync call
-    (since worker is async, blocking call blocks the worker).
-    Ideally, use aiosmtplib. But for now, let's stick to existing logic running in thread.
-    """
+    """Sends one email through the worker's shared SMTP session (see backend/mailer.py)."""
     print(f"Processing email task for {to_email}")
-    # send_email_sync_wrapper handles the thread pool execution
-    await send_email_sync_wrapper(to_email, subject, html_content)
-    print(f"Email sent to {to_email}")
+    await ctx["mailer"].send(to_email, subject, html_content)
+
+async def send_email_batch_task(ctx, recipients: list, subject: str, html_content: str):
+    """One job per notification: the same email to every recipient (see notifications.notify_users)."""
+    sent = await ctx["mailer"].send_batch(recipients, subject, html_content)
+    print(f"Email batch: {sent}/{len(recipients)} sent")
+
+async def send_email_digests_task(ctx):
+    """Hourly digests every hour, daily digests at DIGEST_DAILY_HOUR (see notifications.py)."""
+    modes = ["hourly"]
+    if datetime.now().hour == notifications.DIGEST_DAILY_HOUR:
+        modes.append("daily")
+    async with SessionLocal() as db:
+        result = await notifications.send_email_digests(db, ctx["mailer"], modes)
+    if result["users"]:
+        print(f"Email digests ({', '.join(modes)}): {result}")
+    return result
+
+async def reconcile_rollup_task(ctx):
+    """Verifies inventory_rollup against items and repairs divergent buckets."""
+    async with SessionLocal() as db:
+        result = await rollup.reconcile_rollup(db)
+    print(f"Rollup reconciliation: {result}")
+    return result
+
+async def snapshot_inventory_task(ctx):
+    """Writes today's inventory snapshot (trend charts history)."""
+    async with SessionLocal() as db:
+        buckets = await crud.take_inventory_snapshot(db)
+    await invalidate_cache("trends:*")
+    print(f"Inventory snapshot: {buckets} bucket(s)")
+    return buckets
+
+async def close_depreciation_task(ctx):
+    """Closes the depreciation of the months that have ended since the last close."""
+    async with SessionLocal() as db:
+        closed = await depreciation.close_pending_periods(db)
+    if closed:
+        await invalidate_cache("dashboard:*")
+    for period in closed:
+        print(f"Depreciation close: {period}")
+    return len(closed)
+
+async def depreciation_alerts_task(ctx):
+    """Daily end of life alerts (60/30/10/0 days), one digest per recipient."""
+    async with SessionLocal() as db:
+        result = await depreciation_alerts.send_depreciation_alerts(db)
+    print(f"Depreciation alerts: {result}")
+    return result
+
+async def generate_report_task(ctx, job_id: str):
+    """Generates a report job file (see backend/report_jobs.py), reporting progress as it goes."""
+    job = await report_jobs.get_report_job(job_id)
+    if not job or job["status"] == "done":
+        return
+    extension = exports.EXPORTS[job["kind"]].extension
+    filters = schemas.ReportFilters(**job["filters"]).model_dump()
+    skip, limit, group_by = filters.pop("skip"), filters.pop("limit"), filters.pop("group_by")
+
+    os.makedirs(report_jobs.REPORTS_DIR, exist_ok=True)
+    # Random part: /uploads is served statically, the file must not be guessable
+    filename = f"{job_id}-{secrets.token_hex(16)}{extension}"
+    path = os.path.join(report_jobs.REPORTS_DIR, filename)
+
+    await report_jobs.update_report_job(job_id, status="running", progress=0, rows=0)
+    try:
+        async with SessionLocal() as db:
+            total = await crud.count_items(db, allowed_branch_ids=job["allowed_branch_ids"], **filters)
+            total = max(total - skip, 0)
+            if limit is not None:
+                total = min(total, limit)
+
+            async def on_rows(rows):
+                # Fetching counts up to 80%; rendering (process pool) takes the rest
+                progress = min(80, rows * 80 // total) if total else 80
+                await report_jobs.update_report_job(job_id, progress=progress, rows=rows)
+
+            # Jobs wait for a render slot instead of being refused
+            rows = await exports.export_items(
+                job["kind"], db, path, on_rows=on_rows, reject_when_full=False, group_by=group_by,
+                options={"subtitle": await exports.filters_subtitle(db, group_by, **filters)},
+                skip=skip, limit=limit, allowed_branch_ids=job["allowed_branch_ids"], **filters
+            )
+    except Exception as e:
+        print(f"Report job {job_id} failed: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        await report_jobs.update_report_job(
+            job_id, status="failed", error=str(e), finished_at=datetime.now(timezone.utc).isoformat()
+        )
+        await publish_event({
+            "type": "REPORT_FAILED",
+            "job_id": job_id,
+            "message": "Falha ao gerar o relatório.",
+            "target_user_ids": await report_jobs.get_report_job_subscribers(job_id)
+        })
+        return
+
+    await report_jobs.update_report_job(
+        job_id, status="done", progress=100, rows=rows, file=filename,
+        finished_at=datetime.now(timezone.utc).isoformat()
+    )
+    await publish_event({
+        "type": "REPORT_READY",
+        "job_id": job_id,
+        "message": "Relatório pronto para download.",
+        "download_url": f"/reports/jobs/{job_id}/download",
+        "target_user_ids": await report_jobs.get_report_job_subscribers(job_id)
+    })
+
+async def cleanup_report_files_task(ctx):
+    """Deletes report job files older than REPORT_JOB_TTL."""
+    if not os.path.isdir(report_jobs.REPORTS_DIR):
+        return 0
+    cutoff = time.time() - report_jobs.REPORT_JOB_TTL
+    removed = 0
+    for entry in os.scandir(report_jobs.REPORTS_DIR):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
 
 # Worker Settings
 async def startup(ctx):
     print("Worker starting...")
+    ctx["mailer"] = Mailer(SessionLocal)
+    # Report exports filter items like the API (backend/search.py)
+    try:
+        async with engine.connect() as conn:
+            await search.detect_search_support(conn)
+    except Exception as e:
+        print(f"Worker Startup Error (search support): {e}")
 
 async def shutdown(ctx):
     print("Worker shutting down...")
+    if "mailer" in ctx:
+        await ctx["mailer"].close()
+    rendering.shutdown()
 
 class WorkerSettings:
-    functions = [send_email_task]
+    functions = [send_email_task, send_email_batch_task, send_email_digests_task, reconcile_rollup_task, snapshot_inventory_task, func(generate_report_task, timeout=report_jobs.REPORT_JOB_TIMEOUT), cleanup_report_files_task, close_depreciation_task, depreciation_alerts_task]
+    cron_jobs = [
+        # Nightly, outside business hours
+        cron(reconcile_rollup_task, hour={3}, minute={15}, run_at_startup=False),
+        # End of day, so each snapshot reflects the day's closing state
+        cron(snapshot_inventory_task, hour={23}, minute={50}, run_at_startup=False),
+        cron(cleanup_report_files_task, minute={0}, run_at_startup=True),
+        # First night of the month; also catches up on months missed while the worker was down
+        cron(close_depreciation_task, day={1}, hour={2}, minute={30}, run_at_startup=True),
+        # Start of the business day, after the depreciation close of the 1st
+        cron(depreciation_alerts_task, hour={7}, minute={0}, run_at_startup=False),
+        cron(send_email_digests_task, minute={5}, run_at_startup=False),
+    ]
     redis_settings = get_redis_settings()
     on_startup = startup
     on_shutdown = shutdown
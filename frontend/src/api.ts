@@ -117,6 +117,125 @@ export const rejectRequest = async (id: number) => {
     return response.data;
 };
 
+// Dashboard aggregation (buckets computed server-side)
+export type AggregateDimension = 'branch' | 'category' | 'cost_center' | 'sector' | 'status' | 'supplier' | 'purchase_month';
+export type AggregateMetric = 'count' | 'sum_invoice_value' | 'avg_invoice_value' | 'sum_book_value' | 'count_zero_book_value';
+
+export interface AggregateParams {
+    group_by?: AggregateDimension[];
+    metrics?: AggregateMetric[];
+    status?: string[];
+    branch_id?: number[];
+    category_id?: number[];
+    cost_center_id?: number[];
+    sector_id?: number[];
+    supplier_id?: number[];
+    search?: string;
+    purchase_date_from?: string;
+    purchase_date_to?: string;
+    created_at_from?: string;
+    created_at_to?: string;
+}
+
+export interface AggregateResponse {
+    group_by: AggregateDimension[];
+    metrics: AggregateMetric[];
+    buckets: Record<string, any>[];
+}
+
+export const getDashboardAggregate = async (params: AggregateParams) => {
+    // Repeated keys (?group_by=branch&group_by=status), as FastAPI expects for lists
+    const response = await api.get<AggregateResponse>('/dashboard/aggregate', {
+        params,
+        paramsSerializer: { indexes: null }
+    });
+    return response.data;
+};
+
+// Item lists of the dashboard (highest book value / last registered), bounded by limit
+export interface DashboardItemsParams extends Pick<AggregateParams, 'status' | 'branch_id' | 'category_id' | 'search' | 'purchase_date_from' | 'purchase_date_to'> {
+    order: 'book_value' | 'recent';
+    limit?: number;
+}
+
+export const getDashboardItems = async (params: DashboardItemsParams) => {
+    const response = await api.get<any[]>('/dashboard/items', {
+        params,
+        paramsSerializer: { indexes: null }
+    });
+    return response.data;
+};
+
+// Month-over-month series from the daily inventory snapshots
+export interface TrendsParams {
+    months?: number;
+    group_by?: ('branch' | 'category' | 'status')[];
+    status?: string[];
+    branch_id?: number[];
+    category_id?: number[];
+}
+
+export interface TrendPoint {
+    month: string;
+    snapshot_date: string;
+    count: number;
+    total_value: number;
+    [dimension: string]: any;
+}
+
+export const getDashboardTrends = async (params: TrendsParams = {}) => {
+    const response = await api.get<{ months: number; group_by: string[]; points: TrendPoint[] }>('/dashboard/trends', {
+        params,
+        paramsSerializer: { indexes: null }
+    });
+    return response.data;
+};
+
+// Report jobs: exports generated in the background worker
+export type ReportKind = 'excel' | 'pdf' | 'sap';
+
+export interface ReportJob {
+    id: string;
+    kind: ReportKind;
+    status: 'queued' | 'running' | 'done' | 'failed';
+    progress: number;
+    rows: number;
+    error?: string | null;
+    created_at?: string | null;
+    finished_at?: string | null;
+    download_url?: string | null;
+}
+
+export const createReportJob = async (kind: ReportKind, filters: Record<string, any> = {}) => {
+    const response = await api.post<ReportJob>('/reports/jobs', { kind, filters });
+    return response.data;
+};
+
+export const getReportJob = async (jobId: string) => {
+    const response = await api.get<ReportJob>(`/reports/jobs/${jobId}`);
+    return response.data;
+};
+
+// Polls the job until it finishes and returns the generated file
+export const waitForReportJob = async (
+    job: ReportJob,
+    onProgress?: (job: ReportJob) => void,
+    intervalMs = 1500
+): Promise<Blob> => {
+    let current = job;
+    while (current.status === 'queued' || current.status === 'running') {
+        onProgress?.(current);
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        current = await getReportJob(current.id);
+    }
+    if (current.status === 'failed') {
+        throw new Error(current.error || 'Falha ao gerar o relatório');
+    }
+    onProgress?.(current);
+    const response = await api.get(`/reports/jobs/${current.id}/download`, { responseType: 'blob' });
+    return response.data;
+};
+
 // New entities: CostCenter and Sector (Generic API access is enough usually, but can type if needed)
 // Using direct api.get/post in components for CRUD
 
@@ -18,14 +18,30 @@ export const NotificationCenter: React.FC = () => {
     const [unreadCount, setUnreadCount] = useState(0);
     const dropdownRef = useRef<HTMLDivElement>(null);
 
-    // Fetch Notifications
-    const fetchNotifications = async () => {
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [isLoadingPage, setIsLoadingPage] = useState(false);
+
+    // Unread badge: the only request made while polling
+    const fetchUnreadCount = async () => {
+        try {
+            const response = await api.get('/notifications/unread-count');
+            setUnreadCount(response.data.count);
+        } catch (error) {
+            console.error("Failed to fetch unread count", error);
+        }
+    };
+
+    // Notification pages (newest first), loaded when the dropdown is open
+    const fetchNotifications = async (cursor: string | null = null) => {
+        setIsLoadingPage(true);
         try {
-            const response = await api.get('/notifications/');
-            setNotifications(response.data);
-            setUnreadCount(response.data.filter((n: Notification) => !n.read).length);
+            const response = await api.get('/notifications/', { params: cursor ? { cursor } : {} });
+            setNotifications(prev => cursor ? [...prev, ...response.data.items] : response.data.items);
+            setNextCursor(response.data.next_cursor);
         } catch (error) {
             console.error("Failed to fetch notifications", error);
+        } finally {
+            setIsLoadingPage(false);
         }
     };
 
@@ -55,14 +71,19 @@ export const NotificationCenter: React.FC = () => {
     useEffect(() => {
         if (!user) return;
 
-        fetchNotifications();
+        fetchUnreadCount();
 
         // Poll every 30 seconds to update count
-        const interval = setInterval(fetchNotifications, 30000);
+        const interval = setInterval(fetchUnreadCount, 30000);
 
         return () => clearInterval(interval);
     }, [user]);
 
+    // First page on every open (one indexed 20-row query)
+    useEffect(() => {
+        if (isOpen) fetchNotifications();
+    }, [isOpen]);
+
     // Close on click outside
     useEffect(() => {
         const handleClickOutside = (event: MouseEvent) => {
@@ -147,6 +168,15 @@ export const NotificationCenter: React.FC = () => {
                                 ))}
                             </div>
                         )}
+                        {nextCursor && (
+                            <button
+                                onClick={() => fetchNotifications(nextCursor)}
+                                disabled={isLoadingPage}
+                                className="w-full px-4 py-2 text-xs text-indigo-600 hover:bg-gray-50 border-t border-gray-100 disabled:text-gray-400"
+                            >
+                                {isLoadingPage ? 'Carregando...' : 'Carregar mais'}
+                            </button>
+                        )}
                     </div>
                 </div>
             )}
@@ -52,60 +52,27 @@ const Notifications: React.FC = () => {
             socket.onmessage = (event) => {
                 try {
                     let data = event.data;
-                    let payload: WebSocketPayload;
+                    let payloads: WebSocketPayload[];
 
-                    // Try parsing JSON
+                    // Try parsing JSON: one event, or an array when the server coalesced a burst
                     try {
-                        payload = JSON.parse(data);
+                        const parsed = JSON.parse(data);
+                        payloads = Array.isArray(parsed) ? parsed : [parsed];
                     } catch (e) {
                         // Legacy string support
-                        payload = { message: data };
+                        payloads = [{ message: data }];
                     }
 
-                    // 1. Don't show notification to the user who triggered the action
-                    if (user && payload.actor_id && user.email) { // Using email/id check? Payload has ID.
-                        // Assuming user context has ID. Let's check AuthContext interface or just assume decoded token has ID.
-                        // Actually, frontend 'user' object might not have ID explicitly typed in AuthContext,
-                        // but normally it does or we can decode from token.
-                        // However, 'user' comes from AuthProvider which decodes JWT.
-                        // Let's rely on standard logic: if we initiated it, we know.
-                        // But strictly matching ID is safer.
-                        // If user.id is not available, we skip this check or try to match email if provided?
-                        // For now, let's assume if payload.actor_id matches we hide.
-                        // But we need to know current user ID.
-                        // Let's inspect 'user' object in AuthContext again.
-                        // It has { email, role, can_import }. No ID?
-                        // If no ID in frontend user object, we can't filter by ID easily.
-                        // We could decode token manually here, or just show it.
-
-                        // Wait, previous context check: "The `User` type ... contains `email`, `role`, and optional `can_import` fields."
-                        // It does NOT contain ID.
-                        // This is a limitation.
-
-                        // Alternative: We can filter by Role.
-                    }
+                    // Targeting (users, roles, branch, actor) is resolved by the server:
+                    // this connection only receives the events meant for this user.
 
-                    // 2. Filter by Specific User IDs (Priority)
-                    if (payload.target_user_ids && payload.target_user_ids.length > 0) {
-                        if (!user || !user.id || !payload.target_user_ids.includes(user.id)) {
-                            return; // Not targeted to me specifically
-                        }
-                    }
-                    // 3. Fallback: Filter by Role (if no specific user IDs provided)
-                    else if (payload.target_roles && user) {
-                        if (!payload.target_roles.includes(user.role)) {
-                            return; // Not for my role
-                        }
+                    // Show notification (a burst becomes a single toast)
+                    if (payloads.length === 1) {
+                        showSuccess(payloads[0].message, "Nova Notificação");
+                    } else if (payloads.length > 1) {
+                        showSuccess(`${payloads.length} novas notificações. Última: ${payloads[payloads.length - 1].message}`, "Novas Notificações");
                     }
 
-                    // 3. Filter by Branch (Optional/Advanced)
-                    // If target_branch_id is present and user is OPERATOR, check if they belong.
-                    // But we don't have user's branch list easily accessible here without fetching.
-                    // For now, relying on Role is a good 90% solution.
-
-                    // Show notification
-                    showSuccess(payload.message, "Nova Notificação");
-
                 } catch (e) {
                     console.error('[WS] Error processing message:', e);
                 }
@@ -115,6 +82,11 @@ const Notifications: React.FC = () => {
                 console.log(`[WS] Disconnected (Code: ${event.code})`);
                 socketRef.current = null;
 
+                // 1008: token rejected by the server; a new login remounts with a fresh token
+                if (event.code === 1008) {
+                    return;
+                }
+
                 // Trigger reconnection if mounted
                 if (isMountedRef.current) {
                     const delay = getReconnectDelay(reconnectAttemptsRef.current);
@@ -1,19 +1,17 @@
 import React, { createContext, useContext, useState, useEffect, useMemo } from 'react';
-import api from '../../api';
+import { format } from 'date-fns';
+import api, { getDashboardAggregate, getDashboardItems } from '../../api';
 import { useAuth } from '../../AuthContext';
 import type { DateRange } from './ui/DateRangePicker';
 
 interface DashboardContextType {
     isLoading: boolean;
-    items: any[];
-    filteredItems: any[];
     filters: {
         branches: (string | number)[];
         categories: (string | number)[];
         status: string[];
         dateRange: DateRange;
         search: string;
-        valueRange: { min: number | null, max: number | null };
     };
     setFilters: React.Dispatch<React.SetStateAction<{
         branches: (string | number)[];
@@ -21,7 +19,6 @@ interface DashboardContextType {
         status: string[];
         dateRange: DateRange;
         search: string;
-        valueRange: { min: number | null, max: number | null };
     }>>;
     availableBranches: any[];
     availableCategories: any[];
@@ -38,6 +35,7 @@ interface DashboardContextType {
         countByBranch: { [key: string]: number };
         countByCategory: { [key: string]: number };
         itemsByStatus: { [key: string]: number };
+        valueByPurchaseMonth: { [key: string]: number };
         topItems: any[];
         recentItems: any[];
     };
@@ -64,13 +62,24 @@ interface DashboardContextType {
     closeModal: () => void;
 }
 
+// Statuses counted in the value totals and breakdowns
+const FINANCIAL_STATUSES = ['APPROVED', 'IN_STOCK', 'MAINTENANCE', 'IN_TRANSIT', 'TRANSFER_PENDING', 'WRITE_OFF_PENDING'];
+const PENDING_STATUSES = ['PENDING', 'WRITE_OFF_PENDING', 'TRANSFER_PENDING'];
+// Widgets listing individual items, and their number of rows
+const LIST_WIDGETS = ['table-top-items', 'table-recent-items'];
+const LIST_LIMIT = 10;
+
 const DashboardContext = createContext<DashboardContextType | undefined>(undefined);
 
 export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
     const { user } = useAuth();
 
     const [isLoading, setIsLoading] = useState(true);
-    const [rawItems, setRawItems] = useState<any[]>([]);
+    // Buckets from /dashboard/aggregate: (branch, category, status) and (purchase month, status)
+    const [buckets, setBuckets] = useState<Record<string, any>[]>([]);
+    const [monthBuckets, setMonthBuckets] = useState<Record<string, any>[]>([]);
+    const [topItems, setTopItems] = useState<any[]>([]);
+    const [recentItems, setRecentItems] = useState<any[]>([]);
     const [availableBranches, setAvailableBranches] = useState<any[]>([]);
     const [availableCategories, setAvailableCategories] = useState<any[]>([]);
 
@@ -96,7 +105,6 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({ chi
         status: [] as string[],
         dateRange: { startDate: null, endDate: null, label: 'Todo o Período' } as DateRange,
         search: '',
-        valueRange: { min: null, max: null } as { min: number | null, max: number | null },
     });
 
     // Theme & Layout
@@ -183,40 +191,54 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({ chi
     };
 
     // Data Fetching
-    const fetchData = async () => {
-        setIsLoading(true);
+    const fetchMetadata = async () => {
         try {
-            // Fetch metadata
             const [branchesRes, categoriesRes] = await Promise.all([
                 api.get('/branches/'),
                 api.get('/categories/')
             ]);
             setAvailableBranches(branchesRes.data);
             setAvailableCategories(categoriesRes.data);
+        } catch (error) {
+            console.error("Failed to fetch dashboard metadata", error);
+        }
+    };
 
-            // Fetch Items
-            let allItems: any[] = [];
-            let skip = 0;
-            const limit = 1000; // Chunk size
-            let keepFetching = true;
-
-            while (keepFetching) {
-                const itemsRes = await api.get(`/items/?limit=${limit}&skip=${skip}`);
-                const data = itemsRes.data;
-                allItems = [...allItems, ...data];
-
-                if (data.length < limit) {
-                    keepFetching = false;
-                } else {
-                    skip += limit;
-                }
-
-                // Safety break
-                if (allItems.length > 20000) break;
-            }
-
-            setRawItems(allItems);
+    // Filters are applied by the server: totals and charts come from aggregated
+    // buckets, only the list widgets load individual items (LIST_LIMIT each)
+    const fetchData = async () => {
+        setIsLoading(true);
+        try {
+            const params = {
+                branch_id: filters.branches.map(Number),
+                category_id: filters.categories.map(Number),
+                status: filters.status,
+                search: filters.search || undefined,
+                purchase_date_from: filters.dateRange.startDate ? format(filters.dateRange.startDate, 'yyyy-MM-dd') : undefined,
+                purchase_date_to: filters.dateRange.endDate ? format(filters.dateRange.endDate, 'yyyy-MM-dd') : undefined,
+            };
+            const listItems = (widgetId: string, order: 'book_value' | 'recent') =>
+                layout.includes(widgetId) ? getDashboardItems({ ...params, order, limit: LIST_LIMIT }) : Promise.resolve([]);
+
+            const [totals, months, top, recent] = await Promise.all([
+                getDashboardAggregate({
+                    ...params,
+                    group_by: ['branch', 'category', 'status'],
+                    metrics: ['count', 'sum_invoice_value', 'sum_book_value', 'count_zero_book_value']
+                }),
+                getDashboardAggregate({
+                    ...params,
+                    group_by: ['purchase_month', 'status'],
+                    metrics: ['count', 'sum_book_value']
+                }),
+                listItems('table-top-items', 'book_value'),
+                listItems('table-recent-items', 'recent')
+            ]);
 
+            setBuckets(totals.buckets);
+            setMonthBuckets(months.buckets);
+            setTopItems(top);
+            setRecentItems(recent);
         } catch (error) {
             console.error("Failed to fetch dashboard data", error);
         } finally {
@@ -225,64 +247,27 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({ chi
     };
 
     useEffect(() => {
-        fetchData();
+        fetchMetadata();
     }, []);
 
-    // Aggregation Logic
-    const { filteredItems, aggregates } = useMemo(() => {
-        let filtered = rawItems;
-
-        // 1. Branch Filter
-        if (filters.branches.length > 0) {
-            filtered = filtered.filter((item: any) => filters.branches.includes(item.branch_id));
-        }
-
-        // 2. Category Filter
-        if (filters.categories.length > 0) {
-            filtered = filtered.filter((item: any) =>
-                item.category_rel ? filters.categories.includes(item.category_rel.id) : false
-            );
-        }
-
-        // 3. Status Filter
-        if (filters.status.length > 0) {
-            filtered = filtered.filter((item: any) => filters.status.includes(item.status));
-        }
+    // Reordering the grid does not refetch, adding or removing a list widget does
+    const listWidgets = LIST_WIDGETS.filter(id => layout.includes(id)).join(',');
 
-        // 4. Value Range Filter
-        if (filters.valueRange.min !== null) {
-            filtered = filtered.filter((item: any) => (item.accounting_value || 0) >= (filters.valueRange.min as number));
-        }
-        if (filters.valueRange.max !== null) {
-            filtered = filtered.filter((item: any) => (item.accounting_value || 0) <= (filters.valueRange.max as number));
-        }
-
-        // 5. Search
-        if (filters.search) {
-            const lowerSearch = filters.search.toLowerCase();
-            filtered = filtered.filter((item: any) =>
-                item.description.toLowerCase().includes(lowerSearch) ||
-                (item.fixed_asset_number && item.fixed_asset_number.toLowerCase().includes(lowerSearch))
-            );
-        }
-
-        // 6. Date Range (Purchase Date)
-        if (filters.dateRange.startDate && filters.dateRange.endDate) {
-            const start = filters.dateRange.startDate.getTime();
-            const end = filters.dateRange.endDate.getTime();
-            filtered = filtered.filter((item: any) => {
-                const pDate = new Date(item.purchase_date).getTime();
-                return pDate >= start && pDate <= end;
-            });
-        }
+    // Debounced so typing in the search box does not fire one request per key
+    useEffect(() => {
+        const timeout = setTimeout(fetchData, 300);
+        return () => clearTimeout(timeout);
+    }, [filters, listWidgets]);
 
-        // --- Aggregations ---
+    // Aggregation Logic
+    const aggregates = useMemo(() => {
         let totalValue = 0;
         let totalPurchaseValue = 0;
         let totalItems = 0;
         let pendingValue = 0;
         let pendingCount = 0;
         let totalAgeMonths = 0;
+        let datedItems = 0;
         let zeroDepreciationCount = 0;
 
         const valueByBranch: Record<string, number> = {};
@@ -290,90 +275,75 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({ chi
         const countByBranch: Record<string, number> = {};
         const countByCategory: Record<string, number> = {};
         const itemsByStatus: Record<string, number> = {};
+        const valueByPurchaseMonth: Record<string, number> = {};
 
-        const now = new Date().getTime();
-
-        filtered.forEach((item: any) => {
-            const val = item.accounting_value || 0;
-            const purchVal = item.invoice_value || 0;
+        buckets.forEach((bucket: any) => {
+            const count = bucket.count || 0;
+            const val = bucket.sum_book_value || 0;
 
             // Financial Statuses: Only these count towards Value totals
-            const isFinancial = ['APPROVED', 'IN_STOCK', 'MAINTENANCE', 'IN_TRANSIT', 'TRANSFER_PENDING', 'WRITE_OFF_PENDING'].includes(item.status);
-
-            // Totals
-            if (isFinancial) {
+            if (FINANCIAL_STATUSES.includes(bucket.status)) {
                 totalValue += val;
-                totalPurchaseValue += purchVal;
-                totalItems += 1; // Count only financial items in Total Items? Or keep raw count?
-                                 // Usually "Total Items" implies active assets.
-                                 // Pending items are separate.
-
-                if (val === 0) zeroDepreciationCount += 1;
-
-                if (item.purchase_date) {
-                     const pDate = new Date(item.purchase_date).getTime();
-                     const ageMonths = (now - pDate) / (1000 * 60 * 60 * 24 * 30.44); // Approx months
-                     if (ageMonths > 0) totalAgeMonths += ageMonths;
-                }
+                totalPurchaseValue += bucket.sum_invoice_value || 0;
+                totalItems += count;
+                zeroDepreciationCount += bucket.count_zero_book_value || 0;
 
                 // By Branch (Financial Only)
-                const branchName = item.branch ? item.branch.name : 'Sem Filial';
+                const branchName = bucket.branch_label || 'Sem Filial';
                 valueByBranch[branchName] = (valueByBranch[branchName] || 0) + val;
-                countByBranch[branchName] = (countByBranch[branchName] || 0) + 1;
+                countByBranch[branchName] = (countByBranch[branchName] || 0) + count;
 
                 // By Category (Financial Only)
-                const catName = item.category || 'Sem Categoria';
+                const catName = bucket.category_label || 'Sem Categoria';
                 valueByCategory[catName] = (valueByCategory[catName] || 0) + val;
-                countByCategory[catName] = (countByCategory[catName] || 0) + 1;
+                countByCategory[catName] = (countByCategory[catName] || 0) + count;
             }
 
-            // Pending (for KPI)
-            if (item.status === 'PENDING' || item.status === 'WRITE_OFF_PENDING' || item.status === 'TRANSFER_PENDING') {
-                pendingCount += 1;
-                pendingValue += val;
+            // Pending (for KPI). Items awaiting approval have no book value yet: their invoice value counts
+            if (PENDING_STATUSES.includes(bucket.status)) {
+                pendingCount += count;
+                pendingValue += bucket.status === 'PENDING' ? (bucket.sum_invoice_value || 0) : val;
             }
 
             // By Status (All items)
-            itemsByStatus[item.status] = (itemsByStatus[item.status] || 0) + 1;
+            itemsByStatus[bucket.status] = (itemsByStatus[bucket.status] || 0) + count;
         });
 
-        // Top Items (Sort by Value)
-        const topItems = [...filtered]
-            .sort((a: any, b: any) => (b.accounting_value || 0) - (a.accounting_value || 0))
-            .slice(0, 10);
-
-        // Recent Items (Sort by ID desc as proxy for recency if created_at not available, or purchase_date)
-        const recentItems = [...filtered]
-             .sort((a: any, b: any) => (b.id || 0) - (a.id || 0))
-             .slice(0, 10);
+        const now = new Date().getTime();
+        monthBuckets.forEach((bucket: any) => {
+            if (!bucket.purchase_month || !FINANCIAL_STATUSES.includes(bucket.status)) return;
+            valueByPurchaseMonth[bucket.purchase_month] = (valueByPurchaseMonth[bucket.purchase_month] || 0) + (bucket.sum_book_value || 0);
+
+            // Age from the middle of the purchase month
+            const pDate = new Date(`${bucket.purchase_month}-15`).getTime();
+            const ageMonths = (now - pDate) / (1000 * 60 * 60 * 24 * 30.44); // Approx months
+            if (ageMonths > 0) totalAgeMonths += ageMonths * (bucket.count || 0);
+            datedItems += bucket.count || 0;
+        });
 
         return {
-            filteredItems: filtered,
-            aggregates: {
-                totalValue,
-                totalPurchaseValue,
-                totalItems,
-                pendingValue,
-                pendingCount,
-                averageAssetAgeMonths: totalItems > 0 ? totalAgeMonths / totalItems : 0,
-                zeroDepreciationCount,
-                valueByBranch,
-                valueByCategory,
-                countByBranch,
-                countByCategory,
-                itemsByStatus,
-                topItems,
-                recentItems
-            }
+            totalValue,
+            totalPurchaseValue,
+            totalItems,
+            pendingValue,
+            pendingCount,
+            averageAssetAgeMonths: datedItems > 0 ? totalAgeMonths / datedItems : 0,
+            zeroDepreciationCount,
+            valueByBranch,
+            valueByCategory,
+            countByBranch,
+            countByCategory,
+            itemsByStatus,
+            valueByPurchaseMonth,
+            topItems,
+            recentItems
         };
 
-    }, [rawItems, filters]);
+    }, [buckets, monthBuckets, topItems, recentItems]);
 
     return (
         <DashboardContext.Provider value={{
             isLoading,
-            items: rawItems,
-            filteredItems,
             filters,
             setFilters,
             availableBranches,
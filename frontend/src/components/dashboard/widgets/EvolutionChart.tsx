@@ -7,33 +7,17 @@ import { ptBR } from 'date-fns/locale';
 import { useDashboardNavigation } from '../../../hooks/useDashboardNavigation';
 
 const EvolutionChart: React.FC = () => {
-    const { filteredItems, theme } = useDashboard();
+    const { aggregates, theme } = useDashboard();
     const { openDetailModal } = useDashboardNavigation();
 
-    const itemsWithDate = filteredItems
-        .filter((item: any) => {
-            if (!item.purchase_date) return false;
-            // Only include financial items (Approved, Stock, Maintenance, Transit)
-            // Exclude PENDING, REJECTED, WRITTEN_OFF
-            const isFinancial = ['APPROVED', 'IN_STOCK', 'MAINTENANCE', 'IN_TRANSIT', 'TRANSFER_PENDING', 'WRITE_OFF_PENDING'].includes(item.status);
-            return isFinancial;
-        })
-        .map((item: any) => ({
-            date: new Date(item.purchase_date),
-            value: item.accounting_value || 0
-        }))
-        .sort((a: any, b: any) => a.date.getTime() - b.date.getTime());
-
-    // Group by Month
+    // Book value of the financial items (Approved, Stock, Maintenance, Transit) by purchase month,
+    // accumulated month over month
     const monthlyData: Record<string, number> = {};
-
-    // Initialize accumulation
     let runningTotal = 0;
 
-    itemsWithDate.forEach((item: any) => {
-        const key = format(item.date, 'yyyy-MM');
-         runningTotal += item.value;
-         monthlyData[key] = runningTotal;
+    Object.keys(aggregates.valueByPurchaseMonth).sort().forEach((key) => {
+        runningTotal += aggregates.valueByPurchaseMonth[key];
+        monthlyData[key] = runningTotal;
     });
 
     const data = Object.entries(monthlyData).map(([key, value]) => ({
@@ -1,6 +1,6 @@
 
 import React, { useEffect, useState } from 'react';
-import api, { bulkWriteOff, bulkTransfer } from '../api';
+import api, { bulkWriteOff, bulkTransfer, createReportJob, waitForReportJob } from '../api';
 import { useForm } from 'react-hook-form';
 import { useAuth } from '../AuthContext';
 import { useError } from '../hooks/useError';
@@ -8,8 +8,6 @@ import { useSearchParams } from 'react-router-dom';
 import { translateStatus, translateLogAction } from '../utils/translations';
 import { Columns, Edit2, Eye, CheckCircle, XCircle, ArrowRightLeft, FileText, Search, Plus, FileWarning, AlertCircle, Download, FileSpreadsheet, Table as TableIcon, ChevronDown, Wrench, Archive, RefreshCw, Upload, Truck, PackageCheck, Layers, X, Trash2 } from 'lucide-react';
 import * as XLSX from 'xlsx';
-import jsPDF from 'jspdf';
-import autoTable from 'jspdf-autotable';
 
 const StatusBadge = ({ status }: { status: string }) => {
     const map: any = {
@@ -542,37 +540,41 @@ const Inventory: React.FC<InventoryProps> = ({ embedded = false, defaultStatus }
     };
 
     const exportPDF = async () => {
-        const data = await getAllFilteredItems();
-        const doc = new jsPDF('l', 'mm', 'a4');
-        const headers = [['ID', 'Descrição', 'Categoria', 'Status', 'Valor', 'Data', 'Ativo Fixo', 'Filial']];
-        const rows = data.map((item: any) => [
-            item.id,
-            item.description,
-            item.category,
-            translateStatus(item.status),
-            new Intl.NumberFormat('pt-BR', { style: 'currency', currency: 'BRL' }).format(item.invoice_value),
-            item.purchase_date ? new Date(item.purchase_date).toLocaleDateString('pt-BR') : '',
-            item.fixed_asset_number || '',
-            item.branch?.name || ''
-        ]);
-
-        autoTable(doc, {
-            head: headers,
-            body: rows,
-            startY: 20,
-            styles: { fontSize: 8 },
-            headStyles: { fillColor: [79, 70, 229] }
-        });
-        doc.save('inventario.pdf');
+        try {
+            const statusFilter = searchParams.get('status');
+            const filters: any = {
+                search: globalSearch || undefined,
+                status: statusFilter || undefined,
+                category: filterCategory || undefined,
+                branch_id: filterBranch || undefined,
+                description: filterDescription || undefined,
+                fixed_asset_number: filterFixedAsset || undefined,
+                purchase_date: filterPurchaseDate || undefined,
+                // Sections with subtotals per branch when no single branch is selected
+                group_by: filterBranch ? undefined : 'branch'
+            };
+
+            const job = await createReportJob('pdf', filters);
+            const blob = await waitForReportJob(job);
+
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = 'inventario.pdf';
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+        } catch (error: any) {
+            console.error("Erro ao exportar PDF", error);
+            showError("Falha na exportação PDF.");
+        }
     };
 
     const exportSAP = async () => {
         try {
             const statusFilter = searchParams.get('status');
-            const params: any = {
-                search: globalSearch,
-                skip: 0,
-                limit: 100000,
+            const filters: any = {
+                search: globalSearch || undefined,
                 status: statusFilter || undefined,
                 category: filterCategory || undefined,
                 branch_id: filterBranch || undefined,
@@ -581,12 +583,11 @@ const Inventory: React.FC<InventoryProps> = ({ embedded = false, defaultStatus }
                 purchase_date: filterPurchaseDate || undefined
             };
 
-            const response = await api.get('/reports/export/sap', { 
-                params,
-                responseType: 'blob'
-            });
+            // Generated by the worker; identical exports in progress are shared
+            const job = await createReportJob('sap', filters);
+            const blob = await waitForReportJob(job);
 
-            const url = window.URL.createObjectURL(new Blob([response.data]));
+            const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
             a.href = url;
             a.download = 'export_sap.xlsx';
@@ -731,9 +732,16 @@ const Inventory: React.FC<InventoryProps> = ({ embedded = false, defaultStatus }
         setIsWriteOffModalOpen(true);
     };
 
-    const openDetailsModal = (item: any) => {
+    const openDetailsModal = async (item: any) => {
         setSelectedItem(item);
         setIsDetailsModalOpen(true);
+        // A listagem não traz o histórico; busca o item completo
+        try {
+            const response = await api.get(`/items/${item.id}`);
+            setSelectedItem(response.data);
+        } catch (error) {
+            console.error("Erro ao carregar detalhes do item", error);
+        }
     };
 
     const openEditModal = (item: any) => {
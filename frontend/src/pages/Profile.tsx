@@ -1,9 +1,9 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useForm } from 'react-hook-form';
 import api from '../api';
 import { useAuth } from '../AuthContext';
 import { useError } from '../hooks/useError';
-import { User, Lock, Save, Loader2 } from 'lucide-react';
+import { User, Lock, Save, Loader2, Mail } from 'lucide-react';
 import { translateRole } from '../utils/translations';
 
 const Profile: React.FC = () => {
@@ -11,6 +11,29 @@ const Profile: React.FC = () => {
     const { register, handleSubmit, watch, reset, formState: { errors } } = useForm();
     const { showSuccess, showError } = useError();
     const [isLoading, setIsLoading] = useState(false);
+    const [emailDigest, setEmailDigest] = useState('immediate');
+    const [isSavingDigest, setIsSavingDigest] = useState(false);
+
+    useEffect(() => {
+        api.get('/users/me')
+            .then(response => setEmailDigest(response.data.email_digest || 'immediate'))
+            .catch(() => {});
+    }, []);
+
+    const onChangeEmailDigest = async (value: string) => {
+        const previous = emailDigest;
+        setEmailDigest(value);
+        setIsSavingDigest(true);
+        try {
+            await api.put('/users/me/preferences', { email_digest: value });
+            showSuccess('Preferência de e-mail salva!');
+        } catch (error) {
+            setEmailDigest(previous);
+            showError(error, 'PREFERENCES_UPDATE_ERROR');
+        } finally {
+            setIsSavingDigest(false);
+        }
+    };
 
     const onChangePassword = async (data: any) => {
         setIsLoading(true);
@@ -67,6 +90,24 @@ const Profile: React.FC = () => {
                             </div>
                         </div>
                     </div>
+
+                    <div className="mt-6 pt-4 border-t border-slate-100 space-y-1.5">
+                        <label className="text-sm font-medium text-slate-700 flex items-center gap-2">
+                            <Mail className="text-blue-600" size={16} />
+                            Notificações por e-mail
+                        </label>
+                        <select
+                            value={emailDigest}
+                            disabled={isSavingDigest}
+                            onChange={(e) => onChangeEmailDigest(e.target.value)}
+                            className="w-full px-4 py-2 border border-slate-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 transition-all bg-white/50"
+                        >
+                            <option value="immediate">Imediato (um e-mail por notificação)</option>
+                            <option value="hourly">Resumo por hora</option>
+                            <option value="daily">Resumo diário</option>
+                        </select>
+                        <p className="text-xs text-slate-500">As notificações no sistema continuam chegando na hora.</p>
+                    </div>
                 </div>
 
                 {/* Change Password Card */}
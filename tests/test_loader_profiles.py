@@ -0,0 +1,175 @@
+"""
+SQL statement counts per endpoint, pinned so the loader policy of backend/loaders.py
+(collections lazy="raise"/"noload", graphs loaded through named profiles) cannot
+regress into cascading or per-row loads.
+
+Runs against an in-memory SQLite database (backend/requirements-dev.txt); the counts do not
+depend on the number of rows, which is why the fixtures create several of each.
+"""
+import os
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+os.environ.setdefault("SECRET_KEY", "test")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import auth, crud, models, schemas
+from backend.database import Base, get_db
+from backend.main import app
+
+ITEMS = 6
+LOGS_PER_ITEM = 3
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+async def _seed(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # Core inserts: no ORM session events (rollup, cache invalidation) involved
+        await conn.execute(insert(models.Branch), [
+            {"id": 1, "name": "Matriz", "address": "-"},
+            {"id": 2, "name": "Filial", "address": "-"},
+        ])
+        await conn.execute(insert(models.Category), [{"id": 1, "name": "TI", "depreciation_months": 60}])
+        await conn.execute(insert(models.Supplier), [{"id": 1, "name": "Fornecedor", "cnpj": "1"}])
+        await conn.execute(insert(models.CostCenter), [{"id": 1, "code": "CC1", "name": "CC"}])
+        await conn.execute(insert(models.Sector), [{"id": 1, "name": "Setor", "branch_id": 1}])
+        await conn.execute(insert(models.User), [
+            {"id": 1, "name": "Admin", "email": "admin@example.com", "hashed_password": "-", "role": models.UserRole.ADMIN, "branch_id": 1},
+            {"id": 2, "name": "Operador", "email": "op@example.com", "hashed_password": "-", "role": models.UserRole.OPERATOR, "branch_id": 2},
+        ])
+        await conn.execute(insert(models.user_branches), [
+            {"user_id": 1, "branch_id": 1}, {"user_id": 1, "branch_id": 2}, {"user_id": 2, "branch_id": 2},
+        ])
+        await conn.execute(insert(models.Request), [
+            {"id": 1, "type": models.RequestType.TRANSFER, "status": models.RequestStatus.PENDING,
+             "requester_id": 2, "category_id": 1, "data": {}},
+        ])
+        await conn.execute(insert(models.Item), [
+            {
+                "id": i, "description": f"Item {i}", "category": "TI", "category_id": 1,
+                "purchase_date": datetime(2024, 1, 1), "invoice_value": 1000.0, "invoice_number": f"NF{i}",
+                "supplier_id": 1, "branch_id": 1 + i % 2, "transfer_target_branch_id": 2, "responsible_id": 2,
+                "status": models.ItemStatus.APPROVED, "cost_center_id": 1, "sector_id": 1,
+                "request_id": 1 if i <= 2 else None,
+            }
+            for i in range(1, ITEMS + 1)
+        ])
+        await conn.execute(insert(models.Log), [
+            {"item_id": i, "user_id": 1 + n % 2, "action": f"Ação {n}", "changes": {}}
+            for i in range(1, ITEMS + 1) for n in range(LOGS_PER_ITEM)
+        ])
+
+
+@pytest.fixture(scope="module")
+def database():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    asyncio.run(_seed(engine))
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    yield engine, session_factory
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture(scope="module")
+def client(database):
+    engine, session_factory = database
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    # Authentication is stubbed (auth.load_principal has its own caches): only the endpoint's statements are counted
+    app.dependency_overrides[auth.get_current_user] = lambda: auth.Principal(
+        id=1, email="admin@example.com", role=models.UserRole.ADMIN, branch_id=1, branch_ids=[1, 2]
+    )
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def counter(database):
+    engine, _ = database
+    counter = StatementCounter(engine)
+    yield counter
+    event.remove(engine.sync_engine, "before_cursor_execute", counter._record)
+
+
+def test_items_list_is_one_statement(client, counter):
+    response = client.get("/items/")
+    assert response.status_code == 200
+    assert len(response.json()) == ITEMS
+    # Many-to-one relations are joined, the history is not loaded
+    assert counter.count == 1, counter.statements
+
+
+def test_items_search_without_full_text_objects(client, counter):
+    # create_all databases have no search_vector / f_unaccent: plain ILIKE fallback
+    response = client.get("/items/", params={"search": "item 1", "description": "item"})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [1]
+    assert counter.count == 1, counter.statements
+
+
+def test_dashboard_items_is_one_bounded_statement(client, counter):
+    response = client.get("/dashboard/items", params={"order": "recent", "limit": 3})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [6, 5, 4]
+    assert counter.count == 1, counter.statements
+
+
+def test_item_detail_loads_history_in_one_more_statement(client, counter):
+    response = client.get("/items/1")
+    assert response.status_code == 200
+    assert len(response.json()["logs"]) == LOGS_PER_ITEM
+    # Item + relations, then the logs with their authors
+    assert counter.count == 2, counter.statements
+
+
+def test_request_detail_is_two_statements(database, counter):
+    _, session_factory = database
+
+    async def load():
+        async with session_factory() as db:
+            request = await crud.get_request(db, 1)
+            # Serializing touches every relationship the response exposes
+            return schemas.RequestResponse.model_validate(request)
+
+    response = asyncio.run(load())
+    assert len(response.items) == 2
+    # Request + requester/category, then the items with their relations
+    assert counter.count == 2, counter.statements
+
+
+def test_unprofiled_collection_access_raises(database):
+    _, session_factory = database
+
+    async def load():
+        async with session_factory() as db:
+            branch = await db.get(models.Branch, 1)
+            return branch.items
+
+    with pytest.raises(Exception, match="lazy='raise'"):
+        asyncio.run(load())